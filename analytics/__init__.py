@@ -0,0 +1,14 @@
+"""Headless analytics: the computations behind the pages, usable without Streamlit.
+
+Every function takes a ``Dataset`` and returns a DataFrame.  The pages call
+them with ``Dataset.from_session(st.session_state)``; scripts and cron jobs
+use ``Dataset.load()`` or the command line (``python -m analytics --help``).
+"""
+from analytics.dataset import Dataset
+from analytics.leaderboard import leaderboard, period_options
+from analytics.risk import DEFAULT_RISK_THRESHOLDS, risk_flags, risk_ranking
+from analytics.roster import roster_priorities
+from analytics.search import name_search
+from analytics.targets import target_attainment
+from analytics.trends import class_trends, range_options
+
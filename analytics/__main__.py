@@ -0,0 +1,135 @@
+"""Run an analytics function from the command line.
+
+    python -m analytics risk --dept "Department 1" --format parquet --out risk.parquet
+    python -m analytics leaderboard --period "Last 90 Days" --rank-by rate --top 20
+    python -m analytics targets --class "Class 1-2" --month 2025-09 --rate 75
+    python -m analytics search "Meena Gergis" --kind Student
+
+Data is loaded as the app loads it (credentials from ``.streamlit/secrets.toml``
+or ``SUPABASE_URL`` / ``SUPABASE_KEY``; the local archive of earlier years is
+synced first).
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from analytics import (
+    DEFAULT_RISK_THRESHOLDS, Dataset, class_trends, leaderboard, name_search, risk_flags, risk_ranking,
+    roster_priorities, target_attainment,
+)
+from analytics.trends import THIS_YEAR
+from data.partitions import DEFAULT_DIR
+from jobs.precompute import MONTH_FORMAT
+
+FORMATS = ('table', 'csv', 'json', 'parquet')
+
+
+def _parse_pairs(pairs):
+    parsed = {}
+    for pair in pairs or []:
+        name, _, value = pair.rpartition('=')
+        parsed[name] = int(value)
+    return parsed
+
+
+def _month_label(month):
+    return pd.Period(month, freq='M').strftime(MONTH_FORMAT)
+
+
+COMMANDS = {
+    'risk': lambda data, args: risk_flags(
+        data, _parse_pairs(args.threshold) or DEFAULT_RISK_THRESHOLDS, args.dept, args.gaps),
+    'ranking': lambda data, args: risk_ranking(data, args.dept, args.gaps, args.top),
+    'targets': lambda data, args: target_attainment(
+        data, args.class_name, _month_label(args.month), _parse_pairs(args.target), args.rate),
+    'leaderboard': lambda data, args: leaderboard(data, args.period, args.dept, args.rank_by, args.top),
+    'roster': lambda data, args: roster_priorities(data, args.class_name),
+    'trends': lambda data, args: class_trends(data, args.dept, args.activity, args.range),
+    'search': lambda data, args: name_search(data, args.query, args.kind, args.top),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m analytics", description="Church attendance analytics without the app.")
+    parser.add_argument('--format', choices=FORMATS, default='table')
+    parser.add_argument('--out', help="Output file (default: stdout; parquet defaults to <command>.parquet)")
+    parser.add_argument('--archive-dir', default=DEFAULT_DIR, help="Local archive of earlier academic years")
+    parser.add_argument('--parish', type=int, help="Only this parish's data (multi-parish databases)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    risk = commands.add_parser('risk', help="Students breaching the absence rules")
+    risk.add_argument('--dept', help="Only this department")
+    risk.add_argument('--threshold', action='append', metavar='ACTIVITY=DAYS', help="Rule (default: the app's)")
+    risk.add_argument('--gaps', choices=['mark', 'exclude'], help="Handle classes with unrecorded sessions")
+
+    ranking = commands.add_parser('ranking', help="Students by disengagement-risk score")
+    ranking.add_argument('--dept', help="Only this department")
+    ranking.add_argument('--gaps', choices=['mark', 'exclude'], help="Handle classes with unrecorded sessions")
+    ranking.add_argument('--top', type=int, default=25)
+
+    targets = commands.add_parser('targets', help="Monthly target attainment of one class")
+    targets.add_argument('--class', dest='class_name', required=True)
+    targets.add_argument('--month', default=pd.Timestamp.now().strftime('%Y-%m'), help="YYYY-MM (default: this month)")
+    targets.add_argument('--target', action='append', metavar='ACTIVITY=N', help="Monthly count per activity (default 1)")
+    targets.add_argument('--rate', type=float, help="Participation-rate target in percent instead of counts")
+
+    board = commands.add_parser('leaderboard', help="Most active students")
+    board.add_argument('--period', default="This Month", help='e.g. "Last 90 Days", "Academic Year 2024/25", "All Time"')
+    board.add_argument('--dept', help="Only this department")
+    board.add_argument('--rank-by', choices=['count', 'rate'], default='count')
+    board.add_argument('--top', type=int, default=10)
+
+    roster = commands.add_parser('roster', help="Selective-activity priorities of one class")
+    roster.add_argument('--class', dest='class_name', required=True)
+
+    trends = commands.add_parser('trends', help="Monthly attendance per class for one activity")
+    trends.add_argument('--dept', required=True)
+    trends.add_argument('--activity', required=True)
+    trends.add_argument('--range', default=THIS_YEAR, help='"This Academic Year", "Academic Year 2024/25" or "All Years"')
+
+    search = commands.add_parser('search', help="Students and servants by name, in any spelling")
+    search.add_argument('query')
+    search.add_argument('--kind', choices=['Student', 'Servant'])
+    search.add_argument('--top', type=int, default=10)
+    return parser
+
+
+def write(result, fmt, out):
+    if fmt == 'parquet':
+        result.to_parquet(out, index=False)
+    elif fmt == 'csv':
+        result.to_csv(out or sys.stdout, index=False)
+    elif fmt == 'json':
+        text = result.to_json(orient='records', date_format='iso', indent=2)
+        if out:
+            with open(out, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            print(text)
+    else:
+        text = result.to_string(index=False) if not result.empty else "(no rows)"
+        if out:
+            with open(out, 'w', encoding='utf-8') as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+
+
+def main(argv=None, dataset=None):
+    args = build_parser().parse_args(argv)
+    data = dataset if dataset is not None else Dataset.load(archive_dir=args.archive_dir, parish_id=args.parish)
+    try:
+        result = COMMANDS[args.command](data, args)
+    except (KeyError, ValueError) as e:
+        print(f"error: {e.args[0] if e.args else e}", file=sys.stderr)
+        return 2
+    out = args.out or (f"{args.command}.parquet" if args.format == 'parquet' else None)
+    write(result, args.format, out)
+    if out:
+        print(f"{len(result)} rows written to {out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
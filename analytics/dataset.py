@@ -0,0 +1,99 @@
+"""The tables every analytics function works on, independent of Streamlit."""
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Optional
+
+import pandas as pd
+
+from data.derived import students_full_details
+from data.partitions import DEFAULT_DIR, AttendanceArchive, year_label
+from data.versions import SESSION_KEYS
+from jobs.precompute import JOBS_BY_NAME, get_or_compute
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """The six tables (Attendance holding the hot partition), the archive of earlier years, and the day they are read on.
+
+    ``derived(name)`` returns a dataset of ``jobs/precompute.py``: in the app it
+    comes from the scheduler (``derived_source``), elsewhere it is computed on
+    first use and kept for the life of the ``Dataset``.
+    """
+    departments: pd.DataFrame
+    servants: pd.DataFrame
+    classes: pd.DataFrame
+    students: pd.DataFrame
+    activities: pd.DataFrame
+    attendance: pd.DataFrame
+    archive: AttendanceArchive
+    today: date = field(default_factory=date.today)
+    details: Optional[pd.DataFrame] = field(default=None, repr=False)
+    derived_source: Optional[Callable] = field(default=None, repr=False, compare=False)
+    _derived: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.details is None:
+            object.__setattr__(self, 'details', students_full_details(self.students, self.classes, self.departments))
+
+    @classmethod
+    def from_tables(cls, tables, archive, today=None, **kwargs):
+        """From frames keyed like ``st.session_state`` (``departments``, ``students``, ...)."""
+        frames = {key: tables[key] for key in SESSION_KEYS.values()}
+        return cls(**frames, archive=archive, today=today or date.today(), **kwargs)
+
+    @classmethod
+    def from_session(cls, session_state):
+        """The session's tables; derived datasets come from the scheduler when fresh."""
+        return cls.from_tables(
+            session_state, session_state.attendance_archive, details=session_state.students_full_details,
+            derived_source=lambda name: get_or_compute(name, session_state),
+        )
+
+    @classmethod
+    def load(cls, url=None, key=None, archive_dir=DEFAULT_DIR, parish_id=None):
+        """Load from Supabase as the app does: the archive is synced, then the hot partition fetched.
+
+        With ``parish_id``, one parish's data, archived in its own subdirectory of ``archive_dir``.
+        """
+        from data.headless import load_tables
+        from data.tenancy import parish_directory
+        archive = AttendanceArchive(parish_directory(archive_dir, parish_id))
+        return cls.from_tables(load_tables(url, key, archive=archive, parish_id=parish_id), archive)
+
+    def derived(self, name):
+        if self.derived_source is not None:
+            return self.derived_source(name)
+        if name not in self._derived:
+            job = JOBS_BY_NAME[name]
+            self._derived[name] = job.compute(*(getattr(self, SESSION_KEYS[table]) for table in job.tables), self.today)
+        return self._derived[name]
+
+    # --- Lookups ---
+    def activity_id(self, name):
+        return self._id(self.activities, 'activity_name', name, 'activity_id')
+
+    def class_id(self, name):
+        return self._id(self.classes, 'class_name', name, 'class_id')
+
+    def department_id(self, name):
+        return self._id(self.departments, 'dep_name', name, 'dep_id')
+
+    @staticmethod
+    def _id(table, name_column, name, id_column):
+        matches = table.loc[table[name_column] == name, id_column]
+        if matches.empty:
+            raise KeyError(f"No {name_column.split('_')[0]} named {name!r}")
+        return int(matches.iloc[0])
+
+    def students_in(self, department=None, class_name=None):
+        """Student details, optionally for one department and/or class (by name)."""
+        students = self.details
+        if department:
+            students = students[students['dep_id'] == self.department_id(department)]
+        if class_name:
+            students = students[students['class_id'] == self.class_id(class_name)]
+        return students
+
+    def archived_years(self):
+        """``{"Academic Year 2024/25": 2024, ...}``, newest first."""
+        return {f"Academic Year {year_label(year)}": year for year in self.archive.years()}
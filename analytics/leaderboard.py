@@ -0,0 +1,70 @@
+"""Most active students over a time period, by attendance count or participation rate."""
+from datetime import timedelta
+
+import pandas as pd
+
+from data.partitions import academic_year, year_start
+from jobs.gaps import gap_counts
+from jobs.precompute import archived_student_counts
+from jobs.sessions import session_calendar, sessions_held
+
+PERIODS = ["This Month", "Last 30 Days", "Last 90 Days", "This Academic Year"]
+ALL_TIME = "All Time"
+RANK_BY = ('count', 'rate')
+
+
+def period_options(dataset):
+    """Every period a leaderboard can cover: the rolling ones, each archived year, and all time."""
+    return [*PERIODS, *dataset.archived_years(), ALL_TIME]
+
+
+def period_start(period, today):
+    """First day of one of ``PERIODS``."""
+    return {
+        "This Month": today.replace(day=1), "Last 30 Days": today - timedelta(days=30),
+        "Last 90 Days": today - timedelta(days=90), "This Academic Year": year_start(academic_year(today)),
+    }[period]
+
+
+def leaderboard(dataset, period="This Month", department=None, rank_by='count', top=10):
+    """The ``top`` students for ``period`` (see ``period_options``), highest first.
+
+    Every row has ``total_attendance``, the ``sessions`` their class held in the
+    period and the resulting ``participation_rate`` (percent); ``rank_by`` picks
+    which one orders the table.  For periods within the current year,
+    ``unrecorded`` counts the sessions the student's class did not record.
+    """
+    if rank_by not in RANK_BY:
+        raise ValueError(f"rank_by must be one of {RANK_BY}, not {rank_by!r}")
+    archived_years = dataset.archived_years()
+    if period not in PERIODS and period not in archived_years and period != ALL_TIME:
+        raise ValueError(f"Unknown period {period!r}; choose from {period_options(dataset)}")
+
+    # Per-student counts for every rolling period (precomputed by the scheduler in the app)
+    period_counts = dataset.derived('leaderboard_counts')
+    calendar = dataset.derived('session_calendar')
+    this_year = period_start("This Academic Year", dataset.today)
+    if period in PERIODS:
+        counts = period_counts.set_index('student_id')[period]
+        class_sessions = sessions_held(calendar, start=period_start(period, dataset.today))
+    else:
+        years = [archived_years[period]] if period in archived_years else list(archived_years.values())
+        counts = archived_student_counts(dataset.archive.aggregates(years))
+        # Past years' calendars come from the archive's raw rows
+        class_sessions = sessions_held(session_calendar(dataset.archive.load(years))) if years else pd.Series(dtype='int64')
+        if period == ALL_TIME:
+            counts = counts.add(period_counts.set_index('student_id')['This Academic Year'], fill_value=0)
+            class_sessions = class_sessions.add(sessions_held(calendar, start=this_year), fill_value=0)
+
+    counts = counts[counts > 0].astype(int).rename('total_attendance').rename_axis('student_id').reset_index()
+    board = dataset.students_in(department).merge(counts, on='student_id')
+    board['sessions'] = board['class_id'].map(class_sessions).fillna(0).astype(int)
+    board['participation_rate'] = (100 * board['total_attendance'] / board['sessions'].where(board['sessions'] > 0)).round(1)
+    if period in PERIODS:
+        class_gaps = gap_counts(dataset.derived('missing_sessions'), start=period_start(period, dataset.today))
+        board['unrecorded'] = board['class_id'].map(class_gaps).fillna(0).astype(int)
+
+    metric = 'participation_rate' if rank_by == 'rate' else 'total_attendance'
+    board = board.sort_values([metric, 'total_attendance'], ascending=False).head(top)
+    columns = ['student_id', 'student_name', 'class_name', 'total_attendance', 'sessions', 'participation_rate']
+    return board[columns + (['unrecorded'] if 'unrecorded' in board else [])].reset_index(drop=True)
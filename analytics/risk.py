@@ -0,0 +1,100 @@
+"""Students at risk: the day-threshold rules and the model ranking."""
+from datetime import timedelta
+
+import pandas as pd
+
+from jobs.gaps import gap_counts
+from jobs.precompute import archived_last_seen
+
+DEFAULT_RISK_THRESHOLDS = {'Sunday Meeting': 30, 'Quddas (Liturgy)': 45}
+GAP_MODES = (None, 'mark', 'exclude')  # what to do with students whose class has unrecorded sessions
+RANKING_GAP_WEEKS = 12  # the model's window
+
+
+def _check_gap_mode(gap_mode):
+    if gap_mode not in GAP_MODES:
+        raise ValueError(f"gap_mode must be one of {GAP_MODES}, not {gap_mode!r}")
+
+
+def risk_flags(dataset, thresholds=None, department=None, gap_mode=None):
+    """Students who never attended a rule's activity or have been absent longer than its threshold.
+
+    ``thresholds`` maps an activity name to days (default ``DEFAULT_RISK_THRESHOLDS``).
+    With ``gap_mode`` 'mark' or 'exclude', absences in a class that has unrecorded
+    sessions of the activity within the threshold are annotated or dropped.
+    Returns one row per student: ``student_id``, ``student_name``, ``class_name``,
+    ``dep_name`` and ``reason`` (the rules breached, joined with '; ').
+    """
+    _check_gap_mode(gap_mode)
+    thresholds = DEFAULT_RISK_THRESHOLDS if thresholds is None else thresholds
+    scope = dataset.students_in(department)
+    # Students last seen in a past academic year are found through the archive's aggregates
+    last_seen = archived_last_seen(dataset.derived('last_seen_by_activity'), dataset.archive.aggregates())
+    gaps = dataset.derived('missing_sessions') if gap_mode else None
+    class_of_student = scope.set_index('student_id')['class_id']
+    today = pd.Timestamp(dataset.today)
+
+    flags = []
+    for activity_name, threshold_days in thresholds.items():
+        activity_ids = dataset.activities.loc[dataset.activities['activity_name'] == activity_name, 'activity_id']
+        seen = (
+            last_seen[last_seen['activity_id'].isin(activity_ids)]
+            .groupby('student_id')['attendance_date'].max()
+            .reindex(scope['student_id'])
+        )
+        never = seen.index[seen.isna()]
+        flags.append(pd.DataFrame({'student_id': never, 'reason': f"Never attended '{activity_name}'"}))
+
+        days_since = (today - seen.dropna()).dt.days
+        breached = days_since[days_since > threshold_days]
+        reasons = pd.Series(
+            [f"Absent from '{activity_name}' for {days} days (>{threshold_days} day threshold)" for days in breached],
+            index=breached.index, dtype=object,
+        )
+        if gaps is not None:
+            window_gaps = gap_counts(gaps, start=today - timedelta(days=threshold_days), activity_ids=activity_ids)
+            unrecorded = breached.index.map(class_of_student).map(window_gaps).fillna(0).astype(int)
+            if gap_mode == 'exclude':
+                reasons = reasons[unrecorded.to_numpy() == 0]
+            else:
+                notes = pd.Series([f" (class has {n} unrecorded session(s))" if n else "" for n in unrecorded], index=reasons.index)
+                reasons = reasons + notes
+        flags.append(pd.DataFrame({'student_id': reasons.index, 'reason': reasons.to_numpy()}))
+
+    flags = pd.concat(flags, ignore_index=True)
+    columns = ['student_id', 'student_name', 'class_name', 'dep_name', 'reason']
+    if flags.empty:
+        return pd.DataFrame(columns=columns)
+    # One pass over the rows; a groupby with a Python join costs a slice per student
+    joined = {}
+    for student_id, reason in zip(flags['student_id'].tolist(), flags['reason'].tolist()):
+        joined.setdefault(student_id, {})[reason] = None  # ordered set
+    reasons = pd.DataFrame({'student_id': list(joined), 'reason': ['; '.join(r) for r in joined.values()]})
+    return scope.merge(reasons, on='student_id')[columns].reset_index(drop=True)
+
+
+def risk_ranking(dataset, department=None, gap_mode=None, top=None):
+    """Students by disengagement-risk score (see ``jobs/risk.py``), highest first.
+
+    ``risk_score`` is in percent; ``unrecorded`` counts the sessions the
+    student's class did not record in the model's window.
+    """
+    _check_gap_mode(gap_mode)
+    scope = dataset.students_in(department)
+    scores = dataset.derived('risk_scores')
+    scores = scores[scores['student_id'].isin(scope['student_id'])]
+    recent_gaps = gap_counts(dataset.derived('missing_sessions'), start=pd.Timestamp(dataset.today) - timedelta(weeks=RANKING_GAP_WEEKS))
+    class_of_student = scope.set_index('student_id')['class_id']
+    scores = scores.assign(unrecorded=scores['student_id'].map(class_of_student).map(recent_gaps).fillna(0).astype(int))
+    if gap_mode == 'exclude':
+        scores = scores[scores['unrecorded'] == 0]
+    if top is not None:
+        scores = scores.head(top)
+
+    ranked = scores.merge(scope[['student_id', 'student_name', 'class_name', 'dep_name']], on='student_id')
+    ranked['risk_score'] = (ranked['risk_score'] * 100).round(1)
+    ranked['days_since_last'] = ranked['days_since_last'].astype(int)
+    return ranked[[
+        'student_id', 'student_name', 'class_name', 'dep_name', 'risk_score',
+        'days_since_last', 'recent_rate', 'prior_rate', 'unrecorded',
+    ]]
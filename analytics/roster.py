@@ -0,0 +1,31 @@
+"""Fair selection for selective activities: who has waited longest."""
+import pandas as pd
+
+from jobs.precompute import archived_last_seen
+
+RECENT_DAYS = 90  # participation within this many days is recent
+
+
+def roster_priorities(dataset, class_name):
+    """The class's students, longest since their last selective activity first.
+
+    ``priority`` is 'High' (never participated), 'Medium' (more than
+    ``RECENT_DAYS`` ago) or 'Low'.  Past academic years count through the
+    archive's aggregates.
+    """
+    students = dataset.students_in(class_name=class_name)
+    selective_ids = dataset.activities.loc[dataset.activities['activity_type'] == 'Selective', 'activity_id']
+    last_seen = archived_last_seen(dataset.derived('last_seen_by_activity'), dataset.archive.aggregates())
+    last_participation = (
+        last_seen[last_seen['activity_id'].isin(selective_ids)]
+        .groupby('student_id')['attendance_date'].max().rename('last_participation_date')
+    )
+    roster = students[['student_id', 'student_name']].merge(last_participation.reset_index(), on='student_id', how='left')
+    roster['last_participation_date'] = pd.to_datetime(roster['last_participation_date'])
+    roster = roster.sort_values('last_participation_date', ascending=True, na_position='first', kind='stable')
+
+    days_since = (pd.Timestamp(dataset.today) - roster['last_participation_date']).dt.days
+    roster['priority'] = 'Low'
+    roster.loc[days_since > RECENT_DAYS, 'priority'] = 'Medium'
+    roster.loc[roster['last_participation_date'].isna(), 'priority'] = 'High'
+    return roster.reset_index(drop=True)
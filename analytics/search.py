@@ -0,0 +1,9 @@
+"""Fuzzy lookup of students and servants by name, in any spelling."""
+
+
+def name_search(dataset, query, kind=None, top=10):
+    """The ``top`` best matches for ``query`` with their class and department (see ``data/search.py``).
+
+    ``kind`` is 'Student' or 'Servant' (default: both).
+    """
+    return dataset.derived('name_index').search(query, top, kind=kind)
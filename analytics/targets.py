@@ -0,0 +1,53 @@
+"""Monthly target attainment per student."""
+import pandas as pd
+
+from jobs.gaps import gap_counts
+from jobs.precompute import MONTH_FORMAT
+from jobs.sessions import sessions_held
+
+DEFAULT_TARGET_PER_ACTIVITY = 1
+
+
+def month_bounds(month):
+    """First and last day of a ``MONTH_FORMAT`` label such as ``2025-September``."""
+    start = pd.to_datetime(month, format=MONTH_FORMAT)
+    return start, start + pd.offsets.MonthEnd(0)
+
+
+def target_attainment(dataset, class_name, month, targets=None, rate_target=None):
+    """Each student of the class against the month's target.
+
+    By default the value is the student's total attendance and the target the
+    sum of ``targets`` (activity name -> monthly count, 1 per activity unless
+    given).  With ``rate_target`` (percent), the value is the share of the
+    sessions the class held that month the student attended.  Returns
+    ``student_id``, ``student_name``, ``value``, ``target``, ``met``, plus
+    ``sessions`` (held by the class) and ``unrecorded`` (core sessions it did
+    not record) for the month.
+    """
+    class_id = dataset.class_id(class_name)
+    students = dataset.students_in(class_name=class_name)
+    start, end = month_bounds(month)
+
+    month_totals = dataset.derived('student_month_totals')
+    month_totals = month_totals.loc[month] if month in month_totals.index.get_level_values(0) else pd.Series(dtype='int64')
+    attended = students['student_id'].map(month_totals).fillna(0).astype(int).to_numpy()
+    sessions = int(sessions_held(dataset.derived('session_calendar'), start=start, end=end).get(class_id, 0))
+    unrecorded = int(gap_counts(dataset.derived('missing_sessions'), start=start, end=end).get(class_id, 0))
+
+    if rate_target is not None:
+        target = rate_target
+        value = (100 * attended / sessions).round(1) if sessions else attended * 0.0
+    else:
+        targets = targets or {}
+        target = sum(targets.get(name, DEFAULT_TARGET_PER_ACTIVITY) for name in dataset.activities['activity_name'].astype(str))
+        value = attended
+    return pd.DataFrame({
+        'student_id': students['student_id'].to_numpy(),
+        'student_name': students['student_name'].astype(str).to_numpy(),
+        'value': value,
+        'target': target,
+        'met': value >= target,
+        'sessions': sessions,
+        'unrecorded': unrecorded,
+    })
@@ -0,0 +1,44 @@
+"""Monthly attendance per class for one activity, over a range of academic years."""
+import pandas as pd
+
+from analytics.leaderboard import period_start
+from jobs.precompute import MONTH_FORMAT, archived_monthly_cube
+
+THIS_YEAR = "This Academic Year"
+ALL_YEARS = "All Years"
+
+
+def range_options(dataset):
+    return [THIS_YEAR, *dataset.archived_years(), ALL_YEARS]
+
+
+def class_trends(dataset, department, activity, time_range=THIS_YEAR):
+    """``month_year``, ``class_name`` and ``attendance_count`` for the department's classes, oldest month first.
+
+    ``time_range`` is one of ``range_options``; archived years are read from
+    the archive's aggregates.
+    """
+    archived_years = dataset.archived_years()
+    if time_range not in (THIS_YEAR, ALL_YEARS) and time_range not in archived_years:
+        raise ValueError(f"Unknown range {time_range!r}; choose from {range_options(dataset)}")
+    # Monthly (class x activity) counts, precomputed by the scheduler in the app
+    monthly_cube = dataset.derived('monthly_cube')
+    parts = []
+    if time_range != THIS_YEAR:
+        years = list(archived_years.values()) if time_range == ALL_YEARS else [archived_years[time_range]]
+        parts.append(archived_monthly_cube(dataset.archive.aggregates(years)))
+    if time_range in (THIS_YEAR, ALL_YEARS):
+        # The hot partition also holds a few months of last year; those come from the archive
+        months = pd.to_datetime(monthly_cube['month_year'], format=MONTH_FORMAT)
+        parts.append(monthly_cube[months >= pd.Timestamp(period_start(THIS_YEAR, dataset.today))])
+    cube = pd.concat([part for part in parts if not part.empty] or parts, ignore_index=True)
+
+    department_classes = dataset.classes[dataset.classes['dep_id'] == dataset.department_id(department)][['class_id', 'class_name']]
+    cube = cube[(cube['activity_id'] == dataset.activity_id(activity)) & cube['class_id'].isin(department_classes['class_id'])]
+    trends = (
+        cube.merge(department_classes, on='class_id')
+        .groupby(['month_year', 'class_name'], observed=True)['attendance_count'].sum().reset_index()
+    )
+    trends['class_name'] = trends['class_name'].astype(str)
+    order = pd.to_datetime(trends['month_year'], format=MONTH_FORMAT).argsort(kind='stable')
+    return trends.iloc[order].reset_index(drop=True)
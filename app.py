@@ -1,6 +1,16 @@
 import streamlit as st
-from supabase import create_client
 import pandas as pd
+import concurrent.futures
+import importlib
+from datetime import date
+from data import background, derived
+from data.async_io import AsyncSupabase
+from data.credentials import CredentialStore
+from data.partitions import DEFAULT_DIR as ARCHIVE_DIR, AttendanceArchive, hot_filters
+from data.tenancy import DIOCESE_ROLES, ParishClient, RollupStore, parish_directory
+from data.versions import SESSION_KEYS, SharedTableCache, VersionStore
+# Modules only needed after login (supabase, the jobs, check-in and change feed) are imported
+# where they are first used, so the login screen of a fresh process does not wait for them
 
 st.set_page_config(
     page_title="Church App",
@@ -10,6 +20,8 @@ st.set_page_config(
 # --- DATABASE CONNECTION & DATA LOADING ---
 @st.cache_resource(ttl=600)
 def init_connection():
+    # Synchronous client, only used by the admin panel's activity forms (see connect_supabase below)
+    from supabase import create_client
     try:
         url = st.secrets["SUPABASE_URL"]
         key = st.secrets["SUPABASE_KEY"]
@@ -18,27 +30,183 @@ def init_connection():
         st.error(f"Error connecting to database: {e}")
         return None
 
+@st.cache_resource
+def init_async_connection():
+    # One pooled HTTP client and event loop per process, shared by all sessions
+    try:
+        return AsyncSupabase(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+    except Exception as e:
+        st.error(f"Error connecting to database: {e}")
+        return None
+
+def multi_parish():
+    # MULTI_PARISH = true: every table is partitioned by parish_id (see data/tenancy.py)
+    return bool(st.secrets.get("MULTI_PARISH", False))
+
+# Every resource below is per parish; parish_id is None without tenancy
+@st.cache_resource
+def init_parish_client(parish_id=None):
+    # The shared client itself, or a view of it that reads and writes one parish only
+    io_client = init_async_connection()
+    if io_client is None or parish_id is None:
+        return io_client
+    return ParishClient(io_client, parish_id)
+
+@st.cache_resource
+def init_table_versions(parish_id=None):
+    return VersionStore(scope=parish_id)
+
+@st.cache_resource
+def init_attendance_archive(parish_id=None):
+    # Past academic years of attendance, in Parquet files shared by all processes on the host
+    return AttendanceArchive(parish_directory(ARCHIVE_DIR, parish_id))
+
+@st.cache_resource
+def init_table_cache(_io_client, parish_id=None):
+    # Latest copy of each table in this process, keyed by table version
+    return SharedTableCache(_io_client, table_filters={"Attendance": lambda: hot_filters(date.today())})
+
+@st.cache_resource
+def init_rollup_store():
+    # Each parish's latest summary, combined by the diocese rollup page
+    return RollupStore()
+
+@st.cache_resource
+def init_scheduler(_io_client, parish_id=None):
+    # Recomputes the heavy derived datasets in the background (see jobs/)
+    from jobs.precompute import scheduler_jobs
+    from jobs.scheduler import Scheduler
+    table_cache = init_table_cache(_io_client, parish_id)
+    jobs, publish = scheduler_jobs(), None
+    if parish_id is not None:
+        from jobs.rollup import PARISH_SUMMARY_JOB
+        rollups = init_rollup_store()
+        jobs.append(PARISH_SUMMARY_JOB)
+
+        def publish(name, value):
+            if name == PARISH_SUMMARY_JOB.name:
+                rollups.publish(parish_id, value)
+    return Scheduler(
+        jobs, init_table_versions(parish_id), lambda table, version: table_cache.get(table, version).result(timeout=120),
+        on_result=publish,
+    ).start()
+
+@st.cache_resource
+def init_checkin_buffer(_io_client, parish_id=None):
+    # Shared by every kiosk session of the parish in this process; flushes check-ins in micro-batches
+    # and bumps the Attendance version at most once a minute, so the jobs are not recomputed per batch
+    from data.checkin import CheckinBuffer
+    versions = init_table_versions(parish_id)
+    return CheckinBuffer(_io_client, on_written=lambda count: versions.bump("Attendance")).start()
+
+@st.cache_resource
+def init_live_counts(_io_client, parish_id=None):
+    # Today's per-class counts, updated from inserted rows; CHANGE_FEED = "local" uses the in-process stand-in
+    from data.changefeed import LOCAL_FEED, LiveCounts, RealtimeChangeFeed
+    if st.secrets.get("CHANGE_FEED", "realtime") == "local":
+        return LiveCounts(LOCAL_FEED, parish_id)
+    return LiveCounts(RealtimeChangeFeed(_io_client, st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"]), parish_id)
+
+@st.cache_resource
+def init_credential_store(_io_client):
+    # Username index and recent successful logins, shared by every session's login form
+    return CredentialStore(_io_client, init_table_versions(), default_password="pass123")
+
+def empty_data():
+    return {**{key: pd.DataFrame() for key in SESSION_KEYS.values()}, 'memory_report': pd.DataFrame(), 'table_versions': {}}
+
 @st.cache_data(ttl=600)
-def load_all_data(_supabase_client):
-    if _supabase_client is None: return (pd.DataFrame() for _ in range(6))
+def load_all_data(_io_client, _versions, parish_id=None):
+    if _io_client is None: return empty_data()
     try:
-        servants = pd.DataFrame(_supabase_client.from_("Servant").select("*").execute().data)
-        if 'password' not in servants.columns:
-            servants['password'] = "pass123" 
-            st.warning("Warning: 'password' column not found in Servant table. Using a default password for demonstration.")
-
-        departments = pd.DataFrame(_supabase_client.from_("Department").select("*").execute().data)
-        classes = pd.DataFrame(_supabase_client.from_("Class").select("*").execute().data)
-        students = pd.DataFrame(_supabase_client.from_("Student").select("*").execute().data)
-        activities = pd.DataFrame(_supabase_client.from_("Activity").select("*").execute().data)
-        attendance = pd.DataFrame(_supabase_client.from_("Attendance").select("*").execute().data)
-        return departments, servants, classes, students, activities, attendance
+        # Read versions first so the snapshot is never newer than the data
+        versions = _versions.current()
+        # Archive finished academic years first; sessions only hold the hot partition of Attendance
+        today = date.today()
+        init_attendance_archive(parish_id).sync(_io_client, today)
+        # All six tables are fetched concurrently and decoded page by page (see data/)
+        tables, memory_report = _io_client.fetch_tables(
+            SESSION_KEYS, filters={"Attendance": hot_filters(today)}
+        ).result(timeout=60)
+        init_table_cache(_io_client, parish_id).seed(tables, versions)
+        data = {SESSION_KEYS[table]: df for table, df in tables.items()}
+        return {**data, 'memory_report': memory_report, 'table_versions': versions}
     except Exception as e:
         st.error(f"Error loading data: {e}")
-        return (pd.DataFrame() for _ in range(6))
+        return empty_data()
+
+@st.cache_resource
+def init_preparation_pool():
+    # One worker, so the scheduler's first jobs start after the tables are loaded and seeded
+    return concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="prepare")
+
+def prepare_shared_data(parish_id=None, tables=True):
+    """Start loading the tables and the derived datasets while the login screen is shown.
+
+    ``load_all_data`` computes under a per-key lock, so the call after login
+    waits for this one instead of loading again.  With ``tables=False`` (a
+    multi-parish login screen that does not know its parish) only the chart
+    library is loaded.
+    """
+    if 'preparing' not in st.session_state:
+        pool = init_preparation_pool()
+        io_client = init_parish_client(parish_id)
+        if tables:
+            pool.submit(load_all_data, io_client, init_table_versions(parish_id), parish_id)
+        # The dashboard (the default page) draws its charts on the first render after login
+        st.session_state.preparing = pool.submit(importlib.import_module, "plotly.express")
+        if tables:
+            st.session_state.preparing = pool.submit(init_scheduler, io_client, parish_id)
+
+# --- TABLE VERSION SYNC ---
+def sync_table_versions(versions_store, cache):
+    """Refresh only the tables bumped since this session's data was built."""
+    versions = versions_store.current()
+    seen = st.session_state.table_versions
+    stale = [table for table in SESSION_KEYS if versions.get(table, 0) != seen.get(table, 0)]
+    if not stale:
+        return
+    futures = {table: cache.get(table, versions.get(table, 0)) for table in stale}
+    # Small tables usually land within the wait; the rest keep loading in the background
+    concurrent.futures.wait(futures.values(), timeout=0.5)
+    refreshed = []
+    for table, future in futures.items():
+        seen[table] = versions.get(table, 0)
+        if future.done() and not future.cancelled() and future.exception() is None:
+            st.session_state[SESSION_KEYS[table]] = future.result()
+            refreshed.append(SESSION_KEYS[table])
+        else:
+            # The future is the cache's in-flight refresh, which other sessions may be waiting on
+            background.track(st.session_state, f"Refresh {table}", future, target=SESSION_KEYS[table], shared=True)
+    derived.rebuild(st.session_state, refreshed)
+
+# --- BACKGROUND DATABASE JOBS ---
+def apply_background_results():
+    refreshed = []
+    for job, result, error in background.collect(st.session_state):
+        if error is not None:
+            st.toast(f"{job['label']} failed: {error}", icon="❌")
+            if job['target']:
+                # Forget the version so the next rerun retries the refresh
+                table = next(t for t, key in SESSION_KEYS.items() if key == job['target'])
+                st.session_state.table_versions.pop(table, None)
+        elif job['target']:
+            st.session_state[job['target']] = result
+            refreshed.append(job['target'])
+        else:
+            st.toast(f"{job['label']} ✅")
+    if refreshed:
+        derived.rebuild(st.session_state, refreshed)
+
+@st.fragment(run_every=1)
+def watch_background_jobs():
+    running = background.pending(st.session_state)
+    if any(job['future'].done() for job in running):
+        st.rerun()
+    st.caption(f"⏳ {len(running)} background operation(s) running...")
 
 # --- AUTHENTICATION LOGIC ---
-def login_form():
+def login_form(credentials):
     st.title("Church Data Platform Login")
     with st.form("login_form"):
         username = st.text_input("Username (Servant Name)")
@@ -46,12 +214,27 @@ def login_form():
         submitted = st.form_submit_button("Login")
 
         if submitted:
-            user_data = st.session_state.servants[st.session_state.servants['servant_name'] == username]
-            if not user_data.empty and password == user_data.iloc[0]['password']:
+            # One servant's record per attempt, checked against its salted hash (see data/credentials.py)
+            try:
+                user = credentials.authenticate(username, password)
+            except Exception as e:
+                st.error(f"Error checking credentials: {e}")
+                return False
+            if credentials.missing_password_column:
+                st.warning("Warning: 'password' column not found in Servant table. Using a default password for demonstration.")
+            if user is not None:
+                # Diocese leaders get the cross-parish rollup; everyone else works in their own parish
+                diocese = multi_parish() and user['role'] in DIOCESE_ROLES
+                parish_id = user['parish_id'] if multi_parish() and not diocese else None
+                if multi_parish() and not diocese and parish_id is None:
+                    st.error("This account is not assigned to a parish.")
+                    return False
+                st.session_state.diocese = diocese
+                st.session_state.parish_id = parish_id
                 st.session_state.authenticated = True
-                st.session_state.user_role = user_data.iloc[0]['role']
-                st.session_state.current_user_id = user_data.iloc[0]['servant_id']
-                st.session_state.current_user_name = user_data.iloc[0]['servant_name']
+                st.session_state.user_role = user['role']
+                st.session_state.current_user_id = user['servant_id']
+                st.session_state.current_user_name = user['servant_name']
                 
                 # NEW: Add a flag to show the welcome message only once
                 st.session_state.show_welcome_message = True
@@ -68,27 +251,52 @@ if 'data_loaded' not in st.session_state:
     st.session_state.data_loaded = False
 
 if not st.session_state.authenticated:
-    supabase = init_connection()
-    if supabase:
-        _, servants_df, _, _, _, _ = load_all_data(supabase)
-        st.session_state.servants = servants_df
-        login_form()
+    io_client = init_async_connection()
+    if io_client:
+        parish_link = st.query_params.get("parish", "")
+        if not multi_parish():
+            prepare_shared_data()
+        elif parish_link.isdigit():
+            # A parish's own link (?parish=<id>) tells which parish to start loading
+            prepare_shared_data(int(parish_link))
+        else:
+            prepare_shared_data(tables=False)
+        login_form(init_credential_store(io_client))
     else:
         st.stop()
 else:
+    diocese = st.session_state.get('diocese', False)
+    parish_id = st.session_state.get('parish_id')
     if not st.session_state.data_loaded:
-        supabase = init_connection()
-        if supabase:
-            data_tuple = load_all_data(supabase)
-            (st.session_state.departments, st.session_state.servants, st.session_state.classes, 
-             st.session_state.students, st.session_state.activities, st.session_state.attendance) = data_tuple
-            st.session_state.supabase = supabase
+        io_client = init_parish_client(parish_id)
+        if io_client and diocese:
+            # Per-parish summaries only: a diocese session never holds a parish's rows
+            st.session_state.supabase_io = io_client
+            st.session_state.rollup_store = init_rollup_store()
+            st.session_state.data_loaded = True
+        elif io_client:
+            st.session_state.update(load_all_data(io_client, init_table_versions(parish_id), parish_id))
+            derived.rebuild(st.session_state)
+            st.session_state.connect_supabase = init_connection
+            st.session_state.supabase_io = io_client
+            st.session_state.table_version_store = init_table_versions(parish_id)
+            st.session_state.table_cache = init_table_cache(io_client, parish_id)
+            st.session_state.scheduler = init_scheduler(io_client, parish_id)
+            st.session_state.checkin_buffer = init_checkin_buffer(io_client, parish_id)
+            st.session_state.attendance_archive = init_attendance_archive(parish_id)
+            st.session_state.live_counts = init_live_counts(io_client, parish_id)
             st.session_state.data_loaded = True
         else:
             st.stop()
 
+    # Pick up tables another session changed, and finished background jobs
+    if not diocese:
+        sync_table_versions(st.session_state.table_version_store, st.session_state.table_cache)
+    apply_background_results()
+
     # --- PAGE DEFINITIONS & NAVIGATION ---
     dashboard_page = st.Page("views/dashboard.py", title="Dashboard", icon="🏠", default=True)
+    live_board_page = st.Page("views/live_board.py", title="Live Board", icon="📡")
     attendance_analysis_page = st.Page("views/attendance_analysis.py", title="Attendance Analysis", icon="📈")
     target_analysis_page = st.Page("views/terget_analysis.py", title="Target Analysis", icon="🎯")
     student_profile_page = st.Page("views/student_profile.py", title="Student Profile", icon="👤")
@@ -96,13 +304,18 @@ else:
     risk_analysis_page = st.Page("views/risk_analysis.py", title="Students at Risk", icon="⚠️")
     opportunity_roster_page = st.Page("views/opportunity_roster.py", title="Opportunity Roster", icon="⚖️")
     attendance_entry_page = st.Page("views/attendance_entry.py", title="Attendance Entry", icon="📝")
+    kiosk_checkin_page = st.Page("views/kiosk_checkin.py", title="Kiosk Check-in", icon="🎟️")
     admin_panel_page = st.Page("views/admin_panel.py", title="Admin Panel", icon="⚙️")
-    
-    pg = st.navigation({
-        "Data Collection": [attendance_entry_page],
-        "Data Analysis": [dashboard_page, attendance_analysis_page, target_analysis_page, student_profile_page, leaderboard_page, risk_analysis_page, opportunity_roster_page],
-        "Data Management": [admin_panel_page],
-    })
+    diocese_rollup_page = st.Page("views/diocese_rollup.py", title="Diocese Rollup", icon="⛪", default=True)
+
+    if diocese:
+        pg = st.navigation({"Diocese": [diocese_rollup_page]})
+    else:
+        pg = st.navigation({
+            "Data Collection": [attendance_entry_page, kiosk_checkin_page],
+            "Data Analysis": [dashboard_page, live_board_page, attendance_analysis_page, target_analysis_page, student_profile_page, leaderboard_page, risk_analysis_page, opportunity_roster_page],
+            "Data Management": [admin_panel_page],
+        })
 
     # --- SHARED SIDEBAR CONTENT ---
     
@@ -119,7 +332,12 @@ else:
     else:
         st.sidebar.success(f"Logged in as: **{st.session_state.user_role}**")
     
+    if background.pending(st.session_state):
+        with st.sidebar:
+            watch_background_jobs()
+
     if st.sidebar.button("Logout"):
+        background.cancel_all(st.session_state)
         st.session_state.authenticated = False
         for key in list(st.session_state.keys()):
             del st.session_state[key]
@@ -0,0 +1 @@
+"""Data access helpers shared by ``app.py`` and the pages in ``views/``."""
@@ -0,0 +1,191 @@
+"""Asyncio access to the Supabase REST API (PostgREST) off the Streamlit script thread.
+
+The supabase-py client blocks the script thread on every ``.execute()``.  This
+module runs one event loop in a daemon thread per process, with a single pooled
+``httpx.AsyncClient``.  Callers submit coroutines and get back
+``concurrent.futures.Future`` objects, so a page can:
+
+- fetch several tables concurrently (``fetch_tables``),
+- fire a write and keep rendering (``submit_insert`` / ``submit_delete``),
+- keep showing cached data while a refresh future is still running.
+
+Every request is bounded by a timeout, futures can be cancelled, and the latency
+of each request is recorded in ``RequestMetrics``.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+import httpx
+import pandas as pd
+
+from data.decode import PAGE_SIZE, TableDecoder, table_report
+from data.schema import PRIMARY_KEYS
+
+DEFAULT_TIMEOUT = 10.0
+MAX_CONNECTIONS = 10
+
+
+class RequestMetrics:
+    """Bounded log of request latencies, summarised per table and method."""
+
+    def __init__(self, maxlen=2000):
+        self._records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, method, table, status, seconds):
+        with self._lock:
+            self._records.append({'method': method, 'table': table, 'status': status, 'seconds': seconds})
+
+    def summary(self):
+        with self._lock:
+            records = list(self._records)
+        if not records:
+            return pd.DataFrame(columns=['method', 'table', 'requests', 'errors', 'p50_ms', 'p95_ms', 'max_ms'])
+        df = pd.DataFrame(records)
+        df['ms'] = df['seconds'] * 1000
+        df['error'] = df['status'] != 'ok'
+        grouped = df.groupby(['method', 'table'])
+        return pd.DataFrame({
+            'requests': grouped.size(),
+            'errors': grouped['error'].sum(),
+            'p50_ms': grouped['ms'].quantile(0.5).round(1),
+            'p95_ms': grouped['ms'].quantile(0.95).round(1),
+            'max_ms': grouped['ms'].max().round(1),
+        }).reset_index()
+
+
+class AsyncSupabase:
+    """PostgREST client running on a private event loop thread."""
+
+    def __init__(self, url, key, timeout=DEFAULT_TIMEOUT, max_connections=MAX_CONNECTIONS):
+        self.timeout = timeout
+        self.metrics = RequestMetrics()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="supabase-io", daemon=True)
+        self._thread.start()
+        self._pending = set()
+        self._pending_lock = threading.Lock()  # done callbacks discard from the loop thread
+        self._http = self._run(self._make_http(url, key, timeout, max_connections)).result()
+
+    @staticmethod
+    async def _make_http(url, key, timeout, max_connections):
+        return httpx.AsyncClient(
+            base_url=f"{url.rstrip('/')}/rest/v1",
+            headers={'apikey': key, 'Authorization': f"Bearer {key}"},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    # --- Loop plumbing ---
+    def _run(self, coro):
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        with self._pending_lock:
+            self._pending.add(future)
+        # Outside the lock: the callback runs at once if the future is already done
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def cancel_all(self):
+        """Cancel every request still in flight."""
+        with self._pending_lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+
+    def close(self):
+        self.cancel_all()
+        self._run(self._http.aclose()).result(timeout=self.timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # --- Requests ---
+    async def _request(self, method, table, **kwargs):
+        started = time.perf_counter()
+        status = 'ok'
+        try:
+            resp = await asyncio.wait_for(self._http.request(method, f"/{table}", **kwargs), self.timeout)
+            resp.raise_for_status()
+            return resp
+        except asyncio.CancelledError:
+            status = 'cancelled'
+            raise
+        except Exception as e:
+            status = type(e).__name__
+            raise
+        finally:
+            self.metrics.record(method, table, status, time.perf_counter() - started)
+
+    async def fetch_table(self, table, page_size=PAGE_SIZE, filters=None, columns='*'):
+        """Read ``table`` page by page into a typed DataFrame; returns ``(df, stats)``.
+
+        ``filters`` maps columns to PostgREST operators, e.g. ``{'attendance_id': 'gt.500'}``
+        (a list of operators applies several to one column); ``columns`` selects a subset.
+        """
+        decoder = TableDecoder(table)
+        params = {'select': columns, **(filters or {})}
+        if table in PRIMARY_KEYS:
+            params['order'] = f"{PRIMARY_KEYS[table]}.asc"
+        while True:
+            headers = {'Prefer': 'count=exact'} if not decoder.pages else {}
+            resp = await self._request(
+                'GET', table, params={**params, 'offset': decoder.rows, 'limit': page_size}, headers=headers
+            )
+            page = resp.json()
+            total = resp.headers.get('content-range', '').rpartition('/')[2]
+            decoder.add_page(page, int(total) if total.isdigit() else None)
+            if len(page) < page_size:
+                return decoder.finish()
+
+    async def select(self, table, columns='*', filters=None):
+        """The rows of one request as dicts: for lookups of a few rows, not whole tables."""
+        resp = await self._request('GET', table, params={'select': columns, **(filters or {})})
+        return resp.json()
+
+    async def _timed_fetch(self, table, filters=None):
+        started = time.perf_counter()
+        df, stats = await self.fetch_table(table, filters=filters)
+        return df, stats, round(time.perf_counter() - started, 3)
+
+    async def _fetch_tables(self, tables, filters):
+        results = await asyncio.gather(*(self._timed_fetch(table, filters.get(table)) for table in tables))
+        frames, stats, seconds = {}, {}, {}
+        for table, (df, table_stats, table_seconds) in zip(tables, results):
+            frames[table], stats[table], seconds[table] = df, table_stats, table_seconds
+        return frames, table_report(stats, seconds)
+
+    async def insert(self, table, records):
+        await self._request('POST', table, json=records, headers={'Prefer': 'return=minimal'})
+        return len(records) if isinstance(records, list) else 1
+
+    async def delete(self, table, **eq):
+        await self._request('DELETE', table, params={column: f"eq.{value}" for column, value in eq.items()})
+
+    async def update(self, table, values, filters):
+        """PATCH ``values`` onto the rows matching ``filters`` (PostgREST operators)."""
+        await self._request('PATCH', table, params=filters, json=values, headers={'Prefer': 'return=minimal'})
+
+    # --- Thread-safe entry points for page scripts (return concurrent Futures) ---
+    def submit(self, coro):
+        """Schedule any coroutine built from this client's methods on its loop."""
+        return self._run(coro)
+
+    def fetch_tables(self, tables, filters=None):
+        """Fetch ``tables`` concurrently; the future resolves to ``(frames, report)``.
+
+        ``filters`` optionally maps a table to the filters of its fetch.
+        """
+        return self._run(self._fetch_tables(list(tables), filters or {}))
+
+    def submit_fetch(self, table, filters=None, columns='*'):
+        return self._run(self.fetch_table(table, filters=filters, columns=columns))
+
+    def submit_insert(self, table, records):
+        return self._run(self.insert(table, records))
+
+    def submit_delete(self, table, **eq):
+        return self._run(self.delete(table, **eq))
@@ -0,0 +1,48 @@
+"""Bookkeeping for background database jobs owned by a Streamlit session.
+
+Pages submit work through ``data.async_io.AsyncSupabase`` and register the
+returned future here; ``app.py`` collects finished jobs on the next rerun and
+applies their results (swap a refreshed table into session state, or report
+the outcome of a write).  Table refreshes come from the process-wide
+``SharedTableCache`` and may be awaited by other sessions too, so they are
+tracked as ``shared`` and never cancelled by one session.
+"""
+import concurrent.futures
+
+
+def track(session_state, label, future, target=None, shared=False):
+    """Register ``future``; when it is a table refresh, ``target`` names the session key to replace."""
+    session_state.setdefault('pending_io', []).append(
+        {'label': label, 'future': future, 'target': target, 'shared': shared}
+    )
+
+
+def pending(session_state):
+    return session_state.get('pending_io', [])
+
+
+def collect(session_state):
+    """Remove finished jobs and return them as ``(job, result, error)`` tuples."""
+    finished, running = [], []
+    for job in pending(session_state):
+        future = job['future']
+        if not future.done():
+            running.append(job)
+        elif future.cancelled():
+            if job['target']:
+                # Reported like a failure so the refresh is retried
+                finished.append((job, None, concurrent.futures.CancelledError("cancelled")))
+        elif future.exception() is not None:
+            finished.append((job, None, future.exception()))
+        else:
+            finished.append((job, future.result(), None))
+    session_state['pending_io'] = running
+    return finished
+
+
+def cancel_all(session_state):
+    """Cancel the session's own jobs; shared refreshes keep running for the sessions waiting on them."""
+    for job in pending(session_state):
+        if not job.get('shared'):
+            job['future'].cancel()
+    session_state['pending_io'] = []
@@ -0,0 +1,95 @@
+"""Batched student class reassignment (e.g. the yearly promotion).
+
+A plan is a DataFrame with one row per student whose class changes
+(``student_id``, ``student_name``, ``from_class_id``, ``to_class_id``).  It is
+applied with one PATCH per target class and chunk of ids instead of one round
+trip per student, and the in-memory ``students`` table is updated in a single
+vectorized pass afterwards.  Batches are independent: when some fail, the
+others are already committed, so the result tells which rows were applied.
+"""
+import asyncio
+
+import pandas as pd
+
+BATCH_SIZE = 200  # ids per PATCH; keeps the ``in.(...)`` filter well under URL limits
+
+
+def default_promotion_map(classes, dep_id):
+    """Map each class of a department to the next one by ``class_id``; the last maps to None."""
+    dep_class_ids = sorted(classes.loc[classes['dep_id'] == dep_id, 'class_id'].tolist())
+    return dict(zip(dep_class_ids, dep_class_ids[1:] + [None]))
+
+
+def build_plan(students, class_map):
+    """Rows of ``students`` whose class changes under ``class_map`` (from -> to, None = keep)."""
+    moves = {int(k): int(v) for k, v in class_map.items() if v is not None and pd.notna(v) and int(v) != int(k)}
+    moving = students[students['class_id'].isin(list(moves))]
+    return pd.DataFrame({
+        'student_id': moving['student_id'].to_numpy(),
+        'student_name': moving['student_name'].to_numpy(),
+        'from_class_id': moving['class_id'].to_numpy(),
+        'to_class_id': moving['class_id'].map(moves).astype('Int32').to_numpy(),
+    })
+
+
+def build_student_plan(students, student_ids, to_class_id):
+    """Plan moving the given students to ``to_class_id``."""
+    moving = students[students['student_id'].isin(student_ids) & (students['class_id'] != to_class_id)]
+    return pd.DataFrame({
+        'student_id': moving['student_id'].to_numpy(),
+        'student_name': moving['student_name'].to_numpy(),
+        'from_class_id': moving['class_id'].to_numpy(),
+        'to_class_id': pd.array([to_class_id] * len(moving), dtype='Int32'),
+    })
+
+
+def describe_plan(plan, classes):
+    """Plan with class names and per-move counts, for previewing before applying."""
+    names = classes.set_index('class_id')['class_name']
+    preview = plan.assign(
+        from_class=plan['from_class_id'].map(names),
+        to_class=plan['to_class_id'].map(names),
+    )
+    summary = preview.groupby(['from_class', 'to_class'], observed=True).size().reset_index(name='students')
+    return preview[['student_name', 'from_class', 'to_class']], summary
+
+
+async def _apply(io_client, plan, batch_size):
+    batches, requests = [], []
+    for to_class_id, group in plan.groupby('to_class_id'):
+        ids = group['student_id'].astype(int).tolist()
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            batches.append({'to_class_id': int(to_class_id), 'student_ids': chunk})
+            requests.append(io_client.update(
+                "Student", {'class_id': int(to_class_id)}, {'student_id': f"in.({','.join(map(str, chunk))})"}
+            ))
+    results = await asyncio.gather(*requests, return_exceptions=True)
+    failed = [
+        {**batch, 'error': str(result) or type(result).__name__}
+        for batch, result in zip(batches, results) if isinstance(result, Exception)
+    ]
+    failed_ids = [student_id for batch in failed for student_id in batch['student_ids']]
+    return {
+        'requests': len(requests),
+        'applied': plan[~plan['student_id'].isin(failed_ids)],
+        'failed': failed,
+    }
+
+
+def submit_plan(io_client, plan, batch_size=BATCH_SIZE):
+    """Apply ``plan`` in batched PATCH requests.
+
+    The future resolves to ``{'requests', 'applied', 'failed'}``: the request
+    count, the plan rows whose batch succeeded, and one ``{'to_class_id',
+    'student_ids', 'error'}`` per failed batch.
+    """
+    return io_client.submit(_apply(io_client, plan, batch_size))
+
+
+def apply_plan_in_memory(students, plan):
+    """Return ``students`` with the plan's class changes applied in one pass."""
+    new_class = pd.Series(plan['to_class_id'].to_numpy(), index=plan['student_id'].to_numpy(), dtype='Int32')
+    updated = students.copy()
+    updated['class_id'] = updated['student_id'].map(new_class).fillna(updated['class_id']).astype(students['class_id'].dtype)
+    return updated
@@ -0,0 +1,148 @@
+"""Streams of newly inserted rows, and the live attendance counts built from them.
+
+A change feed calls ``callback(record)`` for every row inserted into a table:
+
+- ``RealtimeChangeFeed`` subscribes to Supabase Realtime ``postgres_changes``
+  INSERT events, on the ``AsyncSupabase`` event loop (Realtime must be enabled
+  for the table in the Supabase project),
+- ``LOCAL_FEED`` is an in-process publisher; the local PostgREST stand-in
+  (``tools/fake_postgrest.py``) publishes its inserts to it, so tests and load
+  runs can drive the live board without a Realtime server.
+
+``LiveCounts`` keeps today's attendance per (activity, class).  It is seeded
+once per day from the rows already loaded and then only applies events, so
+the history is never fetched again.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date
+
+import pandas as pd
+
+
+class LocalChangeFeed:
+    """In-process publish/subscribe of inserted rows, per table."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, table, callback):
+        with self._lock:
+            self._subscribers[table].append(callback)
+
+    def publish(self, table, record):
+        with self._lock:
+            subscribers = list(self._subscribers.get(table, []))
+        for callback in subscribers:
+            callback(record)
+
+
+LOCAL_FEED = LocalChangeFeed()
+
+
+def _record(payload):
+    # realtime-py 2.x nests the row under 'data'; older releases put it at the top level
+    data = payload.get('data', payload) if isinstance(payload, dict) else {}
+    return data.get('record') or {}
+
+
+class RealtimeChangeFeed:
+    """Supabase Realtime INSERT events, delivered on the ``AsyncSupabase`` loop."""
+
+    def __init__(self, io_client, url, key):
+        self.io_client = io_client
+        self.url = f"{url.rstrip('/')}/realtime/v1"
+        self.key = key
+        self._client = None
+
+    async def _subscribe(self, table, callback):
+        from realtime import AsyncRealtimeClient
+
+        if self._client is None:
+            self._client = AsyncRealtimeClient(self.url, self.key)
+            await self._client.connect()
+        channel = self._client.channel(f"inserts-{table}")
+        channel.on_postgres_changes("INSERT", lambda payload: callback(_record(payload)), table=table, schema="public")
+        await channel.subscribe()
+
+    def subscribe(self, table, callback):
+        """Returns a Future that fails if the subscription cannot be set up."""
+        return self.io_client.submit(self._subscribe(table, callback))
+
+
+class LiveCounts:
+    """Today's attendance count per (activity, class), applied event by event."""
+
+    def __init__(self, feed, parish_id=None):
+        # With tenancy the feed carries every parish's rows; only this parish's are counted
+        self.parish_id = parish_id
+        self._counts = Counter()
+        self._seen_ids = set()
+        self._day = date.today()
+        self._seeded = False
+        self._lock = threading.Lock()
+        self.version = 0
+        self.events = 0
+        self.last_event_at = None
+        self.error = None
+        subscription = feed.subscribe("Attendance", self.apply)
+        if subscription is not None:
+            subscription.add_done_callback(self._subscribed)
+
+    def _subscribed(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.error = future.exception()
+
+    def _roll_day(self):
+        today = date.today()
+        if today != self._day:
+            self._day, self._counts, self._seen_ids, self._seeded = today, Counter(), set(), False
+            self.version += 1
+
+    def seed(self, attendance):
+        """Count today's rows of ``attendance`` (once per day; rows already applied are skipped)."""
+        with self._lock:
+            self._roll_day()
+            if self._seeded:
+                return
+            self._seeded = True
+            if attendance.empty:
+                return
+            today_rows = attendance[pd.to_datetime(attendance['attendance_date']).dt.date == self._day]
+            for attendance_id, activity_id, class_id in zip(
+                today_rows['attendance_id'], today_rows['activity_id'], today_rows['class_id']
+            ):
+                if attendance_id not in self._seen_ids:
+                    self._seen_ids.add(int(attendance_id))
+                    self._counts[(int(activity_id), int(class_id))] += 1
+            self.version += 1
+
+    def apply(self, record):
+        """Apply one inserted Attendance row; rows for other days are ignored."""
+        try:
+            day = date.fromisoformat(str(record['attendance_date'])[:10])
+            key = (int(record['activity_id']), int(record['class_id']))
+            attendance_id = record.get('attendance_id')
+        except (KeyError, TypeError, ValueError):
+            return
+        if self.parish_id is not None and record.get('parish_id') != self.parish_id:
+            return
+        with self._lock:
+            self._roll_day()
+            if day != self._day or (attendance_id is not None and int(attendance_id) in self._seen_ids):
+                return
+            if attendance_id is not None:
+                self._seen_ids.add(int(attendance_id))
+            self._counts[key] += 1
+            self.events += 1
+            self.last_event_at = time.time()
+            self.version += 1
+
+    def snapshot(self, activity_id):
+        """``({class_id: count}, version)`` for one activity."""
+        with self._lock:
+            self._roll_day()
+            counts = {class_id: n for (activity, class_id), n in self._counts.items() if activity == int(activity_id)}
+            return counts, self.version
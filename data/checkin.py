@@ -0,0 +1,217 @@
+"""Self check-in for large events: code lookup and micro-batched writes.
+
+``StudentIndex`` maps a scanned or typed student code to the student in O(1)
+(a dict built once per Student/Class version, see ``data/derived.py``).
+
+``CheckinBuffer`` is shared by every kiosk in the process.  A check-in is a
+set lookup plus an append under a lock; a daemon thread flushes the queue to
+the Attendance table in micro-batches (every ``flush_interval`` seconds, or
+sooner once ``max_batch`` records are waiting).  A student is accepted at most
+once per (activity, day), including records that were already in the table.
+A failed batch is retried row by row: rows the database rejects (a 4xx
+response, e.g. a student deleted since the scan) are set aside in
+``dead_letters`` for an admin instead of blocking the queue, while rows that
+fail because the database is unreachable stay queued.
+
+``on_flush`` is called for every insert.  ``on_written`` (used to bump the
+Attendance version) is coalesced: it gets the records written since its last
+call at most once every ``notify_interval`` seconds, and once more when the
+buffer stops, so a busy event does not invalidate the Attendance jobs every
+second.
+"""
+import threading
+import time
+from collections import deque
+from datetime import date
+
+import pandas as pd
+
+FLUSH_INTERVAL = 1.0
+MAX_BATCH = 500
+NOTIFY_INTERVAL = 60.0
+MAX_DEAD_LETTERS = 1000
+
+
+class StudentIndex:
+    """Student code -> student record.  Codes are the student id, or ``student_code`` when the table has one."""
+
+    def __init__(self, students, classes):
+        self._by_code = {}
+        if students.empty:
+            return
+        details = students.merge(classes[['class_id', 'dep_id']], on='class_id', how='left')
+        codes = details['student_code'] if 'student_code' in details.columns else details['student_id']
+        for code, student_id, name, class_id, dep_id in zip(
+            codes, details['student_id'], details['student_name'], details['class_id'], details['dep_id']
+        ):
+            if pd.isna(code) or pd.isna(class_id) or pd.isna(dep_id):
+                continue
+            self._by_code[self.normalize(code)] = {
+                'student_id': int(student_id), 'student_name': str(name),
+                'class_id': int(class_id), 'dep_id': int(dep_id),
+            }
+
+    @staticmethod
+    def normalize(code):
+        code = str(code).strip().upper()
+        return str(int(code)) if code.isdigit() else code
+
+    def resolve(self, code):
+        return self._by_code.get(self.normalize(code))
+
+    def __len__(self):
+        return len(self._by_code)
+
+
+class CheckinBuffer:
+    """Deduplicating queue of check-ins, flushed to Attendance in the background."""
+
+    def __init__(self, io_client, on_flush=None, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH,
+                 on_written=None, notify_interval=NOTIFY_INTERVAL):
+        self.io_client = io_client
+        self.on_flush = on_flush
+        self.on_written = on_written
+        self.flush_interval = flush_interval
+        self.notify_interval = notify_interval
+        self.max_batch = max_batch
+        self._unnotified = 0
+        self._last_notify = time.monotonic()
+        self._queue = deque()
+        self.dead_letters = deque(maxlen=MAX_DEAD_LETTERS)  # rejected records, each with its 'error'
+        self._seen = {}  # day -> {(activity_id, student_id)}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            'accepted': 0, 'duplicates': 0, 'flushed': 0, 'failed_flushes': 0, 'rejected': 0, 'last_flush_ms': None,
+        }
+
+    # --- Check-ins ---
+    def seed(self, attendance, day):
+        """Mark the existing records of ``day`` as already checked in (once per day)."""
+        day_key = day.isoformat()
+        with self._lock:
+            if day_key in self._seen:
+                return
+            on_day = attendance[pd.to_datetime(attendance['attendance_date']).dt.date == day] if not attendance.empty else attendance
+            self._seen = {day_key: set(zip(on_day.get('activity_id', []), on_day.get('student_id', [])))}
+
+    def check_in(self, student, activity_id, servant_id, day=None):
+        """Queue ``student`` (a ``StudentIndex`` record); returns 'accepted' or 'duplicate'."""
+        day_key = (day or date.today()).isoformat()
+        key = (int(activity_id), student['student_id'])
+        with self._lock:
+            seen = self._seen.setdefault(day_key, set())
+            if key in seen:
+                self.stats['duplicates'] += 1
+                return 'duplicate'
+            seen.add(key)
+            self._queue.append({
+                'attendance_date': day_key,
+                'student_id': student['student_id'],
+                'activity_id': int(activity_id),
+                'class_id': student['class_id'],
+                'dep_id': student['dep_id'],
+                'recorded_by_servant_id': int(servant_id),
+            })
+            self.stats['accepted'] += 1
+            if len(self._queue) >= self.max_batch:
+                self._wake.set()
+        return 'accepted'
+
+    @property
+    def pending(self):
+        return len(self._queue)
+
+    # --- Flushing ---
+    def flush(self):
+        """Send up to ``max_batch`` queued records in one insert; returns how many were written."""
+        with self._lock:
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        try:
+            self.io_client.submit_insert("Attendance", batch).result(timeout=30)
+        except Exception:
+            # One bad row fails the whole insert: find it rather than retrying the batch forever
+            written = self._insert_rows(batch)
+        else:
+            written = len(batch)
+        if not written:
+            return 0
+        self.stats['flushed'] += written
+        self.stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        if self.on_flush:
+            self.on_flush(written)
+        with self._lock:
+            self._unnotified += written
+        self.notify()
+        return written
+
+    def _insert_rows(self, batch):
+        """Insert a failed batch one row at a time; returns how many rows were written."""
+        written, rejected = 0, []
+        for position, record in enumerate(batch):
+            try:
+                self.io_client.submit_insert("Attendance", [record]).result(timeout=30)
+            except Exception as e:
+                if not _rejected_by_database(e):
+                    with self._lock:
+                        # Put this row and the rest back in front, in order, for the next flush
+                        self._queue.extendleft(reversed(batch[position:]))
+                        self.stats['failed_flushes'] += 1
+                    break
+                rejected.append({**record, 'error': str(e)})
+            else:
+                written += 1
+        if rejected:
+            with self._lock:
+                self.dead_letters.extend(rejected)
+                self.stats['rejected'] += len(rejected)
+                for record in rejected:
+                    # Not saved, so a later scan may try again
+                    self._seen.get(record['attendance_date'], set()).discard((record['activity_id'], record['student_id']))
+        return written
+
+    def notify(self, force=False):
+        """Report the records written since the last call to ``on_written``, at most once per ``notify_interval``."""
+        with self._lock:
+            if not self._unnotified or (not force and time.monotonic() - self._last_notify < self.notify_interval):
+                return
+            count, self._unnotified = self._unnotified, 0
+            self._last_notify = time.monotonic()
+        if self.on_written:
+            self.on_written(count)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="checkin-flusher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, drain=True):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+        if drain:
+            while self.flush():
+                pass
+        self.notify(force=True)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            while self.flush() == self.max_batch:
+                pass
+            # Records held back by the interval are reported once it has passed, even when the queue is idle
+            self.notify()
+
+
+def _rejected_by_database(error):
+    """Whether ``error`` is the database refusing the row (a 4xx response), not a failure to reach it."""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status is not None and 400 <= status < 500
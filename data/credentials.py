@@ -0,0 +1,224 @@
+"""Servant credentials: salted password hashes, an indexed lookup and a login cache.
+
+Passwords are stored as ``scrypt$n$r$p$salt$hash`` strings; the scrypt cost
+parameters are tunable and a stored hash made with other parameters (or a
+plaintext password left from before hashing) is re-hashed after its next
+successful login.
+
+``CredentialStore`` never loads the Servant table into the login screen.  It
+keeps a hash index of normalized username -> servant ids (only the id and
+name columns) and fetches the one matching record per attempt.  Servants are
+usually added directly in Supabase, which bumps no version, so the index is
+also rebuilt when it is older than ``INDEX_TTL`` and, at most once per
+``INDEX_MISS_INTERVAL``, when a username is not in it.  Successful verifications are kept in a
+small ``LoginCache`` so a servant logging in again on a shared device skips
+both the request and the hash; failures are never cached.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+SCHEME = "scrypt"
+# 16 MiB and a few tens of milliseconds per hash; raise N to make guessing slower
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+
+CACHE_SIZE = 256
+CACHE_TTL = 15 * 60  # seconds
+INDEX_TTL = 10 * 60  # seconds, as the Servant table was cached before the index
+INDEX_MISS_INTERVAL = 30  # seconds between rebuilds caused by unknown usernames
+
+LOGIN_COLUMNS = "servant_id,servant_name,role,class_id,parish_id"
+INDEX_COLUMNS = "servant_id,servant_name"
+
+
+def normalize_username(name):
+    """Case-, width- and spacing-insensitive form of a servant name."""
+    return " ".join(unicodedata.normalize("NFKC", str(name)).casefold().split())
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode('ascii')
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=128 * r * (n + p + 2) + 2 ** 20, dklen=32
+    )
+
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """A new salted hash of ``password`` in the stored format."""
+    salt = os.urandom(SALT_BYTES)
+    return f"{SCHEME}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def verify_password(password, stored, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """``(matches, needs_rehash)`` for ``password`` against a stored value.
+
+    Values that are not in the hashed format are compared as plaintext (in
+    constant time) and always need a rehash.
+    """
+    if stored is None:
+        return False, False
+    parts = str(stored).split("$")
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return hmac.compare_digest(str(stored).encode('utf-8'), password.encode('utf-8')), True
+    _, stored_n, stored_r, stored_p, salt, digest = parts
+    stored_n, stored_r, stored_p = int(stored_n), int(stored_r), int(stored_p)
+    candidate = _scrypt(password, base64.b64decode(salt), stored_n, stored_r, stored_p)
+    matches = hmac.compare_digest(candidate, base64.b64decode(digest))
+    return matches, (stored_n, stored_r, stored_p) != (n, r, p)
+
+
+class LoginCache:
+    """Bounded, expiring cache of recent successful logins.
+
+    Entries are keyed by an HMAC of the normalized username and password under
+    a key that lives only in this process, and remember the Servant table
+    version they were verified at: a password change (which bumps the
+    version) invalidates them.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()  # token -> (expires, version, record)
+        self._lock = threading.Lock()
+
+    def _token(self, username, password):
+        return hmac.new(self._key, f"{username}\0{password}".encode('utf-8'), hashlib.sha256).digest()
+
+    def get(self, username, password, version):
+        token = self._token(username, password)
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires, entry_version, record = entry
+            if expires < time.monotonic() or entry_version != version:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return dict(record)
+
+    def put(self, username, password, version, record):
+        token = self._token(username, password)
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl, version, dict(record))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CredentialStore:
+    """Username/password checks against the Servant table, one record per attempt."""
+
+    def __init__(self, io_client, versions, cache=None, default_password=None):
+        self.io_client = io_client
+        self.versions = versions
+        self.cache = cache if cache is not None else LoginCache()
+        # Used when the Servant table has no password column (demonstration setups only)
+        self.default_password = default_password
+        self.missing_password_column = False
+        self._by_name = {}
+        self._index_version = None
+        self._index_built_at = None
+        self._last_miss_rebuild = None
+        self._dummy_hash = None
+        self._lock = threading.Lock()
+        self.stats = {'cache_hits': 0, 'verified': 0, 'rejected': 0, 'rehashed': 0, 'index_builds': 0}
+
+    def _index(self, version, max_age=INDEX_TTL):
+        with self._lock:
+            if (
+                self._index_version == version
+                and time.monotonic() - self._index_built_at < max_age
+            ):
+                return self._by_name
+        # Paged like any table read: a single request would be cut off at PostgREST's max-rows
+        servants, _ = self.io_client.submit_fetch("Servant", columns=INDEX_COLUMNS).result(timeout=60)
+        by_name = {}
+        for servant_id, servant_name in zip(servants.get('servant_id', []), servants.get('servant_name', [])):
+            by_name.setdefault(normalize_username(servant_name), []).append(int(servant_id))
+        with self._lock:
+            self._by_name, self._index_version = by_name, version
+            self._index_built_at = time.monotonic()
+            self.stats['index_builds'] += 1
+        return by_name
+
+    def _miss_rebuild_due(self):
+        """Whether an unknown username may rebuild the index (at most once per ``INDEX_MISS_INTERVAL``)."""
+        now = time.monotonic()
+        with self._lock:
+            if self._last_miss_rebuild is not None and now - self._last_miss_rebuild < INDEX_MISS_INTERVAL:
+                return False
+            self._last_miss_rebuild = now
+            return True
+
+    def _reject(self, password=None):
+        if password is not None:
+            # Unknown usernames cost a hash too, so timing does not reveal which names exist
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password(_b64(os.urandom(SALT_BYTES)))
+            verify_password(password, self._dummy_hash)
+        self.stats['rejected'] += 1
+        return None
+
+    def authenticate(self, username, password):
+        """The servant's record (``LOGIN_COLUMNS``) if the password matches, else ``None``."""
+        name = normalize_username(username)
+        if not name or not password:
+            return self._reject()
+        # Servants of every parish share the index (see data/tenancy.py)
+        version = self.versions.across_scopes("Servant")
+        cached = self.cache.get(name, password, version)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
+
+        servant_ids = self._index(version).get(name)
+        if not servant_ids and self._miss_rebuild_due():
+            # The servant may have been added since the index was built
+            servant_ids = self._index(version, max_age=0).get(name)
+        if not servant_ids:
+            return self._reject(password)
+        ids = ",".join(str(servant_id) for servant_id in servant_ids)
+        rows = self.io_client.submit(self.io_client.select("Servant", "*", {'servant_id': f"in.({ids})"})).result(timeout=30)
+        for row in rows:
+            self.missing_password_column = 'password' not in row
+            stored = row.get('password', self.default_password)
+            matches, needs_rehash = verify_password(password, stored)
+            if not matches:
+                continue
+            # parish_id is None in single-parish databases, which have no such column
+            record = {column: row.get(column) for column in LOGIN_COLUMNS.split(",")}
+            if needs_rehash and not self.missing_password_column:
+                self._rehash(row['servant_id'], password)
+            self.stats['verified'] += 1
+            self.cache.put(name, password, version, record)
+            return record
+        return self._reject()
+
+    def _rehash(self, servant_id, password):
+        # Written in the background; the version bump refreshes every session's Servant table
+        future = self.io_client.submit(
+            self.io_client.update("Servant", {'password': hash_password(password)}, {'servant_id': f"eq.{servant_id}"})
+        )
+        self.versions.bump_on_success(future, "Servant")
+        self.stats['rehashed'] += 1
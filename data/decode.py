@@ -0,0 +1,150 @@
+"""Paged, column-wise decoding of Supabase tables into typed DataFrames.
+
+``pd.DataFrame(resp.data)`` needs the whole table as a list of dicts and then
+copies it into columns, so peak memory is roughly twice the final frame.  Here
+each table is read one page at a time (offset/limit) and every page is written
+straight into preallocated arrays of the dtype declared in ``data/schema.py``:
+int32 values + null mask for ids, int32 codes + a vocabulary for categoricals,
+datetime64 for dates.  Only one page of dicts is alive at any moment.  The
+requests themselves are issued by ``data/async_io.py``.
+"""
+import numpy as np
+import pandas as pd
+
+from data.schema import CATEGORY, DATE, ID, TABLE_SCHEMAS, empty_frame, memory_usage
+
+PAGE_SIZE = 1000  # Supabase's default max rows per request
+
+
+class _IdColumn:
+    def __init__(self, capacity):
+        self.values = np.zeros(capacity, dtype=np.int32)
+        self.mask = np.ones(capacity, dtype=bool)
+
+    def resize(self, capacity):
+        self.values = np.resize(self.values, capacity)
+        self.mask = np.resize(self.mask, capacity)
+
+    def write(self, start, items):
+        page = pd.array(items, dtype=ID)
+        end = start + len(items)
+        self.values[start:end] = page.to_numpy(dtype=np.int32, na_value=0)
+        self.mask[start:end] = page.isna()
+
+    def finish(self, rows):
+        return pd.arrays.IntegerArray(self.values[:rows].copy(), self.mask[:rows].copy())
+
+
+class _CategoryColumn:
+    def __init__(self, capacity):
+        self.codes = np.full(capacity, -1, dtype=np.int32)
+        self.vocabulary = {}
+
+    def resize(self, capacity):
+        self.codes = np.resize(self.codes, capacity)
+
+    def write(self, start, items):
+        vocabulary = self.vocabulary
+        self.codes[start:start + len(items)] = np.fromiter(
+            (-1 if v is None else vocabulary.setdefault(v, len(vocabulary)) for v in items),
+            dtype=np.int32, count=len(items)
+        )
+
+    def finish(self, rows):
+        return pd.Categorical.from_codes(self.codes[:rows], categories=list(self.vocabulary))
+
+
+class _DateColumn:
+    def __init__(self, capacity):
+        self.values = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[ns]')
+
+    def resize(self, capacity):
+        self.values = np.resize(self.values, capacity)
+
+    def write(self, start, items):
+        self.values[start:start + len(items)] = pd.to_datetime(items).to_numpy(dtype='datetime64[ns]')
+
+    def finish(self, rows):
+        return self.values[:rows].copy()
+
+
+class _ObjectColumn:
+    def __init__(self, capacity):
+        self.values = np.empty(capacity, dtype=object)
+
+    def resize(self, capacity):
+        values = np.empty(capacity, dtype=object)
+        values[:len(self.values)] = self.values
+        self.values = values
+
+    def write(self, start, items):
+        self.values[start:start + len(items)] = items
+
+    def finish(self, rows):
+        return self.values[:rows].copy()
+
+
+_COLUMN_TYPES = {ID: _IdColumn, CATEGORY: _CategoryColumn, DATE: _DateColumn}
+
+
+class TableDecoder:
+    """Accumulate pages of one table into preallocated typed columns."""
+
+    def __init__(self, table):
+        self.table = table
+        self.schema = TABLE_SCHEMAS.get(table, {})
+        self.columns = {}
+        self.rows = 0
+        self.pages = 0
+        self.capacity = 0
+        self.untyped_row_bytes = 0
+
+    def add_page(self, page, total=None):
+        self.pages += 1
+        if not page:
+            return
+        if not self.columns:
+            self.capacity = max(total or 0, len(page))
+            self.columns = {
+                name: _COLUMN_TYPES.get(self.schema.get(name), _ObjectColumn)(self.capacity)
+                for name in page[0]
+            }
+            self.untyped_row_bytes = memory_usage(pd.DataFrame(page)) / len(page)
+        if self.rows + len(page) > self.capacity:
+            # Rows were inserted while paging; grow geometrically.
+            self.capacity = max(self.capacity * 2, self.rows + len(page))
+            for column in self.columns.values():
+                column.resize(self.capacity)
+
+        for name, column in self.columns.items():
+            column.write(self.rows, [record.get(name) for record in page])
+        self.rows += len(page)
+
+    def finish(self):
+        """Return ``(df, stats)``; ``bytes_before`` is estimated from the first page."""
+        if self.columns:
+            df = pd.DataFrame({name: column.finish(self.rows) for name, column in self.columns.items()})
+        else:
+            # No rows (e.g. an empty hot partition): keep the declared columns so pages can still select them
+            df = empty_frame(self.table)
+        stats = {
+            'rows': self.rows,
+            'pages': self.pages,
+            'bytes_before': int(self.untyped_row_bytes * self.rows),
+            'bytes_after': memory_usage(df),
+        }
+        return df, stats
+
+
+def table_report(stats_by_table, seconds_by_table=None):
+    """One report row per table from ``TableDecoder.finish`` stats."""
+    seconds_by_table = seconds_by_table or {}
+    return pd.DataFrame([
+        {
+            'table': table,
+            **stats,
+            'reduction': round(stats['bytes_before'] / stats['bytes_after'], 1) if stats['bytes_after'] else None,
+            'seconds': seconds_by_table.get(table),
+        }
+        for table, stats in stats_by_table.items()
+    ])
@@ -0,0 +1,42 @@
+"""Session-level structures derived from the loaded tables.
+
+Each entry declares the session-state tables it is built from, so when a table
+is refreshed (see ``data/versions.py``) only the entries that depend on it are
+rebuilt.  Pages read the results from ``st.session_state`` by name.
+"""
+
+
+def students_full_details(students, classes, departments):
+    """Students with their class and department columns."""
+    if students.empty or classes.empty or departments.empty:
+        return students
+    return students.merge(classes, on='class_id').merge(departments, on='dep_id')
+
+
+def student_index(students, classes):
+    """The kiosk's code lookup; ``data.checkin`` is imported on first build, not at startup."""
+    from data.checkin import StudentIndex
+    return StudentIndex(students, classes)
+
+
+# name -> (session keys it depends on, builder taking those frames in order)
+DERIVED = {
+    'students_full_details': (('students', 'classes', 'departments'), students_full_details),
+    'student_index': (('students', 'classes'), student_index),
+}
+
+
+def rebuild(session_state, changed_keys=None):
+    """Rebuild every derived entry that depends on ``changed_keys`` (all entries if None).
+
+    Entries may depend on earlier entries; a rebuilt entry counts as changed.
+    """
+    changed = None if changed_keys is None else set(changed_keys)
+    rebuilt = []
+    for name, (dependencies, builder) in DERIVED.items():
+        if changed is None or changed.intersection(dependencies):
+            session_state[name] = builder(*(session_state[key] for key in dependencies))
+            rebuilt.append(name)
+            if changed is not None:
+                changed.add(name)
+    return rebuilt
@@ -0,0 +1,45 @@
+"""Loading the tables outside Streamlit (CLIs, cron jobs, benchmarks)."""
+import os
+import tomllib
+from datetime import date
+
+from data.async_io import AsyncSupabase
+from data.partitions import hot_filters
+from data.tenancy import ParishClient
+from data.versions import SESSION_KEYS
+
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".streamlit", "secrets.toml")
+
+
+def read_credentials(path=SECRETS_PATH):
+    """``(url, key)`` from the SUPABASE_URL/SUPABASE_KEY env vars, else ``.streamlit/secrets.toml``."""
+    url, key = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+    if not (url and key) and os.path.exists(path):
+        with open(path, 'rb') as f:
+            secrets = tomllib.load(f)
+        url, key = url or secrets.get("SUPABASE_URL"), key or secrets.get("SUPABASE_KEY")
+    if not (url and key):
+        raise RuntimeError("Set SUPABASE_URL and SUPABASE_KEY or create .streamlit/secrets.toml")
+    return url, key
+
+
+def load_tables(url=None, key=None, timeout=120, archive=None, parish_id=None):
+    """All six tables keyed like ``st.session_state`` (``departments``, ``students``, ...).
+
+    With an ``AttendanceArchive``, it is synced first and only the hot partition
+    of Attendance is fetched, as the app does.  With ``parish_id``, only that
+    parish's rows are loaded (see ``data/tenancy.py``).
+    """
+    if not (url and key):
+        url, key = read_credentials()
+    shared = AsyncSupabase(url, key)
+    client = ParishClient(shared, parish_id) if parish_id is not None else shared
+    try:
+        filters = {}
+        if archive is not None:
+            archive.sync(client, date.today())
+            filters["Attendance"] = hot_filters(date.today())
+        frames, _ = client.fetch_tables(SESSION_KEYS, filters=filters).result(timeout=timeout)
+    finally:
+        shared.close()
+    return {SESSION_KEYS[table]: df for table, df in frames.items()}
@@ -0,0 +1,294 @@
+"""Chunked import of historical attendance from CSV or Excel files.
+
+The file is streamed in chunks (``pd.read_csv(chunksize=...)`` or openpyxl's
+read-only row iterator), so a million-row file never sits in memory as one
+DataFrame.  Each chunk is:
+
+1. resolved to ids through dict lookups built once from the loaded tables
+   (student / class / activity names -> ids),
+2. validated (bad dates and unknown names are rejected with a reason),
+3. deduplicated within itself and against everything already recorded, using
+   one int64 key per (date, activity, student),
+4. sent as batched inserts, one after the other.
+
+After every committed batch the number of source rows it covers is saved in a
+checkpoint keyed by the parish and the file's hash, so re-running the same
+file after a failure resumes right after the last committed batch and never
+inserts a row twice.
+
+Expected columns (case-insensitive): ``attendance_date``, ``activity_name``
+and either ``student_id`` or ``student_name`` (plus ``class_name`` when two
+students share a name).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.tenancy import parish_directory
+
+CHUNK_SIZE = 20000
+INSERT_BATCH_SIZE = 1000
+CHECKPOINT_DIR = os.path.join(tempfile.gettempdir(), "church_app_imports")
+
+REQUIRED_COLUMNS = {'attendance_date', 'activity_name'}
+
+
+def _normalize(values):
+    return values.astype(str).str.strip().str.casefold()
+
+
+def attendance_keys(dates, activity_ids, student_ids):
+    """One int64 per (day, activity, student): days << 40 | activity << 24 | student."""
+    days = pd.to_datetime(dates).to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return (days << 40) | (np.asarray(activity_ids, dtype=np.int64) << 24) | np.asarray(student_ids, dtype=np.int64)
+
+
+def file_fingerprint(file):
+    """SHA-1 of a binary file object, read in blocks; the position is reset afterwards."""
+    digest = hashlib.sha1()
+    file.seek(0)
+    for block in iter(lambda: file.read(1 << 20), b''):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+# --- Reading ---
+def _file_size(file):
+    position = file.seek(0, os.SEEK_END)
+    file.seek(0)
+    return position
+
+
+def read_chunks(file, filename, skip_rows=0, chunksize=CHUNK_SIZE):
+    """Yield ``(chunk, progress)`` pairs; ``progress`` is the fraction of the file read."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        yield from _read_excel_chunks(file, skip_rows, chunksize)
+        return
+    size = _file_size(file) or 1
+    reader = pd.read_csv(
+        file, chunksize=chunksize, dtype=str, keep_default_na=False,
+        skiprows=range(1, skip_rows + 1) if skip_rows else None,
+    )
+    for chunk in reader:
+        chunk.columns = [str(c).strip().lower() for c in chunk.columns]
+        yield chunk, min(file.tell() / size, 1.0)
+
+
+def _read_excel_chunks(file, skip_rows, chunksize):
+    from openpyxl import load_workbook
+
+    sheet = load_workbook(file, read_only=True, data_only=True).active
+    total = max((sheet.max_row or 1) - 1, 1)
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(c).strip().lower() for c in next(rows)]
+    buffer, position = [], 0
+    for row in rows:
+        position += 1
+        if position <= skip_rows:
+            continue
+        buffer.append(row)
+        if len(buffer) == chunksize:
+            yield pd.DataFrame(buffer, columns=header), min(position / total, 1.0)
+            buffer = []
+    if buffer:
+        yield pd.DataFrame(buffer, columns=header), 1.0
+
+
+# --- Resolving names to ids ---
+class ImportLookups:
+    """Name -> id dictionaries built once from the loaded tables."""
+
+    def __init__(self, students, classes, activities):
+        students_full = students.merge(classes[['class_id', 'class_name', 'dep_id']], on='class_id', how='left')
+        names = _normalize(students_full['student_name'])
+        class_names = _normalize(students_full['class_name'])
+        unique_names = ~names.duplicated(keep=False)
+
+        self.student_by_name = dict(zip(names[unique_names], students_full['student_id'][unique_names]))
+        self.student_by_name_class = dict(zip(names + "\x1f" + class_names, students_full['student_id']))
+        self.known_student_ids = set(students_full['student_id'].dropna().astype(int))
+        self.class_of_student = dict(zip(students_full['student_id'], students_full['class_id']))
+        self.class_by_name = dict(zip(_normalize(classes['class_name']), classes['class_id']))
+        self.dep_of_class = dict(zip(classes['class_id'], classes['dep_id']))
+        self.activity_by_name = dict(zip(_normalize(activities['activity_name']), activities['activity_id']))
+
+    def resolve(self, chunk):
+        """Return ``(resolved, rejected)``: resolved has id columns, rejected has a reason."""
+        reasons = pd.Series("", index=chunk.index)
+
+        dates = pd.to_datetime(chunk['attendance_date'], errors='coerce')
+        reasons[dates.isna()] = "invalid date"
+
+        activity_ids = _normalize(chunk['activity_name']).map(self.activity_by_name)
+        reasons[(reasons == "") & activity_ids.isna()] = "unknown activity"
+
+        if 'student_id' in chunk.columns:
+            student_ids = pd.to_numeric(chunk['student_id'], errors='coerce')
+            student_ids = student_ids.where(student_ids.isin(self.known_student_ids))
+        else:
+            names = _normalize(chunk['student_name'])
+            if 'class_name' in chunk.columns:
+                student_ids = (names + "\x1f" + _normalize(chunk['class_name'])).map(self.student_by_name_class)
+                student_ids = student_ids.fillna(names.map(self.student_by_name))
+            else:
+                student_ids = names.map(self.student_by_name)
+        reasons[(reasons == "") & student_ids.isna()] = "unknown or ambiguous student"
+
+        if 'class_name' in chunk.columns:
+            class_ids = _normalize(chunk['class_name']).map(self.class_by_name)
+            class_ids = class_ids.fillna(student_ids.map(self.class_of_student))
+        else:
+            class_ids = student_ids.map(self.class_of_student)
+        reasons[(reasons == "") & class_ids.isna()] = "student has no class"
+
+        valid = reasons == ""
+        resolved = pd.DataFrame({
+            'attendance_date': dates[valid],
+            'student_id': student_ids[valid].astype(np.int64),
+            'activity_id': activity_ids[valid].astype(np.int64),
+            'class_id': class_ids[valid].astype(np.int64),
+        })
+        resolved['dep_id'] = resolved['class_id'].map(self.dep_of_class)
+        rejected = chunk[~valid].assign(reason=reasons[~valid])
+        return resolved, rejected
+
+
+# --- Checkpoints ---
+class Checkpoint:
+    """Source rows already committed for one file in one parish, persisted as JSON."""
+
+    def __init__(self, fingerprint, parish_id=None, directory=CHECKPOINT_DIR):
+        directory = parish_directory(directory, parish_id)
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{fingerprint}.json")
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {'rows_done': 0, 'inserted': 0, 'duplicates': 0, 'rejected': 0}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, state):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({**state, 'updated_at': datetime.now().isoformat(timespec='seconds')}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# --- Import ---
+def _contains(sorted_keys, keys):
+    """Membership of ``keys`` in the sorted array ``sorted_keys`` via binary search."""
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[positions] == keys
+
+
+async def insert_batches(io_client, records, batch_size=INSERT_BATCH_SIZE):
+    """Insert ``records`` into Attendance as concurrent requests of ``batch_size`` rows.
+
+    Batches are independent, so one failing leaves the others stored.  Returns
+    ``{'inserted', 'failed'}``: the rows stored and one ``{'records', 'error'}``
+    per failed batch.
+    """
+    batches = [records[start:start + batch_size] for start in range(0, len(records), batch_size)]
+    results = await asyncio.gather(
+        *(io_client.insert("Attendance", batch) for batch in batches), return_exceptions=True
+    )
+    failed = [
+        {'records': batch, 'error': str(result) or type(result).__name__}
+        for batch, result in zip(batches, results) if isinstance(result, Exception)
+    ]
+    return {'inserted': len(records) - sum(len(batch['records']) for batch in failed), 'failed': failed}
+
+
+def run_import(io_client, file, filename, lookups, existing_attendance, servant_id,
+               on_progress=None, chunksize=CHUNK_SIZE, batch_size=INSERT_BATCH_SIZE, parish_id=None):
+    """Import ``file``; resumes from its checkpoint.  Returns ``(summary, rejected_rows)``.
+
+    ``on_progress(fraction, summary)`` is called after each committed chunk.
+    Rejected rows are returned (at most the first 10,000) for review.
+    """
+    checkpoint = Checkpoint(file_fingerprint(file), parish_id)
+    state = checkpoint.load()
+    resumed_from = state['rows_done']
+
+    if existing_attendance.empty:
+        seen = np.empty(0, dtype=np.int64)
+    else:
+        seen = np.sort(attendance_keys(
+            existing_attendance['attendance_date'], existing_attendance['activity_id'], existing_attendance['student_id']
+        ))
+
+    rejected_samples, sampled = [], 0
+    for chunk, progress in read_chunks(file, filename, skip_rows=resumed_from, chunksize=chunksize):
+        missing = REQUIRED_COLUMNS - set(chunk.columns)
+        if missing or not {'student_id', 'student_name'} & set(chunk.columns):
+            raise ValueError(f"Missing columns: {', '.join(sorted(missing)) or 'student_id or student_name'}")
+
+        # Positions within the chunk tell how many source rows a committed batch covers
+        chunk = chunk.reset_index(drop=True)
+        resolved, rejected = lookups.resolve(chunk)
+        keys = attendance_keys(resolved['attendance_date'], resolved['activity_id'], resolved['student_id'])
+        is_new = ~pd.Series(keys).duplicated().to_numpy() & ~_contains(seen, keys)
+        fresh = resolved[is_new]
+
+        records = [
+            {
+                'attendance_date': date,
+                'student_id': int(student_id),
+                'activity_id': int(activity_id),
+                'class_id': int(class_id),
+                'dep_id': int(dep_id),
+                'recorded_by_servant_id': int(servant_id),
+            }
+            for date, student_id, activity_id, class_id, dep_id in zip(
+                fresh['attendance_date'].dt.strftime("%Y-%m-%d"), fresh['student_id'],
+                fresh['activity_id'], fresh['class_id'], fresh['dep_id']
+            )
+        ]
+        positions = fresh.index.to_numpy()
+        duplicate_positions = resolved.index.to_numpy()[~is_new]
+        rejected_positions = rejected.index.to_numpy()
+        base = state
+
+        def state_after(rows, inserted):
+            return {
+                'rows_done': base['rows_done'] + rows,
+                'inserted': base['inserted'] + inserted,
+                'duplicates': base['duplicates'] + int((duplicate_positions < rows).sum()),
+                'rejected': base['rejected'] + int((rejected_positions < rows).sum()),
+            }
+
+        # In order, checkpointing after each batch: a resumed import starts after the last committed row
+        for start in range(0, len(records), batch_size):
+            end = min(start + batch_size, len(records))
+            io_client.submit(io_client.insert("Attendance", records[start:end])).result(timeout=300)
+            rows = len(chunk) if end == len(records) else int(positions[end - 1]) + 1
+            state = state_after(rows, end)
+            checkpoint.save(state)
+        if not records:
+            state = state_after(len(chunk), 0)
+            checkpoint.save(state)
+        # Both parts are sorted, so the stable sort is a linear merge
+        seen = np.sort(np.concatenate([seen, np.sort(keys[is_new])]), kind='stable')
+        if sampled < 10000 and not rejected.empty:
+            rejected_samples.append(rejected)
+            sampled += len(rejected)
+        if on_progress:
+            on_progress(progress, state)
+
+    checkpoint.clear()
+    rejected_rows = pd.concat(rejected_samples, ignore_index=True).head(10000) if rejected_samples else pd.DataFrame()
+    return {**state, 'resumed_from': resumed_from}, rejected_rows
@@ -0,0 +1,106 @@
+"""Catch-up attendance entry: students x dates x activities in one submission.
+
+The page shows one editable grid with a row per student and a checkbox column
+per (date, activity) session.  On submit the ticked cells are turned into a
+single write set, deduplicated against the records already stored (using the
+importer's int64 (day, activity, student) keys), and sent as chunked bulk
+inserts.  When some chunks fail the others stay stored: Attendance is still
+bumped, so a resubmission only sends the missing rows.
+"""
+from datetime import timedelta
+
+import pandas as pd
+
+from data.importer import INSERT_BATCH_SIZE, attendance_keys, insert_batches
+
+MAX_SESSIONS = 60  # grid columns; keeps the editor usable
+
+
+def session_dates(start, end, weekdays=None):
+    """Dates from ``start`` to ``end`` inclusive, limited to ``weekdays`` (0 = Monday) when given."""
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    return [day for day in days if not weekdays or day.weekday() in weekdays]
+
+
+def session_columns(dates, activities):
+    """Grid column label -> ``(date, activity_id)`` for every date and every row of ``activities``."""
+    return {
+        f"{day:%a %d %b} · {name}": (day, int(activity_id))
+        for day in dates
+        for name, activity_id in zip(activities['activity_name'], activities['activity_id'])
+    }
+
+
+def build_grid(class_students, columns, attendance):
+    """One row per student and a boolean column per session, ticked where a record already exists."""
+    grid = class_students.sort_values(by='student_name')[['student_id', 'student_name']].reset_index(drop=True)
+    if attendance.empty:
+        recorded = set()
+    else:
+        recorded_keys = attendance_keys(attendance['attendance_date'], attendance['activity_id'], attendance['student_id'])
+        recorded = set(recorded_keys.tolist())
+    for label, (day, activity_id) in columns.items():
+        keys = attendance_keys([day] * len(grid), [activity_id] * len(grid), grid['student_id'])
+        grid[label] = pd.Series(keys).isin(recorded).to_numpy()
+    return grid
+
+
+def build_records(grid, columns, class_students, attendance, servant_id):
+    """Return ``(records, already_recorded)`` for the ticked cells of ``grid``.
+
+    Each (date, activity, student) appears once in ``records`` and never
+    repeats a row that is already in ``attendance``.
+    """
+    ticked = grid.melt(id_vars=['student_id'], value_vars=list(columns), var_name='session', value_name='present')
+    ticked = ticked[ticked['present'].fillna(False).astype(bool)]
+    sessions = pd.DataFrame(
+        [(label, pd.Timestamp(day), activity_id) for label, (day, activity_id) in columns.items()],
+        columns=['session', 'attendance_date', 'activity_id'],
+    )
+    ticked = ticked.merge(sessions, on='session').merge(
+        class_students[['student_id', 'class_id', 'dep_id']], on='student_id'
+    )
+    keys = pd.Series(attendance_keys(ticked['attendance_date'], ticked['activity_id'], ticked['student_id']))
+    if attendance.empty:
+        existing = pd.Series(False, index=keys.index)
+    else:
+        existing = keys.isin(attendance_keys(attendance['attendance_date'], attendance['activity_id'], attendance['student_id']))
+    fresh = ticked[(~keys.duplicated() & ~existing).to_numpy()]
+
+    records = [
+        {
+            'attendance_date': day,
+            'student_id': int(student_id),
+            'activity_id': int(activity_id),
+            'class_id': int(class_id),
+            'dep_id': int(dep_id),
+            'recorded_by_servant_id': int(servant_id),
+        }
+        for day, student_id, activity_id, class_id, dep_id in zip(
+            fresh['attendance_date'].dt.strftime("%Y-%m-%d"), fresh['student_id'],
+            fresh['activity_id'], fresh['class_id'], fresh['dep_id']
+        )
+    ]
+    return records, int(existing.sum())
+
+
+async def _insert(io_client, records, versions, batch_size):
+    outcome = await insert_batches(io_client, records, batch_size)
+    if outcome['inserted'] and versions is not None:
+        versions.bump("Attendance")
+    if outcome['failed']:
+        dates = sorted({record['attendance_date'] for batch in outcome['failed'] for record in batch['records']})
+        raise RuntimeError(
+            f"{len(records) - outcome['inserted']} of {len(records)} records were not saved "
+            f"(dates {', '.join(dates)}): {outcome['failed'][0]['error']}"
+        )
+    return outcome['inserted']
+
+
+def submit_records(io_client, records, versions=None, batch_size=INSERT_BATCH_SIZE):
+    """Send ``records`` as concurrent bulk inserts of ``batch_size`` rows; returns a Future.
+
+    ``versions`` (a ``VersionStore``) has Attendance bumped once any chunk is
+    stored.  The future fails, naming the unsaved dates, when any chunk failed.
+    """
+    return io_client.submit(_insert(io_client, records, versions, batch_size))
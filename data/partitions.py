@@ -0,0 +1,251 @@
+"""Attendance split into a hot in-memory partition and cold yearly files.
+
+Almost every view looks at the current academic year, so sessions only load
+the *hot* partition: rows dated from the start of the current academic year
+(``YEAR_START_MONTH``), plus a ``HOT_MARGIN_DAYS`` margin so rolling windows
+such as "Last 90 Days" stay complete in the first months of a year.  It is kept
+up to date like any other table (see ``data/versions.py``).
+
+Earlier academic years live in ``AttendanceArchive``: one immutable Parquet
+file per year with its raw rows, and one with precomputed aggregates per
+(month, student, class, activity).  Files are versioned rather than modified;
+a compaction writes new versions and then updates a small JSON manifest.
+The directory is shared by every process on the host, so a compaction holds
+an exclusive lock on ``archive.lock`` from reading the manifest until the
+files it replaced are removed.
+Pages load archived years lazily, only when an older time range is picked, and
+each loaded year is cached once per process.
+
+The manifest records the ``cutoff`` date (everything before it belongs to the
+archive) and ``boundary_id``, the largest ``attendance_id`` already archived.
+``sync`` fetches only what the archive is missing: rows dated before the cutoff
+with a larger id (e.g. historical imports) and, when a new academic year has
+started, the year that just ended.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: compactions are only serialized within the process
+    fcntl = None
+
+import pandas as pd
+
+from data.schema import apply_schema
+
+YEAR_START_MONTH = 9  # the service year starts in September
+HOT_MARGIN_DAYS = 90  # the longest rolling window the pages use
+DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "church_app_attendance_archive")
+
+AGGREGATE_KEYS = ['month', 'student_id', 'class_id', 'activity_id']
+
+
+def academic_year(day):
+    """The calendar year in which ``day``'s academic year started."""
+    return day.year if day.month >= YEAR_START_MONTH else day.year - 1
+
+
+def year_start(year):
+    return date(year, YEAR_START_MONTH, 1)
+
+
+def year_label(year):
+    return f"{year}/{(year + 1) % 100:02d}"
+
+
+def hot_start(today):
+    """First date held in the hot partition."""
+    return year_start(academic_year(today)) - timedelta(days=HOT_MARGIN_DAYS)
+
+
+def hot_filters(today):
+    """PostgREST filters selecting the hot partition of Attendance."""
+    return {'attendance_date': f"gte.{hot_start(today).isoformat()}"}
+
+
+def current_year_rows(attendance, today):
+    """Rows of the hot partition that belong to the current academic year (the margin dropped)."""
+    if attendance.empty:
+        return attendance
+    return attendance[pd.to_datetime(attendance['attendance_date']) >= pd.Timestamp(year_start(academic_year(today)))]
+
+
+def aggregate(rows):
+    """Count and last date per (month, student, class, activity)."""
+    dates = pd.to_datetime(rows['attendance_date'])
+    grouped = rows.assign(month=dates.dt.to_period('M').dt.to_timestamp(), attendance_date=dates).groupby(
+        AGGREGATE_KEYS, observed=True
+    )
+    return pd.DataFrame({
+        'attendance_count': grouped.size(),
+        'last_seen': grouped['attendance_date'].max(),
+    }).reset_index()
+
+
+class AttendanceArchive:
+    """Immutable Parquet files of past academic years, plus their aggregates."""
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.lock_path = os.path.join(directory, "archive.lock")
+        self._cache = {}  # (kind, year, version) -> DataFrame
+        self._lock = threading.RLock()
+
+    # --- Manifest ---
+    def manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'cutoff': None, 'boundary_id': 0, 'years': {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    @contextmanager
+    def _exclusive(self):
+        """Held by one thread of one process on the host at a time."""
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_manifest(self, manifest):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def years(self):
+        """Archived academic years, newest first."""
+        return sorted((int(year) for year in self.manifest()['years']), reverse=True)
+
+    def _path(self, kind, year, version):
+        return os.path.join(self.directory, f"{kind}_{year}_v{version}.parquet")
+
+    # --- Keeping the archive complete ---
+    def sync(self, io_client, today, timeout=300):
+        """Archive every row dated before the current academic year that is not archived yet.
+
+        Returns the number of rows fetched (0 on a normal day).
+        """
+        cutoff = year_start(academic_year(today))
+        manifest = self.manifest()
+        if manifest['cutoff'] is None:
+            requests = [{'attendance_date': f"lt.{cutoff.isoformat()}"}]
+        else:
+            previous_cutoff = date.fromisoformat(manifest['cutoff'])
+            # Rows added to archived years since the last compaction
+            requests = [{'attendance_id': f"gt.{manifest['boundary_id']}", 'attendance_date': f"lt.{previous_cutoff.isoformat()}"}]
+            if cutoff > previous_cutoff:
+                # A new academic year started: the year that just ended moves to the archive
+                requests.append({'attendance_date': [f"gte.{previous_cutoff.isoformat()}", f"lt.{cutoff.isoformat()}"]})
+        futures = [io_client.submit_fetch("Attendance", filters=filters) for filters in requests]
+        frames = [future.result(timeout=timeout)[0] for future in futures]
+        rows = pd.concat(frames, ignore_index=True) if any(not df.empty for df in frames) else pd.DataFrame()
+        self.compact(rows, cutoff)
+        return len(rows)
+
+    def compact(self, rows, cutoff):
+        """Merge ``rows`` (all dated before ``cutoff``) into new versions of their yearly files."""
+        replaced = []
+        with self._exclusive():
+            manifest = self.manifest()
+            if not rows.empty:
+                rows = apply_schema(rows, "Attendance")
+                years = rows['attendance_date'].map(academic_year)
+                for year, new_rows in rows.groupby(years.to_numpy()):
+                    year = int(year)
+                    entry = manifest['years'].get(str(year))
+                    if entry:
+                        new_rows = pd.concat([self._read('attendance', year, entry['version']), new_rows], ignore_index=True)
+                    merged = new_rows.drop_duplicates('attendance_id').sort_values('attendance_id', ignore_index=True)
+                    version = entry['version'] + 1 if entry else 1
+                    merged.to_parquet(self._path('attendance', year, version), index=False)
+                    aggregate(merged).to_parquet(self._path('aggregates', year, version), index=False)
+                    manifest['years'][str(year)] = {'version': version, 'rows': len(merged)}
+                    if entry:
+                        replaced += [(kind, year, entry['version']) for kind in ('attendance', 'aggregates')]
+                manifest['boundary_id'] = max(manifest['boundary_id'], int(rows['attendance_id'].max()))
+            manifest['cutoff'] = max(cutoff.isoformat(), manifest['cutoff'] or "")
+            self._save_manifest(manifest)
+            # Only once the manifest no longer points to them
+            for key in replaced:
+                self._cache.pop(key, None)
+                try:
+                    os.remove(self._path(*key))
+                except FileNotFoundError:
+                    pass
+
+    # --- Lazy reads ---
+    def _read(self, kind, year, version):
+        key = (kind, year, version)
+        with self._lock:
+            if key not in self._cache:
+                df = pd.read_parquet(self._path(kind, year, version))
+                self._cache[key] = apply_schema(df, "Attendance") if kind == 'attendance' else df
+            return self._cache[key]
+
+    def _load(self, kind, years):
+        try:
+            frames = self._read_years(kind, years)
+        except FileNotFoundError:
+            # Another process compacted between reading the manifest and the files: read the new versions
+            frames = self._read_years(kind, years)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _read_years(self, kind, years):
+        entries = self.manifest()['years']
+        return [self._read(kind, year, entries[str(year)]['version']) for year in years if str(year) in entries]
+
+    def load(self, years):
+        """Raw attendance rows of the archived ``years``."""
+        return self._load('attendance', years)
+
+    def aggregates(self, years=None):
+        """Aggregates of the archived ``years`` (all archived years when None)."""
+        return self._load('aggregates', self.years() if years is None else years)
+
+    def summary(self):
+        """One row per archived year: rows and size on disk."""
+        manifest = self.manifest()
+        return pd.DataFrame([
+            {
+                'academic_year': year_label(int(year)),
+                'rows': entry['rows'],
+                'file_kb': round(sum(
+                    os.path.getsize(self._path(kind, year, entry['version'])) for kind in ('attendance', 'aggregates')
+                ) / 1024, 1),
+            }
+            for year, entry in sorted(manifest['years'].items(), reverse=True)
+        ])
+
+
+def attendance_between(archive, attendance, start, end):
+    """Raw rows dated ``start``..``end`` (inclusive), reading archived years only if the range needs them."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    frames = [attendance]
+    archived = [year for year in archive.years() if year_start(year) <= end.date() and start.date() < year_start(year + 1)]
+    if archived and start.date() < hot_start(date.today()):
+        frames.insert(0, archive.load(archived))
+    rows = pd.concat([df for df in frames if not df.empty], ignore_index=True) if any(not df.empty for df in frames) else attendance
+    if rows.empty:
+        return rows
+    dates = pd.to_datetime(rows['attendance_date'])
+    # The hot margin overlaps the last archived year
+    return rows[(dates >= start) & (dates <= end)].drop_duplicates('attendance_id')
+
+
+def full_history(archive, attendance):
+    """Every attendance row: all archived years plus the hot partition (e.g. to deduplicate an import)."""
+    archived = archive.load(archive.years())
+    if archived.empty:
+        return attendance
+    return pd.concat([archived, attendance], ignore_index=True).drop_duplicates('attendance_id')
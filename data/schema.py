@@ -0,0 +1,90 @@
+"""Column dtypes for the six Supabase tables loaded by ``app.py``.
+
+Supabase returns JSON, so a plain ``pd.DataFrame(resp.data)`` gives int64 or
+object ids (float64 as soon as a NULL shows up) and one Python string object per
+cell.  ``apply_schema`` casts every known column to a compact dtype: nullable
+``Int32`` ids, categoricals for small repeated vocabularies and ``datetime64``
+for dates.  Columns that are not declared are left untouched.
+"""
+import pandas as pd
+
+ID = "Int32"
+CATEGORY = "category"
+DATE = "datetime64[ns]"
+
+TABLE_SCHEMAS = {
+    "Department": {
+        "dep_id": ID,
+        "dep_name": CATEGORY,
+        "manager_id": ID,
+    },
+    "Servant": {
+        "servant_id": ID,
+        "role": CATEGORY,
+        "class_id": ID,
+    },
+    "Class": {
+        "class_id": ID,
+        "class_name": CATEGORY,
+        "dep_id": ID,
+    },
+    "Student": {
+        "student_id": ID,
+        "class_id": ID,
+    },
+    "Activity": {
+        "activity_id": ID,
+        "activity_name": CATEGORY,
+        "activity_type": CATEGORY,
+    },
+    "Attendance": {
+        "attendance_id": ID,
+        "attendance_date": DATE,
+        "student_id": ID,
+        "activity_id": ID,
+        "class_id": ID,
+        "dep_id": ID,
+        "recorded_by_servant_id": ID,
+    },
+}
+
+# Stable ordering column for paged reads (see data/decode.py)
+PRIMARY_KEYS = {
+    "Department": "dep_id",
+    "Servant": "servant_id",
+    "Class": "class_id",
+    "Student": "student_id",
+    "Activity": "activity_id",
+    "Attendance": "attendance_id",
+}
+
+
+def _cast(column, dtype):
+    if dtype == DATE:
+        return pd.to_datetime(column)
+    if dtype == ID and column.dtype == object:
+        # Ids can arrive as strings or mixed with None; go through numeric first.
+        column = pd.to_numeric(column)
+    return column.astype(dtype)
+
+
+def apply_schema(df, table):
+    """Return a copy of ``df`` with the declared dtypes for ``table`` applied."""
+    schema = TABLE_SCHEMAS.get(table, {})
+    if df.empty or not schema:
+        return df
+    typed = df.copy()
+    for column, dtype in schema.items():
+        if column in typed.columns:
+            typed[column] = _cast(typed[column], dtype)
+    return typed
+
+
+def empty_frame(table):
+    """An empty DataFrame with ``table``'s declared columns and dtypes."""
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in TABLE_SCHEMAS.get(table, {}).items()})
+
+
+def memory_usage(df):
+    """Deep memory footprint of ``df`` in bytes (string contents included)."""
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,192 @@
+"""Fuzzy name search over students and servants.
+
+Names are spelled many ways: the same person is "Mina", "Meena" or "مينا",
+"Guirguis", "Gergis" or "جرجس".  ``NameIndex`` keys every word of a name two
+ways:
+
+* a transliteration skeleton (``phonetic_key``): Latin digraphs and Arabic
+  letters are mapped to one consonant each, vowels after the first letter are
+  dropped and repeats collapsed, so all of the spellings above share a key
+  (``mn``, ``grgs``);
+* the character trigrams of the folded word, which catch typos the skeleton
+  does not.
+
+The index is built once per Student/Servant/Class/Department version (the
+``name_index`` job in ``jobs/precompute.py``) and shared by every session.
+A query looks up the skeleton of each typed word as a prefix (the last word
+may be half typed) in a sorted key list and the query's trigrams in an
+inverted index, and scores every entry at once on arrays.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+RESULT_COLUMNS = ['kind', 'id', 'name', 'class_name', 'dep_name', 'score']
+PHONETIC_WEIGHT = 0.6  # the rest is trigram similarity
+PREFIX_WEIGHT = 0.5  # score of a key that only starts with the typed one, before its length share
+MIN_SCORE = 0.25
+
+# Latin spellings of one sound; "gu" before a vowel is a hard g (Guirguis)
+LATIN_DIGRAPHS = re.compile(r"ph|kh|gh|sh|ch|th|dh|ck|qu|gu(?=[aeiouy])")
+LATIN_DIGRAPH_SOUNDS = {
+    'ph': 'f', 'kh': 'k', 'gh': 'g', 'sh': 's', 'ch': 'k', 'th': 't', 'dh': 'd', 'ck': 'k', 'qu': 'k', 'gu': 'g',
+}
+LATIN_SOUNDS = {'c': 'k', 'q': 'k', 'j': 'g', 'z': 's', 'x': 'ks', 'v': 'f', 'p': 'b'}
+# Arabic letters by the Latin consonant (or vowel) they are usually written with
+ARABIC_SOUNDS = {
+    'ا': 'a', 'ى': 'a', 'ع': 'a', 'ب': 'b', 'ت': 't', 'ث': 't', 'ج': 'g', 'ح': 'h', 'خ': 'k', 'د': 'd',
+    'ذ': 's', 'ر': 'r', 'ز': 's', 'س': 's', 'ش': 's', 'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 's', 'غ': 'g',
+    'ف': 'f', 'ق': 'k', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h', 'و': 'w', 'ي': 'y',
+}
+VOWELS = set('aeiou')
+WORD = re.compile(r"[^\W_]+")
+
+
+def fold(text):
+    """Lowercase ``text`` without accents, Arabic diacritics or tatweel; hamza seats become their letter."""
+    decomposed = unicodedata.normalize('NFKD', str(text)).replace('ـ', '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def words(text):
+    return WORD.findall(fold(text))
+
+
+def phonetic_key(word):
+    """Transliteration skeleton of one folded word: its first letter, then its consonants."""
+    if word.isdigit():
+        return word
+    if any('\u0600' <= ch <= '\u06ff' for ch in word):
+        sounds = ''.join(ARABIC_SOUNDS.get(ch, '') for ch in word)
+    else:
+        sounds = LATIN_DIGRAPHS.sub(lambda m: LATIN_DIGRAPH_SOUNDS[m.group()[:2]], word)
+        sounds = ''.join(LATIN_SOUNDS.get(ch, ch) for ch in sounds)
+    if not sounds:
+        return ''
+    key = ['a' if sounds[0] in VOWELS else sounds[0]]
+    for i in range(1, len(sounds)):
+        ch = sounds[i]
+        # w and y are vowels after the first letter; so is a final h after a vowel (Sarah, Taha)
+        if ch in VOWELS or ch in 'wy' or (ch == 'h' and i == len(sounds) - 1 and sounds[i - 1] in VOWELS):
+            continue
+        if ch != key[-1]:
+            key.append(ch)
+    return ''.join(key)
+
+
+def trigrams(folded_words, complete=True):
+    """Trigrams of the words padded with spaces; with ``complete=False`` the last word may be half typed."""
+    grams = set()
+    for i, word in enumerate(folded_words):
+        padded = f" {word} " if complete or i < len(folded_words) - 1 else f" {word}"
+        grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """Students and servants by name, with their class and department."""
+
+    def __init__(self, students, servants, classes, departments):
+        class_names = dict(zip(classes['class_id'], classes['class_name'])) if not classes.empty else {}
+        dep_of_class = dict(zip(classes['class_id'], classes['dep_id'])) if not classes.empty else {}
+        dep_names = dict(zip(departments['dep_id'], departments['dep_name'])) if not departments.empty else {}
+        dep_of_manager = (
+            dict(zip(departments['manager_id'], departments['dep_id']))
+            if 'manager_id' in departments.columns else {}
+        )
+        self._records = []  # (kind, id, name, class_name, dep_name)
+        gram_counts, postings, gram_postings, keys = [], {}, {}, {}
+        for kind, frame, id_column, name_column in (
+            ('Student', students, 'student_id', 'student_name'),
+            ('Servant', servants, 'servant_id', 'servant_name'),
+        ):
+            if frame.empty:
+                continue
+            for record_id, name, class_id in zip(frame[id_column], frame[name_column], frame['class_id']):
+                if pd.isna(name):
+                    continue
+                dep_id = dep_of_class.get(class_id, dep_of_manager.get(record_id) if kind == 'Servant' else None)
+                entry = len(self._records)
+                self._records.append(
+                    (kind, int(record_id), str(name), class_names.get(class_id), dep_names.get(dep_id))
+                )
+                folded = words(name)
+                for word in folded:
+                    if word not in keys:
+                        keys[word] = phonetic_key(word)
+                    postings.setdefault(keys[word], set()).add(entry)
+                grams = trigrams(folded)
+                gram_counts.append(len(grams))
+                for gram in grams:
+                    gram_postings.setdefault(gram, []).append(entry)
+        # Scoring works on arrays over all entries: a query costs a few vector operations, not a loop per candidate
+        self._kinds = np.array([record[0] for record in self._records], dtype=object)
+        self._ids = np.array([record[1] for record in self._records], dtype=np.int64)
+        self._gram_counts = np.array(gram_counts, dtype=np.float64)
+        self._postings = {key: np.fromiter(entries, dtype=np.int64) for key, entries in postings.items()}
+        self._keys = sorted(postings)
+        self._gram_postings = {gram: np.array(entries, dtype=np.int64) for gram, entries in gram_postings.items()}
+
+    def __len__(self):
+        return len(self._records)
+
+    def _phonetic_scores(self, query_words):
+        """Per entry, the share of the query's words matched by one of its skeletons.
+
+        Only the last word, which may be half typed, also matches longer keys it starts.
+        """
+        scores = np.zeros(len(self._records))
+        for position, word in enumerate(query_words):
+            key = phonetic_key(word)
+            if not key:
+                continue
+            best = np.zeros(len(self._records))
+            for i in range(bisect_left(self._keys, key), len(self._keys)):
+                candidate = self._keys[i]
+                if candidate != key and (position < len(query_words) - 1 or not candidate.startswith(key)):
+                    break
+                score = 1.0 if candidate == key else PREFIX_WEIGHT + (1 - PREFIX_WEIGHT) * len(key) / len(candidate)
+                entries = self._postings[candidate]
+                best[entries] = np.maximum(best[entries], score)
+            scores += best / len(query_words)
+        return scores
+
+    def search(self, query, limit=10, kind=None, ids=None):
+        """The best ``limit`` matches for ``query`` as a DataFrame of ``RESULT_COLUMNS``, best first.
+
+        ``kind`` ('Student' or 'Servant') and ``ids`` (a set of that kind's
+        ids, e.g. the students a servant may see) restrict the candidates.
+        """
+        query_words = words(query)
+        if not query_words or not self._records:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        query_grams = trigrams(query_words, complete=False)
+        matched = [self._gram_postings[gram] for gram in query_grams if gram in self._gram_postings]
+        overlap = (
+            np.bincount(np.concatenate(matched), minlength=len(self._records)) if matched
+            else np.zeros(len(self._records))
+        )
+        dice = 2 * overlap / (len(query_grams) + self._gram_counts)
+        scores = PHONETIC_WEIGHT * self._phonetic_scores(query_words) + (1 - PHONETIC_WEIGHT) * dice
+
+        keep = scores >= MIN_SCORE
+        if kind is not None:
+            keep &= self._kinds == kind
+        if ids is not None:
+            keep &= np.isin(self._ids, np.fromiter(ids, dtype=np.int64))
+        candidates = np.flatnonzero(keep)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        # Best first; equal scores in index order
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return pd.DataFrame(
+            [(*self._records[entry], round(float(scores[entry]), 3)) for entry in candidates], columns=RESULT_COLUMNS
+        )
+
+
+def name_index(students, servants, classes, departments, today=None):
+    """The ``NameIndex`` of the current tables (a scheduler job; ``today`` is unused)."""
+    return NameIndex(students, servants, classes, departments)
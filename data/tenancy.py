@@ -0,0 +1,153 @@
+"""Multi-parish tenancy: every table is partitioned by ``parish_id``.
+
+With ``MULTI_PARISH = true`` in the secrets, each session works inside the
+parish of the servant who logged in.  ``ParishClient`` wraps the process's
+shared ``AsyncSupabase`` so that every read filters on ``parish_id`` and every
+insert carries it; the app then keys each cached resource by parish (table
+versions, table cache, scheduler, archive directory, check-in buffer), so a
+session loads and invalidates only its own parish's data.
+
+Diocese leaders do not load raw rows.  Each parish's scheduler computes a
+small ``parish_summary`` (see ``jobs/rollup.py``) whenever that parish's data
+changes and publishes it to the ``RollupStore``, one JSON file per parish
+shared by all processes on the host; the diocese page combines those.
+"""
+import concurrent.futures
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+
+import pandas as pd
+
+from data.decode import PAGE_SIZE
+from data.partitions import hot_filters
+
+PARISH_COLUMN = "parish_id"
+# Roles that see the cross-parish rollup instead of one parish's data
+DIOCESE_ROLES = ('Diocese Leader',)
+
+ROLLUP_DIR = os.path.join(tempfile.gettempdir(), "church_app_parish_rollups")
+SUMMARY_TABLES = ("Attendance", "Activity", "Student", "Class")
+
+
+class ParishClient:
+    """``AsyncSupabase`` restricted to one parish: same methods, scoped reads and writes."""
+
+    def __init__(self, io_client, parish_id):
+        self.io_client = io_client
+        self.parish_id = int(parish_id)
+        self.metrics = io_client.metrics
+
+    def _scoped(self, filters):
+        return {**(filters or {}), PARISH_COLUMN: f"eq.{self.parish_id}"}
+
+    def _stamped(self, records):
+        if isinstance(records, list):
+            return [{**record, PARISH_COLUMN: self.parish_id} for record in records]
+        return {**records, PARISH_COLUMN: self.parish_id}
+
+    # --- Requests (coroutines, as on AsyncSupabase) ---
+    async def fetch_table(self, table, page_size=PAGE_SIZE, filters=None, columns='*'):
+        return await self.io_client.fetch_table(table, page_size, self._scoped(filters), columns)
+
+    async def select(self, table, columns='*', filters=None):
+        return await self.io_client.select(table, columns, self._scoped(filters))
+
+    async def insert(self, table, records):
+        return await self.io_client.insert(table, self._stamped(records))
+
+    async def delete(self, table, **eq):
+        await self.io_client.delete(table, **eq, **{PARISH_COLUMN: self.parish_id})
+
+    async def update(self, table, values, filters):
+        await self.io_client.update(table, values, self._scoped(filters))
+
+    # --- Thread-safe entry points ---
+    def submit(self, coro):
+        return self.io_client.submit(coro)
+
+    def fetch_tables(self, tables, filters=None):
+        filters = filters or {}
+        return self.io_client.fetch_tables(tables, {table: self._scoped(filters.get(table)) for table in tables})
+
+    def submit_fetch(self, table, filters=None, columns='*'):
+        return self.submit(self.fetch_table(table, filters=filters, columns=columns))
+
+    def submit_insert(self, table, records):
+        return self.submit(self.insert(table, records))
+
+    def submit_delete(self, table, **eq):
+        return self.submit(self.delete(table, **eq))
+
+    def cancel_all(self):
+        self.io_client.cancel_all()
+
+
+def parish_directory(base, parish_id):
+    """A parish's own subdirectory of ``base`` (``base`` itself without tenancy)."""
+    return base if parish_id is None else os.path.join(base, f"parish_{int(parish_id)}")
+
+
+class RollupStore:
+    """The latest ``parish_summary`` of every parish, one JSON file each."""
+
+    def __init__(self, directory=ROLLUP_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._cache = {}  # path -> (mtime, summary)
+        self._lock = threading.Lock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="rollup")
+
+    def _path(self, parish_id):
+        return os.path.join(self.directory, f"parish_{int(parish_id)}.json")
+
+    def publish(self, parish_id, summary):
+        payload = {
+            'parish_id': int(parish_id),
+            'computed_at': datetime.now().isoformat(timespec='seconds'),
+            'totals': summary['totals'],
+            'monthly': summary['monthly'].to_dict(orient='records'),
+        }
+        path = self._path(parish_id)
+        tmp_path = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def load(self, parish_id):
+        """The stored summary of ``parish_id`` (``monthly`` as a DataFrame), or None."""
+        path = self._path(parish_id)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        summary = {**payload, 'monthly': pd.DataFrame(payload['monthly'])}
+        with self._lock:
+            self._cache[path] = (mtime, summary)
+        return summary
+
+    def refresh(self, io_client, parish_id, today=None):
+        """Summarize a parish no session has opened yet; the future resolves once it is published.
+
+        The parish's tables are fetched into this worker only and dropped
+        after summarizing; ``io_client`` is the unscoped shared client.
+        """
+        from jobs.rollup import parish_summary
+
+        def _summarize():
+            day = today or date.today()
+            client = ParishClient(io_client, parish_id)
+            frames, _ = client.fetch_tables(SUMMARY_TABLES, {"Attendance": hot_filters(day)}).result(timeout=300)
+            summary = parish_summary(*(frames[table] for table in SUMMARY_TABLES), day)
+            self.publish(parish_id, summary)
+            return summary
+
+        return self._pool.submit(_summarize)
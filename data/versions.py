@@ -0,0 +1,178 @@
+"""Table-level versioning so a mutation refreshes only what it touched.
+
+Every write path bumps the version of the table it changed in a small SQLite
+file shared by all app processes on the host.  On each rerun ``app.py``
+compares those versions with the ones the session was built from and, for
+stale tables only, swaps in a fresh copy from the process-wide
+``SharedTableCache`` and rebuilds the derived structures that depend on them
+(see ``data/derived.py``).  Reading the versions is a single indexed query.
+A store with a ``scope`` (a parish, see ``data/tenancy.py``) keeps its own
+counters in the same file, so one parish's writes never invalidate another's.
+"""
+import concurrent.futures
+import os
+import sqlite3
+import tempfile
+import threading
+
+import pandas as pd
+
+from data import derived
+from data.schema import PRIMARY_KEYS
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "church_app_table_versions.sqlite")
+
+# Session-state key holding each table's DataFrame
+SESSION_KEYS = {
+    "Department": "departments",
+    "Servant": "servants",
+    "Class": "classes",
+    "Student": "students",
+    "Activity": "activities",
+    "Attendance": "attendance",
+}
+
+# Tables the app only ever appends to: refresh by fetching rows past the cached max id
+APPEND_ONLY = {"Attendance"}
+
+
+class VersionStore:
+    """Monotonic per-table version counters persisted in SQLite."""
+
+    def __init__(self, path=DEFAULT_PATH, scope=None):
+        self.path = path
+        self.prefix = f"{scope}/" if scope is not None else ""
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS table_version (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def current(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT name, version FROM table_version").fetchall()
+        if not self.prefix:
+            return {name: version for name, version in rows if "/" not in name}
+        return {name[len(self.prefix):]: version for name, version in rows if name.startswith(self.prefix)}
+
+    def across_scopes(self, table):
+        """Sum of ``table``'s versions in every scope: it changes whenever any scope writes the table."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COALESCE(SUM(version), 0) FROM table_version WHERE name = ? OR name LIKE ?", (table, f"%/{table}")
+            ).fetchone()[0]
+
+    def bump(self, *tables):
+        """Increment the version of each table in ``tables``; returns all current versions."""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO table_version (name, version) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                [(self.prefix + table,) for table in tables]
+            )
+        return self.current()
+
+    def bump_on_success(self, future, *tables):
+        """Bump ``tables`` once ``future`` (a background write) completes without error."""
+        def _done(f):
+            if not f.cancelled() and f.exception() is None:
+                self.bump(*tables)
+        future.add_done_callback(_done)
+        return future
+
+
+class SharedTableCache:
+    """Process-wide ``{table: (version, df)}`` with one in-flight fetch per table version."""
+
+    def __init__(self, io_client, table_filters=None):
+        self.io_client = io_client
+        # table -> callable returning the filters of a full fetch (e.g. the hot Attendance partition)
+        self.table_filters = table_filters or {}
+        self._frames = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def seed(self, frames, versions):
+        with self._lock:
+            for table, df in frames.items():
+                version = versions.get(table, 0)
+                if table not in self._frames or self._frames[table][0] <= version:
+                    self._frames[table] = (version, df)
+
+    def get(self, table, version):
+        """Future resolving to ``table`` at ``version`` (already resolved when cached)."""
+        with self._lock:
+            cached = self._frames.get(table)
+            if cached and cached[0] >= version:
+                done = concurrent.futures.Future()
+                done.set_result(cached[1])
+                return done
+            if (table, version) in self._inflight:
+                return self._inflight[(table, version)]
+            future = self._refresh(table, cached[1] if cached else None)
+            self._inflight[(table, version)] = future
+
+        def _store(f):
+            with self._lock:
+                self._inflight.pop((table, version), None)
+                if not f.cancelled() and f.exception() is None:
+                    if table not in self._frames or self._frames[table][0] < version:
+                        self._frames[table] = (version, f.result())
+        future.add_done_callback(_store)
+        return future
+
+    def _refresh(self, table, cached_df):
+        pk = PRIMARY_KEYS.get(table)
+        filters = self.table_filters[table]() if table in self.table_filters else {}
+        if table in APPEND_ONLY and cached_df is not None and not cached_df.empty and pk in cached_df.columns:
+            # Only fetch the rows appended since the cached copy was taken, within the same window as a full fetch
+            last_id = int(cached_df[pk].max())
+            fetched = self.io_client.submit_fetch(table, filters={**filters, pk: f"gt.{last_id}"})
+            return _then(fetched, lambda result: _append_rows(_within(cached_df, filters), result[0]))
+        return _then(self.io_client.submit_fetch(table, filters=filters or None), lambda result: result[0])
+
+
+def publish_local_change(session_state, table, df):
+    """Publish a table this session already changed in memory after a successful write.
+
+    Bumps the table version (so other sessions and processes refresh it), seeds
+    this process's cache with ``df`` at the new version, and updates the
+    session and its derived structures without refetching.
+    """
+    versions = session_state.table_version_store.bump(table)
+    session_state.table_cache.seed({table: df}, versions)
+    session_state[SESSION_KEYS[table]] = df
+    session_state.table_versions[table] = versions[table]
+    derived.rebuild(session_state, [SESSION_KEYS[table]])
+
+
+def _within(df, filters):
+    """``df`` without the rows a ``gte.`` filter no longer selects (rows that aged out of a window)."""
+    for column, condition in filters.items():
+        if column in df.columns and isinstance(condition, str) and condition.startswith("gte."):
+            keep = pd.to_datetime(df[column]) >= pd.Timestamp(condition[len("gte."):])
+            if not keep.all():
+                df = df[keep].reset_index(drop=True)
+    return df
+
+
+def _append_rows(df, new_rows):
+    return pd.concat([df, new_rows], ignore_index=True) if not new_rows.empty else df
+
+
+def _then(source, transform):
+    """A future resolving to ``transform(source.result())``."""
+    target = concurrent.futures.Future()
+
+    def _done(f):
+        if f.cancelled():
+            target.cancel()
+        elif f.exception() is not None:
+            target.set_exception(f.exception())
+        else:
+            try:
+                target.set_result(transform(f.result()))
+            except Exception as e:
+                target.set_exception(e)
+    source.add_done_callback(_done)
+    return target
@@ -0,0 +1 @@
+"""Background precomputation of the heavier analytics datasets."""
@@ -0,0 +1,125 @@
+"""Sudden attendance drops per class and activity, detected incrementally.
+
+``WeeklyAnomalyDetector`` keeps a rolling window of weekly attendance counts
+for every (class, activity) series: ``BASELINE_WEEKS`` of baseline followed
+by the ``RECENT_WEEKS`` just completed (the week in progress is counted but
+not scored).  Updates are incremental: only rows
+with an ``attendance_id`` larger than the last one seen are counted into the
+window (Attendance is append-only), and when a new week completes the window
+shifts left instead of being rebuilt from the history.
+
+A series is flagged when its recent weekly mean is at least ``MIN_DROP``
+below the baseline mean and the drop is significant: the z-score of the
+recent mean against the baseline (standard error ``std / sqrt(RECENT_WEEKS)``)
+is below ``-Z_THRESHOLD``.  All series are scored in one array pass.
+
+A detector holds the state of one Attendance table, so each scheduler (one
+per parish) owns its own (see ``scheduler_jobs`` in ``jobs/precompute.py``);
+without one, ``attendance_anomalies`` counts the given rows into a fresh
+detector and shares nothing.
+"""
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from jobs.streaks import WEEK_ORIGIN, week_number
+
+BASELINE_WEEKS = 8
+RECENT_WEEKS = 3
+MIN_DROP = 0.4
+Z_THRESHOLD = 2.0
+MIN_BASELINE = 3.0  # weekly attendance below this is too small to judge
+
+
+class WeeklyAnomalyDetector:
+    """Rolling weekly counts per (class, activity), updated with new rows only."""
+
+    def __init__(self, baseline_weeks=BASELINE_WEEKS, recent_weeks=RECENT_WEEKS):
+        self.baseline_weeks = baseline_weeks
+        self.recent_weeks = recent_weeks
+        self.window = baseline_weeks + recent_weeks
+        self._series = {}  # (class_id, activity_id) -> row
+        # One extra column for the week in progress, counted but not scored until it completes
+        self.counts = np.zeros((0, self.window + 1), dtype=np.int64)
+        self.current_week = None
+        self.last_id = 0
+        self._lock = threading.Lock()
+
+    def _advance(self, current_week):
+        if self.current_week is not None and current_week > self.current_week:
+            shift = min(current_week - self.current_week, self.window + 1)
+            self.counts = np.concatenate(
+                [self.counts[:, shift:], np.zeros((len(self.counts), shift), dtype=np.int64)], axis=1
+            )
+        self.current_week = current_week
+
+    def update(self, attendance, today):
+        """Count the rows added since the last update into the window ending this week."""
+        today = today or date.today()
+        with self._lock:
+            if not attendance.empty and int(attendance['attendance_id'].max()) < self.last_id:
+                # A different (or rebuilt) table: start over
+                self.__init__(self.baseline_weeks, self.recent_weeks)
+            self._advance(int(week_number(pd.Series([today]))[0]))
+            if attendance.empty:
+                return
+            new_rows = attendance[attendance['attendance_id'] > self.last_id]
+            if new_rows.empty:
+                return
+            self.last_id = int(new_rows['attendance_id'].max())
+            columns = week_number(new_rows['attendance_date']) - (self.current_week - self.window)
+            in_window = (columns >= 0) & (columns <= self.window)
+            new_rows, columns = new_rows[in_window], columns[in_window]
+
+            keys = list(zip(new_rows['class_id'].astype(int), new_rows['activity_id'].astype(int)))
+            for key in dict.fromkeys(keys):
+                if key not in self._series:
+                    self._series[key] = len(self._series)
+            if len(self._series) > len(self.counts):
+                grow = np.zeros((len(self._series) - len(self.counts), self.window + 1), dtype=np.int64)
+                self.counts = np.concatenate([self.counts, grow])
+            rows = np.fromiter((self._series[key] for key in keys), dtype=np.int64, count=len(keys))
+            np.add.at(self.counts, (rows, columns), 1)
+
+    def scores(self, min_drop=MIN_DROP, z_threshold=Z_THRESHOLD, min_baseline=MIN_BASELINE):
+        """Baseline, recent mean, change and z-score of every series, with a ``flagged`` column."""
+        with self._lock:
+            counts = self.counts[:, :self.window].astype(float)
+            keys = list(self._series)
+            current_week = self.current_week
+        columns = ['class_id', 'activity_id', 'baseline', 'recent', 'change_pct', 'z_score', 'flagged', 'recent_from']
+        if not keys:
+            return pd.DataFrame(columns=columns)
+        baseline, recent = counts[:, :self.baseline_weeks], counts[:, self.baseline_weeks:]
+        baseline_mean = baseline.mean(axis=1)
+        # A floor of 1 on the spread keeps perfectly flat baselines from producing huge z-scores
+        standard_error = np.maximum(baseline.std(axis=1, ddof=1), 1.0) / np.sqrt(self.recent_weeks)
+        recent_mean = recent.mean(axis=1)
+        change = np.divide(recent_mean - baseline_mean, baseline_mean, out=np.zeros_like(baseline_mean), where=baseline_mean > 0)
+        z_score = (recent_mean - baseline_mean) / standard_error
+        flagged = (baseline_mean >= min_baseline) & (change <= -min_drop) & (z_score <= -z_threshold)
+
+        recent_from = pd.Timestamp(WEEK_ORIGIN) + timedelta(weeks=current_week - self.recent_weeks)
+        return pd.DataFrame({
+            'class_id': [class_id for class_id, _ in keys],
+            'activity_id': [activity_id for _, activity_id in keys],
+            'baseline': baseline_mean.round(1),
+            'recent': recent_mean.round(1),
+            'change_pct': (change * 100).round(1),
+            'z_score': z_score.round(2),
+            'flagged': flagged,
+            'recent_from': recent_from,
+        })
+
+
+def attendance_anomalies(attendance, today=None, detector=None):
+    """Scores of every (class, activity) series (flagged drops first).
+
+    With ``detector``, only the rows it has not seen are counted into it;
+    otherwise the whole table is counted into a new one.
+    """
+    detector = detector if detector is not None else WeeklyAnomalyDetector()
+    detector.update(attendance, today)
+    return detector.scores().sort_values(['flagged', 'change_pct'], ascending=[False, True], ignore_index=True)
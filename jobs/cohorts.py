@@ -0,0 +1,72 @@
+"""Cohort retention: of the students first seen in a month, who still attends later.
+
+A student's cohort is the month of their first recorded attendance, over the
+whole history: the hot partition's (student, month) presence is combined with
+the archived years' monthly aggregates (see ``data/partitions.py``).  The
+retention for offset *k* is the share of a cohort's students with at least one
+attendance *k* months after their first month.  Everything is computed from
+integer month indexes with one group-by, so scopes of any size take
+milliseconds once the presence pairs exist.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _month_index(dates):
+    dates = pd.to_datetime(dates)
+    return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+
+
+def monthly_presence(attendance, today=None):
+    """Unique (student_id, month_index) pairs of ``attendance``; months count from year 0."""
+    if attendance.empty:
+        return pd.DataFrame({'student_id': pd.Series(dtype='int64'), 'month_index': pd.Series(dtype='int64')})
+    return pd.DataFrame({
+        'student_id': attendance['student_id'].to_numpy(dtype=np.int64),
+        'month_index': _month_index(attendance['attendance_date']),
+    }).drop_duplicates(ignore_index=True)
+
+
+def with_archived_presence(presence, aggregates):
+    """``presence`` extended with the months in the archived years' ``aggregates``."""
+    if aggregates.empty:
+        return presence
+    archived = pd.DataFrame({
+        'student_id': aggregates['student_id'].to_numpy(dtype=np.int64),
+        'month_index': _month_index(aggregates['month']),
+    })
+    return pd.concat([archived, presence], ignore_index=True).drop_duplicates(ignore_index=True)
+
+
+def month_label(month_index):
+    return f"{month_index // 12}-{month_index % 12 + 1:02d}"
+
+
+def cohort_retention(presence, student_ids, current_month_index, max_offset=12):
+    """Return ``(sizes, retention)`` for the students in ``student_ids``.
+
+    ``sizes`` is the number of students per cohort; ``retention`` has one row
+    per cohort (labelled ``YYYY-MM``) and one column per offset 0..max_offset,
+    in percent.  Offsets that lie in the future for a cohort are NaN.
+    """
+    scoped = presence[presence['student_id'].isin(student_ids)]
+    if scoped.empty:
+        return pd.Series(dtype='int64'), pd.DataFrame(columns=range(max_offset + 1), dtype='float64')
+    first_month = scoped.groupby('student_id')['month_index'].transform('min').to_numpy()
+    offsets = scoped['month_index'].to_numpy() - first_month
+    in_range = offsets <= max_offset
+
+    counts = (
+        pd.DataFrame({'cohort': first_month[in_range], 'offset': offsets[in_range]})
+        .groupby(['cohort', 'offset']).size()
+        .unstack('offset', fill_value=0)
+        .reindex(columns=range(max_offset + 1), fill_value=0)
+    )
+    sizes = counts[0]
+    retention = counts.div(sizes, axis=0) * 100
+    # Months a cohort has not reached yet are unknown, not zero
+    observable = (current_month_index - counts.index.to_numpy())[:, None] >= np.arange(max_offset + 1)[None, :]
+    retention = retention.where(observable).round(1)
+    labels = [month_label(cohort) for cohort in counts.index]
+    retention.index, sizes.index = labels, labels
+    return sizes, retention
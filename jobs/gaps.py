@@ -0,0 +1,76 @@
+"""Sessions a class should have recorded but did not.
+
+When a servant forgets to submit attendance, the whole class looks absent for
+that session.  The expected calendar is derived from the recordings
+themselves: a core activity was *held* on a day when at least
+``MIN_CLASS_SHARE`` of the classes that take part in it recorded it that day.
+A class takes part in an activity from the first day it recorded it.  Every
+held session of a participating class that has no recorded row is a gap.
+
+Recorded sessions are looked up in ``SessionIndex`` (see ``jobs/sessions.py``),
+so membership tests for any number of expected sessions are a single
+``searchsorted``.  Everything else is array arithmetic and one merge, which
+keeps the whole church over several years to a fraction of a second.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from jobs.sessions import SessionIndex, day_number, unpack
+
+MIN_CLASS_SHARE = 0.5
+
+
+def missing_sessions(attendance, activities, classes, today=None):
+    """Every held core session before ``today`` that a participating class did not record.
+
+    Returns ``class_id``, ``activity_id`` and ``session_date``, newest first.
+    """
+    today = today or date.today()
+    columns = ['class_id', 'activity_id', 'session_date']
+    if attendance.empty or activities.empty or classes.empty:
+        return pd.DataFrame(columns=columns)
+    index = SessionIndex(attendance)
+    class_ids, activity_ids, days = unpack(index.keys)
+    core_ids = activities.loc[activities['activity_type'] == 'Core', 'activity_id'].to_numpy(dtype=np.int64)
+    in_scope = (
+        np.isin(activity_ids, core_ids)
+        & np.isin(class_ids, classes['class_id'].to_numpy(dtype=np.int64))
+        & (days < day_number(pd.Series([today]))[0])
+    )
+    sessions = pd.DataFrame({'class_id': class_ids[in_scope], 'activity_id': activity_ids[in_scope], 'day': days[in_scope]})
+    if sessions.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Keys are sorted by class, activity, then day: the first row of each pair is where it starts
+    participants = sessions.drop_duplicates(['class_id', 'activity_id']).rename(columns={'day': 'first_day'})
+
+    # Held: recorded by enough of the classes already taking part on that day
+    recorded = sessions.groupby(['activity_id', 'day']).size().rename('recorded').reset_index()
+    recorded['eligible'] = 0
+    for activity_id, starts in participants.groupby('activity_id')['first_day']:
+        rows = recorded['activity_id'] == activity_id
+        recorded.loc[rows, 'eligible'] = np.searchsorted(np.sort(starts.to_numpy()), recorded.loc[rows, 'day'].to_numpy(), side='right')
+    held = recorded.loc[recorded['recorded'] >= MIN_CLASS_SHARE * recorded['eligible'], ['activity_id', 'day']]
+
+    expected = held.merge(participants, on='activity_id')
+    expected = expected[expected['day'] >= expected['first_day']]
+    missing = expected[~index.contains(expected['class_id'], expected['activity_id'], expected['day'])]
+    return pd.DataFrame({
+        'class_id': missing['class_id'].to_numpy(),
+        'activity_id': missing['activity_id'].to_numpy(),
+        'session_date': missing['day'].to_numpy().astype('datetime64[D]').astype('datetime64[ns]'),
+    }).sort_values(['session_date', 'class_id', 'activity_id'], ascending=[False, True, True], ignore_index=True)
+
+
+def gap_counts(gaps, start=None, end=None, activity_ids=None):
+    """Number of missing sessions per class, optionally within ``[start, end]`` and for some activities."""
+    rows = pd.Series(True, index=gaps.index)
+    if start is not None:
+        rows &= gaps['session_date'] >= pd.Timestamp(start)
+    if end is not None:
+        rows &= gaps['session_date'] <= pd.Timestamp(end)
+    if activity_ids is not None:
+        rows &= gaps['activity_id'].isin(activity_ids)
+    return gaps[rows].groupby('class_id').size()
@@ -0,0 +1,151 @@
+"""Derived datasets precomputed by the scheduler, with a live fallback for pages.
+
+Pages call ``get_or_compute(name, st.session_state)``: when the scheduler holds
+a result stamped with the same table versions (and date) as the session's
+data it is returned as is, otherwise the dataset is computed live from the
+session's tables.
+"""
+from dataclasses import replace
+from datetime import date, datetime, time, timedelta
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from data.partitions import academic_year, year_start
+from data.search import name_index
+from data.versions import SESSION_KEYS
+from jobs.anomalies import WeeklyAnomalyDetector, attendance_anomalies
+from jobs.cohorts import monthly_presence
+from jobs.gaps import missing_sessions
+from jobs.risk import risk_scores
+from jobs.scheduler import Job
+from jobs.sessions import participation_rates, session_calendar
+from jobs.streaks import attendance_streaks
+
+MONTH_FORMAT = '%Y-%B'  # the month label used across the pages
+
+
+def month_labels(dates):
+    """The ``MONTH_FORMAT`` label of every date; each distinct month is formatted once."""
+    months = pd.to_datetime(dates).to_numpy().astype('datetime64[M]')
+    unique, inverse = np.unique(months, return_inverse=True)
+    labels = pd.DatetimeIndex(unique).strftime(MONTH_FORMAT).to_numpy(dtype=object)
+    return pd.Series(labels[inverse], index=dates.index, name='month_year')
+
+
+def last_seen_by_activity(attendance, today=None):
+    """Last attendance date per (student, activity): the input of the risk rules."""
+    if attendance.empty:
+        return pd.DataFrame(columns=['student_id', 'activity_id', 'attendance_date'])
+    dates = pd.to_datetime(attendance['attendance_date'])
+    return dates.groupby([attendance['student_id'], attendance['activity_id']]).max().reset_index()
+
+
+def leaderboard_counts(attendance, today):
+    """Attendance count per student for each leaderboard time period."""
+    if attendance.empty:
+        return pd.DataFrame(columns=['student_id', 'This Month', 'Last 30 Days', 'Last 90 Days', 'This Academic Year'])
+    dates = pd.to_datetime(attendance['attendance_date'])
+    # Windows are anchored at midnight so a result stays valid for the whole day
+    now = datetime.combine(today, time.min)
+    windows = {
+        'This Month': dates >= pd.Timestamp(today.replace(day=1)),
+        'Last 30 Days': dates >= now - timedelta(days=30),
+        'Last 90 Days': dates >= now - timedelta(days=90),
+        'This Academic Year': dates >= pd.Timestamp(year_start(academic_year(today))),
+    }
+    counts = pd.DataFrame({name: mask.astype('int32') for name, mask in windows.items()})
+    return counts.groupby(attendance['student_id'].to_numpy()).sum().rename_axis('student_id').reset_index()
+
+
+def monthly_cube(attendance, today=None):
+    """Attendance count per (month, class, activity)."""
+    if attendance.empty:
+        return pd.DataFrame(columns=['month_year', 'class_id', 'activity_id', 'attendance_count'])
+    months = month_labels(attendance['attendance_date'])
+    return (
+        attendance.groupby([months, attendance['class_id'], attendance['activity_id']])
+        .size().reset_index(name='attendance_count')
+    )
+
+
+def student_month_totals(attendance, today=None):
+    """Total attendance per (month, student): the input of target attainment."""
+    if attendance.empty:
+        return pd.Series(dtype='int64')
+    months = month_labels(attendance['attendance_date'])
+    return attendance.groupby([months, attendance['student_id']]).size()
+
+
+# --- Archived academic years (from their precomputed aggregates) ---
+def archived_last_seen(last_seen, aggregates):
+    """``last_seen_by_activity`` extended with the last dates of archived years."""
+    if aggregates.empty:
+        return last_seen
+    archived = aggregates.groupby(['student_id', 'activity_id'])['last_seen'].max().rename('attendance_date').reset_index()
+    combined = pd.concat([archived, last_seen], ignore_index=True)
+    combined['attendance_date'] = pd.to_datetime(combined['attendance_date'])
+    return combined.groupby(['student_id', 'activity_id'])['attendance_date'].max().reset_index()
+
+
+def archived_student_counts(aggregates):
+    """Attendance count per student over the archived years in ``aggregates``."""
+    if aggregates.empty:
+        return pd.Series(dtype='int64', name='attendance_count')
+    return aggregates.groupby('student_id')['attendance_count'].sum()
+
+
+def archived_monthly_cube(aggregates):
+    """``monthly_cube`` rows for the archived years in ``aggregates``."""
+    if aggregates.empty:
+        return pd.DataFrame(columns=['month_year', 'class_id', 'activity_id', 'attendance_count'])
+    months = month_labels(aggregates['month'])
+    return (
+        aggregates.groupby([months, aggregates['class_id'], aggregates['activity_id']])['attendance_count']
+        .sum().reset_index()
+    )
+
+
+JOBS = [
+    Job('last_seen_by_activity', ('Attendance',), last_seen_by_activity),
+    Job('leaderboard_counts', ('Attendance',), leaderboard_counts, date_relative=True),
+    Job('monthly_cube', ('Attendance',), monthly_cube),
+    Job('student_month_totals', ('Attendance',), student_month_totals),
+    Job('monthly_presence', ('Attendance',), monthly_presence),
+    Job('attendance_streaks', ('Attendance', 'Activity'), attendance_streaks, date_relative=True),
+    Job('attendance_anomalies', ('Attendance',), attendance_anomalies, date_relative=True),
+    Job('session_calendar', ('Attendance',), session_calendar),
+    Job('participation_rates', ('Attendance', 'Student'), participation_rates),
+    Job('missing_sessions', ('Attendance', 'Activity', 'Class'), missing_sessions, date_relative=True),
+    Job('risk_scores', ('Attendance', 'Activity', 'Student'), risk_scores, date_relative=True),
+    Job('name_index', ('Student', 'Servant', 'Class', 'Department'), name_index),
+]
+JOBS_BY_NAME = {job.name: job for job in JOBS}
+
+
+def scheduler_jobs():
+    """``JOBS`` for one ``Scheduler``, with incremental state of its own.
+
+    The anomaly detector counts one Attendance table; a scheduler per parish
+    gets a detector per parish, and the live fallback below none at all.
+    """
+    detector = WeeklyAnomalyDetector()
+    return [
+        replace(job, compute=partial(attendance_anomalies, detector=detector))
+        if job.name == 'attendance_anomalies' else job
+        for job in JOBS
+    ]
+
+
+def get_or_compute(name, session_state):
+    """The scheduler's result for ``name`` if it matches the session's data, else a live computation."""
+    job = JOBS_BY_NAME[name]
+    today = date.today()
+    scheduler = session_state.get('scheduler')
+    if scheduler is not None:
+        value = scheduler.lookup(name, job.stamp(session_state.table_versions, today))
+        if value is not None:
+            return value
+    frames = [session_state[SESSION_KEYS[table]] for table in job.tables]
+    return job.compute(*frames, today)
@@ -0,0 +1,129 @@
+"""Disengagement-risk scores from per-student attendance features.
+
+Complements the fixed day thresholds of the "Students at Risk" page: a
+student whose attendance is thinning out scores high well before the
+thresholds fire.  ``student_features`` builds every feature for the whole
+church in one pass over the last ``HISTORY_WEEKS`` weeks: a (student, week)
+count matrix, plus one for core activities, from which recency, frequency,
+trend, variance and the core/selective mix follow with array operations.
+
+The model is a logistic regression over the standardized features.  It is
+trained offline by ``tools/train_risk_model.py`` (label: no core attendance in
+the ``LABEL_WEEKS`` weeks after the scoring date) and stored as JSON next to
+this module, so scoring needs nothing but numpy.
+"""
+import json
+import os
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+HISTORY_WEEKS = 12
+RECENT_WEEKS = 4
+LABEL_WEEKS = 8
+MAX_DAYS = 365  # recency cap, also used for students never seen
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_model.json")
+
+FEATURES = [
+    'days_since_last', 'recent_rate', 'prior_rate', 'trend',
+    'weekly_std', 'weeks_attended', 'core_share', 'selective_rate',
+]
+
+
+def _core_ids(activities):
+    if activities.empty:
+        return np.empty(0, dtype=np.int64)
+    return activities.loc[activities['activity_type'] == 'Core', 'activity_id'].to_numpy(dtype=np.int64)
+
+
+def student_features(attendance, activities, student_ids, as_of):
+    """One row of ``FEATURES`` per student in ``student_ids``, from attendance up to ``as_of`` (inclusive)."""
+    student_ids = np.asarray(student_ids, dtype=np.int64)
+    as_of = pd.Timestamp(as_of)
+    counts = np.zeros((len(student_ids), HISTORY_WEEKS))
+    core = np.zeros_like(counts)
+    days_since_last = np.full(len(student_ids), float(MAX_DAYS))
+
+    if not attendance.empty and len(student_ids):
+        dates = pd.to_datetime(attendance['attendance_date'])
+        rows = attendance[(dates <= as_of) & attendance['student_id'].isin(student_ids)]
+        dates = dates[rows.index]
+        order = np.argsort(student_ids)
+        positions = order[np.searchsorted(student_ids, rows['student_id'].to_numpy(dtype=np.int64), sorter=order)]
+        days_ago = (as_of - dates).dt.days.to_numpy()
+
+        last = np.full(len(student_ids), MAX_DAYS, dtype=np.int64)
+        np.minimum.at(last, positions, np.minimum(days_ago, MAX_DAYS))
+        days_since_last = last.astype(float)
+
+        weeks_ago = days_ago // 7
+        recent = weeks_ago < HISTORY_WEEKS
+        cells = positions[recent] * HISTORY_WEEKS + weeks_ago[recent]
+        counts = np.bincount(cells, minlength=counts.size).reshape(counts.shape).astype(float)
+        is_core = np.isin(rows['activity_id'].to_numpy(dtype=np.int64), _core_ids(activities))[recent]
+        core = np.bincount(cells[is_core], minlength=core.size).reshape(core.shape).astype(float)
+
+    # Column k holds the week ending k weeks before ``as_of``
+    total = counts.sum(axis=1)
+    recent_rate = counts[:, :RECENT_WEEKS].mean(axis=1)
+    prior_rate = counts[:, RECENT_WEEKS:].mean(axis=1)
+    return pd.DataFrame({
+        'days_since_last': days_since_last,
+        'recent_rate': recent_rate,
+        'prior_rate': prior_rate,
+        'trend': recent_rate - prior_rate,
+        'weekly_std': counts.std(axis=1),
+        'weeks_attended': (counts > 0).mean(axis=1),
+        'core_share': np.divide(core.sum(axis=1), total, out=np.zeros(len(total)), where=total > 0),
+        'selective_rate': (counts - core).mean(axis=1),
+    }, index=pd.Index(student_ids, name='student_id'))
+
+
+@dataclass
+class RiskModel:
+    """Logistic regression over standardized ``FEATURES``."""
+    mean: np.ndarray
+    scale: np.ndarray
+    weights: np.ndarray
+    bias: float
+    metadata: dict
+
+    def score(self, features):
+        """Probability of disengagement for each row of ``features``."""
+        x = (features[FEATURES].to_numpy(dtype=float) - self.mean) / self.scale
+        return 1.0 / (1.0 + np.exp(-(x @ self.weights + self.bias)))
+
+    def save(self, path=MODEL_PATH):
+        model = {
+            'features': FEATURES, 'mean': self.mean.tolist(), 'scale': self.scale.tolist(),
+            'weights': self.weights.tolist(), 'bias': self.bias, 'metadata': self.metadata,
+        }
+        with open(path, 'w') as f:
+            json.dump(model, f, indent=2)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with open(path) as f:
+            model = json.load(f)
+        if model['features'] != FEATURES:
+            raise ValueError(f"{path} was trained on other features; retrain it with tools/train_risk_model.py")
+        return cls(
+            np.array(model['mean']), np.array(model['scale']), np.array(model['weights']),
+            float(model['bias']), model.get('metadata', {}),
+        )
+
+
+@lru_cache(maxsize=None)
+def load_model(path=MODEL_PATH):
+    return RiskModel.load(path)
+
+
+def risk_scores(attendance, activities, students, today=None):
+    """Features and risk score (0-1) of every student, highest risk first."""
+    today = today or date.today()
+    features = student_features(attendance, activities, students['student_id'], today)
+    features['risk_score'] = load_model().score(features)
+    return features.sort_values('risk_score', ascending=False).reset_index()
@@ -0,0 +1,93 @@
+"""Per-parish summaries for the diocese rollup, and combining them.
+
+``parish_summary`` runs as a scheduler job in every parish (see
+``data/tenancy.py``): the attendance count and the number of active students
+per (month, activity) of the current academic year, plus head counts.  A
+student belongs to one parish, so the counts of different parishes never
+overlap: diocese figures are plain sums of the parishes' figures, and rates
+are recomputed from those sums rather than averaged.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from data.partitions import academic_year, current_year_rows, year_label
+from data.tenancy import SUMMARY_TABLES
+from jobs.scheduler import Job
+
+ALL_ACTIVITIES = "All Activities"
+MONTHLY_COLUMNS = ['month', 'activity_name', 'attendance_count', 'active_students']
+
+
+def parish_summary(attendance, activities, students, classes, today=None):
+    """``{'monthly': DataFrame, 'totals': dict}`` of one parish's current academic year.
+
+    ``monthly`` has ``MONTHLY_COLUMNS`` (``month`` as ``YYYY-MM``), with an
+    ``ALL_ACTIVITIES`` row per month counting each student once.
+    """
+    today = today or date.today()
+    totals = {
+        'students': int(len(students)), 'classes': int(len(classes)),
+        'academic_year': year_label(academic_year(today)),
+    }
+    rows = current_year_rows(attendance, today) if not attendance.empty else attendance
+    if rows.empty:
+        return {'monthly': pd.DataFrame(columns=MONTHLY_COLUMNS), 'totals': totals}
+    months = pd.Series(
+        pd.to_datetime(rows['attendance_date']).to_numpy().astype('datetime64[M]').astype(str), index=rows.index, name='month'
+    )
+    names = rows['activity_id'].map(activities.set_index('activity_id')['activity_name']).astype(str).rename('activity_name')
+    students_seen = rows['student_id']
+    by_activity = students_seen.groupby([months, names]).agg(attendance_count='size', active_students='nunique')
+    overall = students_seen.groupby(months).agg(attendance_count='size', active_students='nunique')
+    overall = overall.assign(activity_name=ALL_ACTIVITIES).set_index('activity_name', append=True)
+    monthly = pd.concat([by_activity, overall]).reset_index()[MONTHLY_COLUMNS]
+    monthly[['attendance_count', 'active_students']] = monthly[['attendance_count', 'active_students']].astype(np.int64)
+    return {'monthly': monthly, 'totals': totals}
+
+
+# Added to each parish's scheduler by app.py; date-relative because the academic year rolls over
+PARISH_SUMMARY_JOB = Job('parish_summary', SUMMARY_TABLES, parish_summary, date_relative=True)
+
+
+def combine_summaries(summaries, parish_names, month=None):
+    """``(per_parish, diocese_monthly, month)`` from ``{parish_id: summary}``.
+
+    ``per_parish`` has one row per parish with its head counts, its
+    attendance this academic year and its active students and participation
+    rate in ``month`` (default: the latest month any parish recorded).
+    ``diocese_monthly`` sums every parish's ``monthly`` rows.
+    """
+    frames = [
+        summary['monthly'].assign(parish_id=parish_id) for parish_id, summary in summaries.items()
+        if not summary['monthly'].empty
+    ]
+    monthly = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=MONTHLY_COLUMNS + ['parish_id'])
+    overall = monthly[monthly['activity_name'] == ALL_ACTIVITIES]
+    if month is None and not overall.empty:
+        month = overall['month'].max()
+    in_month = overall[overall['month'] == month].set_index('parish_id')
+    year_totals = overall.groupby('parish_id')['attendance_count'].sum()
+
+    per_parish = pd.DataFrame([
+        {
+            'parish_id': parish_id,
+            'parish_name': parish_names.get(parish_id, f"Parish {parish_id}"),
+            'students': summary['totals']['students'],
+            'classes': summary['totals']['classes'],
+            'attendance_this_year': int(year_totals.get(parish_id, 0)),
+            'active_students': int(in_month['active_students'].get(parish_id, 0)),
+            'computed_at': summary.get('computed_at'),
+        }
+        for parish_id, summary in summaries.items()
+    ], columns=['parish_id', 'parish_name', 'students', 'classes', 'attendance_this_year', 'active_students', 'computed_at'])
+    per_parish['participation_rate'] = (
+        100 * per_parish['active_students'] / per_parish['students'].where(per_parish['students'] > 0)
+    ).round(1)
+
+    diocese_monthly = (
+        monthly.groupby(['month', 'activity_name'])[['attendance_count', 'active_students']].sum().reset_index()
+        if not monthly.empty else pd.DataFrame(columns=MONTHLY_COLUMNS)
+    )
+    return per_parish, diocese_monthly, month
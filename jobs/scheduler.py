@@ -0,0 +1,146 @@
+"""A small background scheduler for version-stamped derived datasets.
+
+Each job declares the tables it reads and whether its result depends on the
+current date.  Its *stamp* is the versions of those tables (see
+``data/versions.py``) plus today's date for date-relative jobs.  A daemon
+thread polls the version store and reruns a job whenever its stamp changes,
+i.e. after a write to one of its tables and once a night for date-relative
+jobs.  Timing and failures of every run are kept for the admin panel.
+"""
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    tables: tuple
+    compute: object  # callable(*frames, today) -> value
+    date_relative: bool = False
+
+    def stamp(self, versions, today):
+        table_versions = tuple((table, versions.get(table, 0)) for table in self.tables)
+        return table_versions + ((('date', today.isoformat()),) if self.date_relative else ())
+
+
+@dataclass
+class Result:
+    stamp: tuple
+    value: object
+    computed_at: datetime
+    seconds: float
+
+
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    last_seconds: float = None
+    total_seconds: float = 0.0
+    last_run: datetime = None
+    last_error: str = None
+    history: list = field(default_factory=list)
+
+
+class Scheduler:
+    """Runs ``jobs`` in a daemon thread whenever their stamp changes.
+
+    ``load_table(table, version)`` must return the DataFrame of ``table`` at
+    ``version`` (e.g. from ``SharedTableCache``).  ``on_result(name, value)``,
+    if given, is called after every successful run (e.g. to publish it).
+    """
+
+    def __init__(self, jobs, version_store, load_table, poll_seconds=5.0, on_result=None):
+        self.jobs = {job.name: job for job in jobs}
+        self.version_store = version_store
+        self.load_table = load_table
+        self.on_result = on_result
+        self.poll_seconds = poll_seconds
+        self.results = {}
+        self.stats = {name: JobStats() for name in self.jobs}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="precompute-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self):
+        """Check for stale jobs now instead of waiting for the next poll."""
+        self._wake.set()
+
+    def lookup(self, name, stamp):
+        """The stored value of ``name`` if it was computed for ``stamp``, else None."""
+        result = self.results.get(name)
+        return result.value if result is not None and result.stamp == stamp else None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def run_pending(self):
+        """Run every job whose stamp differs from its stored result."""
+        try:
+            versions = self.version_store.current()
+        except Exception:
+            return
+        today = date.today()
+        for job in self.jobs.values():
+            stamp = job.stamp(versions, today)
+            current = self.results.get(job.name)
+            if current is None or current.stamp != stamp:
+                self.run_job(job, versions, today, stamp)
+
+    def run_job(self, job, versions, today, stamp):
+        stats = self.stats[job.name]
+        started = time.perf_counter()
+        try:
+            frames = [self.load_table(table, versions.get(table, 0)) for table in job.tables]
+            value = job.compute(*frames, today)
+        except Exception:
+            stats.failures += 1
+            stats.last_error = traceback.format_exc(limit=3)
+            return
+        finally:
+            seconds = time.perf_counter() - started
+            stats.runs += 1
+            stats.last_seconds = seconds
+            stats.total_seconds += seconds
+            stats.last_run = datetime.now()
+            stats.history = (stats.history + [seconds])[-50:]
+        self.results[job.name] = Result(stamp, value, datetime.now(), seconds)
+        if self.on_result is not None:
+            try:
+                self.on_result(job.name, value)
+            except Exception:
+                stats.last_error = traceback.format_exc(limit=3)
+
+    def metrics(self):
+        """One row per job: runs, failures and timings."""
+        return pd.DataFrame([
+            {
+                'job': name,
+                'runs': s.runs,
+                'failures': s.failures,
+                'last_ms': round(s.last_seconds * 1000, 1) if s.last_seconds is not None else None,
+                'mean_ms': round(s.total_seconds / s.runs * 1000, 1) if s.runs else None,
+                'last_run': s.last_run,
+                'fresh_since': self.results[name].computed_at if name in self.results else None,
+                'last_error': s.last_error.strip().splitlines()[-1] if s.last_error else None,
+            }
+            for name, s in self.stats.items()
+        ])
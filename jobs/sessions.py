@@ -0,0 +1,119 @@
+"""The session calendar: when each activity was held for each class.
+
+A session is a (class, activity, day) with attendance recorded.
+``SessionIndex`` keeps the calendar as one sorted array of unique int64 keys
+that pack the three values, so building it is a single ``np.unique`` and
+looking sessions up is a ``searchsorted``.
+
+Participation rates divide attendance by what was possible:
+``attended / (enrolled x sessions held)`` per (month, class, activity), so a
+class that met five times in a month is not five times more engaged than one
+that met once.  Enrollment is the current class size, the only one the
+schema keeps.  Sessions a class did not record are not in the calendar (see
+``jobs/gaps.py``), so they count neither as held nor as absences.
+"""
+import numpy as np
+import pandas as pd
+
+DAY_BITS = 20  # days since 1970: enough for about 2,800 years
+ACTIVITY_BITS = 16
+
+
+def day_number(dates):
+    """Days since 1970-01-01 of each date."""
+    return pd.to_datetime(dates).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def pack(class_ids, activity_ids, days):
+    """The int64 key of each (class, activity, day)."""
+    return (
+        (np.asarray(class_ids, dtype=np.int64) << (ACTIVITY_BITS + DAY_BITS))
+        | (np.asarray(activity_ids, dtype=np.int64) << DAY_BITS)
+        | np.asarray(days, dtype=np.int64)
+    )
+
+
+def unpack(keys):
+    """``(class_ids, activity_ids, days)`` of packed keys."""
+    return (
+        keys >> (ACTIVITY_BITS + DAY_BITS),
+        (keys >> DAY_BITS) & ((1 << ACTIVITY_BITS) - 1),
+        keys & ((1 << DAY_BITS) - 1),
+    )
+
+
+class SessionIndex:
+    """Sorted unique (class, activity, day) keys of the recorded sessions."""
+
+    def __init__(self, attendance):
+        if attendance.empty:
+            self.keys = np.empty(0, dtype=np.int64)
+            return
+        self.keys = np.unique(pack(
+            attendance['class_id'].to_numpy(dtype=np.int64),
+            attendance['activity_id'].to_numpy(dtype=np.int64),
+            day_number(attendance['attendance_date']),
+        ))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def contains(self, class_ids, activity_ids, days):
+        """Whether each (class, activity, day) has at least one recorded row."""
+        keys = pack(class_ids, activity_ids, days)
+        positions = np.minimum(np.searchsorted(self.keys, keys), max(len(self.keys) - 1, 0))
+        return (self.keys[positions] == keys) if len(self.keys) else np.zeros(len(keys), dtype=bool)
+
+
+def session_calendar(attendance, today=None):
+    """One row per session held: ``class_id``, ``activity_id``, ``session_date``."""
+    class_ids, activity_ids, days = unpack(SessionIndex(attendance).keys)
+    return pd.DataFrame({
+        'class_id': class_ids,
+        'activity_id': activity_ids,
+        'session_date': days.astype('datetime64[D]').astype('datetime64[ns]'),
+    })
+
+
+def sessions_held(calendar, start=None, end=None, activity_ids=None):
+    """Number of sessions per class, optionally within ``[start, end]`` and for some activities."""
+    rows = pd.Series(True, index=calendar.index)
+    if start is not None:
+        rows &= calendar['session_date'] >= pd.Timestamp(start)
+    if end is not None:
+        rows &= calendar['session_date'] <= pd.Timestamp(end)
+    if activity_ids is not None:
+        rows &= calendar['activity_id'].isin(activity_ids)
+    return calendar[rows].groupby('class_id').size()
+
+
+def participation_rates(attendance, students, today=None):
+    """Attended, sessions held, enrollment and rate (%) per (month, class, activity)."""
+    columns = ['month_year', 'class_id', 'activity_id', 'attendance_count', 'sessions', 'enrolled', 'participation_rate']
+    if attendance.empty:
+        return pd.DataFrame(columns=columns)
+    # One sort: the sessions, with the rows recorded in each
+    session_keys, per_session = np.unique(pack(
+        attendance['class_id'].to_numpy(dtype=np.int64),
+        attendance['activity_id'].to_numpy(dtype=np.int64),
+        day_number(attendance['attendance_date']),
+    ), return_counts=True)
+    class_ids, activity_ids, days = unpack(session_keys)
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    # Sorted by class, activity and day, so each (class, activity, month) is a contiguous run
+    month_keys = pack(class_ids, activity_ids, months)
+    starts = np.flatnonzero(np.r_[True, month_keys[1:] != month_keys[:-1]])
+
+    # Students without a class are enrolled nowhere
+    enrolled = students['class_id'].dropna().astype('int64').value_counts()
+    rates = pd.DataFrame({
+        'month_year': pd.to_datetime(months[starts].astype('datetime64[M]')).strftime('%Y-%B'),
+        'class_id': class_ids[starts],
+        'activity_id': activity_ids[starts],
+        'attendance_count': np.add.reduceat(per_session, starts),
+        'sessions': np.diff(np.r_[starts, len(month_keys)]),
+    })
+    rates['enrolled'] = rates['class_id'].map(enrolled).fillna(0).astype(int)
+    possible = rates['enrolled'] * rates['sessions']
+    rates['participation_rate'] = (rates['attendance_count'] / possible.where(possible > 0) * 100).round(1)
+    return rates[columns]
@@ -0,0 +1,92 @@
+"""Weekly attendance streaks and consistency from a packed presence bitmap.
+
+``WeeklyPresence`` holds one bit per (core activity, student, week) for the
+weeks of the hot partition (see ``data/partitions.py``), packed with
+``np.packbits``: a few bytes per student and activity.  The metrics are
+computed for every student at once with array operations: a running count
+that resets at each missed week gives every run length, from which the
+current and longest streaks are read directly.
+
+Weeks start on Sunday.  The current week counts towards a streak only once
+the student has attended it; until then the streak runs to last week.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+WEEK_ORIGIN = date(2000, 1, 2)  # a Sunday
+
+
+def week_number(dates):
+    """Sunday-based week index of each date."""
+    days = (pd.to_datetime(dates) - pd.Timestamp(WEEK_ORIGIN)).dt.days
+    return (days // 7).to_numpy()
+
+
+class WeeklyPresence:
+    """Presence bits per (activity, student, week), packed along the week axis."""
+
+    def __init__(self, attendance, activity_ids, today):
+        self.activity_ids = np.asarray(activity_ids, dtype=np.int64)
+        self.last_week = int(week_number(pd.Series([today]))[0])
+        rows = attendance[attendance['activity_id'].isin(self.activity_ids)] if not attendance.empty else attendance
+        if rows.empty:
+            self.student_ids = np.empty(0, dtype=np.int64)
+            self.first_week, self.n_weeks = self.last_week, 1
+            self.bits = np.zeros((len(self.activity_ids), 0, 1), dtype=np.uint8)
+            return
+        weeks = week_number(rows['attendance_date'])
+        self.first_week = int(weeks.min())
+        self.n_weeks = self.last_week - self.first_week + 1
+        self.student_ids, student_pos = np.unique(rows['student_id'].to_numpy(dtype=np.int64), return_inverse=True)
+        activity_pos = np.searchsorted(self.activity_ids, rows['activity_id'].to_numpy(dtype=np.int64))
+
+        presence = np.zeros((len(self.activity_ids), len(self.student_ids), self.n_weeks), dtype=bool)
+        presence[activity_pos, student_pos, np.clip(weeks - self.first_week, 0, self.n_weeks - 1)] = True
+        self.bits = np.packbits(presence, axis=2)
+
+    def presence(self):
+        """The unpacked boolean array, shape (activities, students, weeks)."""
+        return np.unpackbits(self.bits, axis=2, count=self.n_weeks).astype(bool)
+
+    def metrics(self):
+        """Current streak, longest streak, weeks attended and consistency per (student, activity)."""
+        columns = ['student_id', 'activity_id', 'current_streak', 'longest_streak', 'weeks_attended', 'consistency']
+        if not len(self.student_ids):
+            return pd.DataFrame(columns=columns)
+        present = self.presence()
+        running = np.cumsum(present, axis=2)
+        # Length of the run ending at each week: the running total minus its value at the last miss
+        runs = running - np.maximum.accumulate(np.where(present, 0, running), axis=2)
+
+        this_week = runs[..., -1]
+        last_week = runs[..., -2] if self.n_weeks > 1 else np.zeros_like(this_week)
+        current = np.where(present[..., -1], this_week, last_week)
+        longest = runs.max(axis=2)
+        attended = running[..., -1]
+
+        # Consistency: share of weeks attended since the first one, not counting an unattended current week
+        first = np.argmax(present, axis=2)
+        span = self.n_weeks - first - np.where(present[..., -1], 0, 1)
+        consistency = np.divide(attended, span, out=np.zeros(attended.shape), where=span > 0)
+
+        n_activities, n_students = present.shape[:2]
+        metrics = pd.DataFrame({
+            'student_id': np.tile(self.student_ids, n_activities),
+            'activity_id': np.repeat(self.activity_ids, n_students),
+            'current_streak': current.ravel(),
+            'longest_streak': longest.ravel(),
+            'weeks_attended': attended.ravel(),
+            'consistency': np.round(np.minimum(consistency, 1.0).ravel() * 100, 1),
+        })
+        return metrics[metrics['weeks_attended'] > 0].reset_index(drop=True)
+
+
+def attendance_streaks(attendance, activities, today=None):
+    """Streak and consistency metrics for every student and core activity."""
+    today = today or date.today()
+    if activities.empty:
+        return WeeklyPresence(attendance, [], today).metrics()
+    core_ids = sorted(activities.loc[activities['activity_type'] == 'Core', 'activity_id'].astype(int))
+    return WeeklyPresence(attendance, core_ids, today).metrics()
@@ -0,0 +1 @@
+"""Headless report generation (run with ``python -m reports``)."""
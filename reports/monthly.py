@@ -0,0 +1,180 @@
+"""Monthly class and department reports computed from one shared aggregate pass.
+
+For a month, every class gets its attendance summary, target attainment and
+at-risk list, and every department a per-class overview.  The aggregates are
+computed once for the whole church (a handful of groupbys over attendance,
+and the at-risk reasons of every student), sliced per class, and the output files are rendered in parallel across CPU
+cores with a process pool.
+"""
+import html
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Same defaults as the Students at Risk and Target Analysis pages
+from analytics.risk import DEFAULT_RISK_THRESHOLDS
+from analytics.targets import DEFAULT_TARGET_PER_ACTIVITY
+
+FORMATS = ('xlsx', 'html')
+
+
+def monthly_aggregates(data, month):
+    """Church-wide aggregates for ``month`` (a ``pd.Period``) shared by every report."""
+    attendance = data['attendance']
+    month_start, month_end = month.start_time, month.end_time
+    as_of = min(month_end, pd.Timestamp.now())
+
+    in_month = attendance[(attendance['attendance_date'] >= month_start) & (attendance['attendance_date'] <= month_end)]
+    activity_names = data['activities'].set_index('activity_id')['activity_name'].astype(str)
+
+    # (student x activity) attendance counts for the month
+    counts = in_month.groupby(['student_id', 'activity_id']).size().unstack(fill_value=0)
+    counts.columns = counts.columns.map(activity_names)
+
+    # Last time each student was seen at each activity, up to the report date
+    last_seen = (
+        attendance[attendance['attendance_date'] <= as_of]
+        .groupby(['student_id', 'activity_id'])['attendance_date'].max()
+        .unstack()
+    )
+    last_seen.columns = last_seen.columns.map(activity_names)
+
+    # Distinct session dates recorded per (class, activity) this month
+    sessions = in_month.groupby(['class_id', 'activity_id'])['attendance_date'].nunique().unstack(fill_value=0)
+    sessions.columns = sessions.columns.map(activity_names)
+
+    return {'month': month, 'as_of': as_of, 'counts': counts, 'last_seen': last_seen, 'sessions': sessions}
+
+
+def risk_reasons(last_seen, student_ids, as_of, thresholds):
+    """Reasons each student is at risk, joined with '; ' ('' when none), one vectorized pass per threshold."""
+    student_ids = pd.Index(student_ids)
+    reasons = pd.Series('', index=student_ids, dtype=object)
+    for activity_name, threshold_days in thresholds.items():
+        seen = last_seen[activity_name].reindex(student_ids) if activity_name in last_seen else pd.Series(pd.NaT, index=student_ids)
+        days_since = (as_of - seen).dt.days
+        absent = days_since > threshold_days
+        message = pd.Series('', index=student_ids, dtype=object)
+        message[seen.isna()] = f"Never attended '{activity_name}'"
+        message[absent] = (
+            f"Absent from '{activity_name}' for " + days_since[absent].astype('int64').astype(str)
+            + f" days (>{threshold_days} day threshold)"
+        )
+        has_message, has_reasons = message != '', reasons != ''
+        reasons[has_message & has_reasons] += "; " + message[has_message & has_reasons]
+        reasons[has_message & ~has_reasons] = message[has_message & ~has_reasons]
+    return reasons
+
+
+def class_report(aggregates, class_row, students, activity_names, targets):
+    """Report sections for one class, sliced from the shared aggregates."""
+    class_students = students[students['class_id'] == class_row['class_id']].sort_values('student_name')
+    student_ids = class_students['student_id'].tolist()
+
+    per_student = aggregates['counts'].reindex(index=student_ids, columns=activity_names, fill_value=0)
+    per_student.index = class_students['student_name'].astype(str).tolist()
+    total_target = sum(targets.get(name, DEFAULT_TARGET_PER_ACTIVITY) for name in activity_names)
+    targets_table = per_student.assign(
+        **{'Total': per_student.sum(axis=1), 'Target': total_target}
+    )
+    targets_table['Target Met'] = targets_table['Total'] >= total_target
+
+    sessions = aggregates['sessions'].reindex(columns=activity_names, fill_value=0)
+    sessions = sessions.loc[class_row['class_id']] if class_row['class_id'] in sessions.index else pd.Series(0, index=activity_names)
+    summary = pd.DataFrame({
+        'Activity': activity_names,
+        'Sessions Recorded': sessions.to_numpy(),
+        'Total Attendance': per_student.sum(axis=0).to_numpy(),
+        'Students Attending': (per_student > 0).sum(axis=0).to_numpy(),
+    })
+    summary['Enrolled'] = len(student_ids)
+
+    reasons = aggregates['risk_reasons'].reindex(student_ids, fill_value='')
+    names = dict(zip(class_students['student_id'], class_students['student_name'].astype(str)))
+    at_risk = pd.DataFrame({
+        'Student Name': [names[i] for i in reasons.index[reasons != '']],
+        'Reason Flagged': reasons[reasons != ''].tolist(),
+    })
+
+    return {
+        'title': f"{class_row['class_name']} ({class_row['dep_name']}) - {aggregates['month'].strftime('%B %Y')}",
+        'sections': {
+            'Attendance Summary': summary,
+            'Target Attainment': targets_table.reset_index(names='Student Name'),
+            'Students at Risk': at_risk,
+        },
+        'overview': {
+            'Class': class_row['class_name'], 'Students': len(student_ids),
+            'Total Attendance': int(per_student.to_numpy().sum()),
+            'Target Met': int(targets_table['Target Met'].sum()), 'At Risk': len(at_risk),
+        },
+    }
+
+
+def build_reports(data, month, targets=None, thresholds=None, department=None):
+    """Class and department reports for ``month``; returns ``{file_stem: report}``."""
+    targets = targets or {}
+    thresholds = thresholds or DEFAULT_RISK_THRESHOLDS
+    aggregates = monthly_aggregates(data, month)
+    aggregates['risk_reasons'] = risk_reasons(
+        aggregates['last_seen'], data['students']['student_id'], aggregates['as_of'], thresholds
+    )
+    activity_names = data['activities']['activity_name'].astype(str).tolist()
+    classes = data['classes'].merge(data['departments'], on='dep_id')
+    if department:
+        classes = classes[classes['dep_name'] == department]
+
+    reports = {}
+    for dep_name, dep_classes in classes.groupby('dep_name', observed=True):
+        overviews = []
+        for _, class_row in dep_classes.iterrows():
+            report = class_report(aggregates, class_row, data['students'], activity_names, targets)
+            reports[_file_stem(month, dep_name, class_row['class_name'])] = report
+            overviews.append(report['overview'])
+        reports[_file_stem(month, dep_name)] = {
+            'title': f"{dep_name} - {month.strftime('%B %Y')}",
+            'sections': {'Class Overview': pd.DataFrame(overviews)},
+        }
+    return reports
+
+
+def _file_stem(month, *parts):
+    slug = "_".join(re.sub(r'[^A-Za-z0-9]+', '-', str(p)).strip('-') for p in parts)
+    return f"{month.strftime('%Y-%m')}_{slug}"
+
+
+# --- Rendering ---
+def render_report(path_stem, report, formats):
+    """Write one report in each of ``formats``; runs in a worker process."""
+    written = []
+    if 'xlsx' in formats:
+        with pd.ExcelWriter(f"{path_stem}.xlsx", engine='openpyxl') as writer:
+            for name, table in report['sections'].items():
+                table.to_excel(writer, sheet_name=name[:31], index=False)
+        written.append(f"{path_stem}.xlsx")
+    if 'html' in formats:
+        body = "".join(
+            f"<h2>{name}</h2>" + (table.to_html(index=False, border=0, classes='report') if not table.empty else "<p>None.</p>")
+            for name, table in report['sections'].items()
+        )
+        title = html.escape(report['title'])
+        with open(f"{path_stem}.html", 'w', encoding='utf-8') as f:
+            f.write(
+                f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title>"
+                "<style>body{font-family:sans-serif}table.report{border-collapse:collapse}"
+                "table.report td,table.report th{padding:4px 8px;border-bottom:1px solid #ddd}</style>"
+                f"</head><body><h1>{title}</h1>{body}</body></html>"
+            )
+        written.append(f"{path_stem}.html")
+    return written
+
+
+def render_reports(reports, out_dir, formats=FORMATS, workers=None):
+    """Render every report into ``out_dir`` in parallel; returns the written paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    stems = [os.path.join(out_dir, stem) for stem in reports]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(render_report, stems, reports.values(), [formats] * len(stems), chunksize=8)
+        return [path for written in results for path in written]
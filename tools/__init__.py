@@ -0,0 +1 @@
+"""Developer tools: local database stand-in, load tests and benchmarks."""
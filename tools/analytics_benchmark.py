@@ -0,0 +1,124 @@
+"""Micro-benchmarks for every analytics function and the jobs they read.
+
+The data is loaded through the local PostgREST stand-in exactly as
+``python -m analytics`` loads it (archive synced, hot partition fetched).
+Each analytics function is timed on a warm ``Dataset`` (its derived datasets
+already computed, as the scheduler leaves them in the app); each job of
+``jobs/precompute.py`` is timed on its own.  Times are in milliseconds:
+
+    python -m tools.analytics_benchmark --attendance 300000 --save baseline.json
+    python -m tools.analytics_benchmark --attendance 300000 --compare baseline.json --tolerance 0.25
+
+With ``--compare`` the exit code is 1 if any median is slower than the
+baseline by more than the tolerance.
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+
+from analytics import (
+    Dataset, class_trends, leaderboard, name_search, risk_flags, risk_ranking, roster_priorities, target_attainment,
+)
+from analytics.leaderboard import ALL_TIME
+from analytics.trends import ALL_YEARS
+from jobs.precompute import JOBS, MONTH_FORMAT
+from data.versions import SESSION_KEYS
+from tools.fake_postgrest import FakePostgrest, demo_tables
+
+
+def benchmarks(dataset):
+    """``{name: callable}`` covering each analytics function with the arguments the pages use most."""
+    class_name = str(dataset.classes['class_name'].iloc[0])
+    department = str(dataset.departments['dep_name'].iloc[0])
+    month = dataset.today.strftime(MONTH_FORMAT)
+    # A student's name spelled differently from the table, and the first letters of one being typed
+    student_name = str(dataset.students['student_name'].iloc[0])
+    respelled = student_name.replace('ee', 'i').replace('ou', 'u').replace('y', 'i')
+    return {
+        'risk_flags': lambda: risk_flags(dataset),
+        'risk_flags[mark]': lambda: risk_flags(dataset, gap_mode='mark'),
+        'risk_ranking': lambda: risk_ranking(dataset, gap_mode='mark', top=25),
+        'target_attainment': lambda: target_attainment(dataset, class_name, month),
+        'target_attainment[rate]': lambda: target_attainment(dataset, class_name, month, rate_target=75),
+        'leaderboard': lambda: leaderboard(dataset, "This Academic Year"),
+        'leaderboard[all_time,rate]': lambda: leaderboard(dataset, ALL_TIME, rank_by='rate'),
+        'roster_priorities': lambda: roster_priorities(dataset, class_name),
+        'class_trends': lambda: class_trends(dataset, department, 'Sunday Meeting', ALL_YEARS),
+        'name_search': lambda: name_search(dataset, respelled),
+        'name_search[typing]': lambda: name_search(dataset, student_name[:3], kind='Student'),
+    }
+
+
+def job_benchmarks(dataset):
+    return {
+        f"job:{job.name}": (lambda job=job: job.compute(*(getattr(dataset, SESSION_KEYS[t]) for t in job.tables), dataset.today))
+        for job in JOBS
+    }
+
+
+def measure(func, repeat):
+    func()  # warm-up: imports, caches, the detector's first pass
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    return {'median_ms': round(statistics.median(times), 2), 'min_ms': round(min(times), 2)}
+
+
+def run(students=2000, attendance=200000, days=730, repeat=7, seed=7, only=None):
+    """Results per benchmark name; ``only`` restricts to names containing that text."""
+    db = FakePostgrest(demo_tables(students=students, attendance=attendance, days=days, seed=seed))
+    try:
+        with tempfile.TemporaryDirectory() as archive_dir:
+            dataset = Dataset.load(db.serve(), "local", archive_dir=archive_dir)
+            cases = {**job_benchmarks(dataset), **benchmarks(dataset)}
+            return {
+                name: measure(func, repeat)
+                for name, func in cases.items() if not only or only in name
+            }
+    finally:
+        db.shutdown()
+
+
+def compare(results, baseline, tolerance):
+    """Names whose median exceeds the baseline's by more than ``tolerance`` (a fraction)."""
+    return [
+        name for name, result in results.items()
+        if name in baseline and result['median_ms'] > baseline[name]['median_ms'] * (1 + tolerance)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--attendance', type=int, default=200000)
+    parser.add_argument('--days', type=int, default=730, help="Days of history (older years go to the archive)")
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--only', help="Run only benchmarks whose name contains this")
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown before failing")
+    args = parser.parse_args()
+
+    results = run(args.students, args.attendance, args.days, args.repeat, only=args.only)
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    for name, result in results.items():
+        line = f"{name:>30}: {result['median_ms']:>9.2f} ms (min {result['min_ms']:.2f})"
+        if name in baseline:
+            line += f"  baseline {baseline[name]['median_ms']:.2f} ms"
+        print(line)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name in regressions:
+        print(f"REGRESSION: {name} is more than {args.tolerance:.0%} slower than the baseline", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,299 @@
+"""Load test for concurrent sessions of the app against the local PostgREST stand-in.
+
+Every simulated servant drives ``app.py`` through Streamlit's testing
+framework, in its own thread of this one process as the sessions of a real
+server instance do, sharing its cached resources (connection pool, table
+cache, scheduler).  A session logs in, then repeatedly opens the dashboard,
+records attendance for its class, and opens a student's profile.  The number
+of sessions grows level by level; each level reports rerun latency
+percentiles, reruns per second, peak resident memory and any errors:
+
+    python -m tools.app_load_test --sessions 1 2 4 8 16 --rounds 3 --save before.json
+    python -m tools.app_load_test --sessions 1 2 4 8 16 --rounds 3 --compare before.json
+
+With ``--compare`` the exit code is 1 if a level's p95 latency or throughput
+is worse than the baseline's by more than the tolerance; it is 1 as well if
+any rerun raised an error.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from streamlit import logger as streamlit_logger
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+
+from tools.fake_postgrest import FakePostgrest, demo_tables
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PASSWORD = "pass123"  # demo_tables' password for every servant
+# What servants type into the student search, spelled unlike most of demo_tables' names
+SEARCHES = ["Meena", "Gergis", "Abanob Hana", "Kiro", "مينا", "Dimyana Wasef", "Chris"]
+
+
+def share_process_state(url):
+    """Set up once what a server process holds for all its sessions.
+
+    ``AppTest`` is written for one session at a time: each run installs its
+    own mock runtime, secrets and test-mode flag and removes them when it
+    ends, which would pull them from under the other sessions' runs.  Here
+    they are installed once: the secrets (read once from secrets.toml by a
+    server), the test-mode flag, one runtime, and one script cache, so each
+    page is compiled once as on the server (concurrent compiles also trip
+    CPython's non-thread-safe AST conversion).
+    """
+    import streamlit as st
+    from streamlit import config
+    from streamlit.runtime.secrets import Secrets
+
+    st.secrets = Secrets()
+    st.secrets._secrets = {"SUPABASE_URL": url, "SUPABASE_KEY": "local", "CHANGE_FEED": "local"}
+    config.get_config_options()
+    config._set_option("global.appTest", True, "load test")
+
+    shared_cache = ScriptCache()
+    get_bytecode = ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda self, script_path: get_bytecode(shared_cache, script_path)
+
+    last_runtime = []
+    instance = Runtime.instance.__func__
+
+    def shared_instance(cls):
+        if cls._instance is not None:
+            last_runtime[:] = [cls._instance]
+        return last_runtime[0] if cls._instance is None and last_runtime else instance(cls)
+
+    Runtime.instance = classmethod(shared_instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(last_runtime))
+
+
+def _rss_mb():
+    # Current resident set size; /proc is Linux-only, elsewhere the process peak is the best available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+class Session:
+    """One servant's browser tab: an ``AppTest`` whose every rerun is timed."""
+
+    def __init__(self, servant_name, timings, errors, lock, think=0.0, rng=None):
+        self.at = AppTest.from_file(APP_PATH, default_timeout=120)
+        self.servant_name = servant_name
+        self.timings, self.errors, self.lock = timings, errors, lock
+        self.think, self.rng = think, rng or random.Random()
+
+    def rerun(self, step):
+        started = time.perf_counter()
+        self.at.run()
+        elapsed = time.perf_counter() - started
+        problems = [str(e.value) for e in self.at.exception] + [str(e.value) for e in self.at.error]
+        with self.lock:
+            self.timings.append((step, elapsed))
+            self.errors.extend(f"{self.servant_name} / {step}: {problem}" for problem in problems)
+        if self.think:
+            time.sleep(self.rng.uniform(0, 2 * self.think))
+
+    def login(self):
+        self.rerun("open")
+        self.at.text_input[0].input(self.servant_name)
+        self.at.text_input[1].input(PASSWORD)
+        self.at.button[0].click()
+        self.rerun("login")
+
+    def dashboard(self):
+        self.at.switch_page("views/dashboard.py")
+        self.rerun("dashboard")
+
+    def attendance_entry(self):
+        self.at.switch_page("views/attendance_entry.py")
+        self.rerun("attendance_entry")
+        submit = [button for button in self.at.button if button.label == "Submit Attendance"]
+        if submit:
+            submit[0].click()
+            self.rerun("attendance_submit")
+
+    def student_profile(self):
+        self.at.switch_page("views/student_profile.py")
+        self.rerun("student_profile")
+        self.at.text_input[0].input(self.rng.choice(SEARCHES))
+        self.rerun("student_search")
+        if self.at.selectbox and self.at.selectbox[0].options:
+            self.at.selectbox[0].select_index(self.rng.randrange(len(self.at.selectbox[0].options)))
+            self.rerun("student_profile_view")
+
+    def run(self, rounds):
+        self.login()
+        for _ in range(rounds):
+            self.dashboard()
+            self.attendance_entry()
+            self.student_profile()
+
+
+def _percentile(sorted_values, share):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * share))]
+
+
+def run_level(servant_names, sessions, rounds, think, seed):
+    """Run ``sessions`` concurrent sessions; returns the level's results."""
+    timings, errors, lock = [], [], threading.Lock()
+    rng = random.Random(seed)
+    users = [
+        Session(servant_names[i % len(servant_names)], timings, errors, lock, think, random.Random(rng.random()))
+        for i in range(sessions)
+    ]
+    peak_rss, done = [_rss_mb()], threading.Event()
+
+    def sample_rss():
+        while not done.wait(0.05):
+            peak_rss.append(_rss_mb())
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user.run, args=(rounds,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    done.set()
+    sampler.join()
+
+    latencies_ms = sorted(elapsed * 1000 for _, elapsed in timings)
+    per_step = {}
+    for step, elapsed in timings:
+        per_step.setdefault(step, []).append(elapsed * 1000)
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies_ms),
+        'wall_seconds': round(wall, 2),
+        'reruns_per_second': round(len(latencies_ms) / wall, 2),
+        'p50_ms': round(_percentile(latencies_ms, 0.50), 1),
+        'p95_ms': round(_percentile(latencies_ms, 0.95), 1),
+        'p99_ms': round(_percentile(latencies_ms, 0.99), 1),
+        'max_ms': round(latencies_ms[-1], 1),
+        'peak_rss_mb': round(max(peak_rss), 1),
+        'step_p50_ms': {step: round(_percentile(sorted(values), 0.50), 1) for step, values in per_step.items()},
+        'errors': len(errors),
+        'first_errors': errors[:5],
+    }
+
+
+def _version_label():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(APP_PATH),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(levels=(1, 2, 4, 8), rounds=3, students=2000, attendance=100000, latency=0.02, think=0.0, seed=7):
+    """Warm the process with one session, then run each level; returns the whole report."""
+    tables = demo_tables(students=students, attendance=attendance, seed=seed)
+    # Class servants only: the people entering attendance on a Sunday morning
+    servant_names = [s['servant_name'] for s in tables['Servant'] if s['role'] == 'Servant']
+    db = FakePostgrest(tables, latency=latency)
+    share_process_state(db.serve())
+    streamlit_logger.set_log_level("error")  # bare-mode and deprecation warnings, repeated on every rerun
+    rows_before = len(tables['Attendance'])
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            # The app keeps table versions and the archive under the temp dir, read when its modules are
+            # first imported (by the first session); keep this run's apart from a real instance's
+            tempfile.tempdir = state_dir
+            started = time.perf_counter()
+            warm_up = run_level(servant_names, 1, 1, 0.0, seed)
+            cold_start = time.perf_counter() - started
+            results = [run_level(servant_names, n, rounds, think, seed + n) for n in levels]
+    finally:
+        tempfile.tempdir = None
+        db.shutdown()
+    return {
+        'version': _version_label(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'params': {
+            'rounds': rounds, 'students': students, 'attendance': attendance,
+            'latency': latency, 'think': think, 'seed': seed,
+        },
+        'cold_start_seconds': round(cold_start, 2),
+        'attendance_rows_written': len(db.tables['Attendance']) - rows_before,
+        'warm_up_errors': warm_up['first_errors'],
+        'levels': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Messages for levels whose p95 latency or throughput regressed by more than ``tolerance``."""
+    before = {level['sessions']: level for level in baseline['levels']}
+    regressions = []
+    for level in report['levels']:
+        old = before.get(level['sessions'])
+        if old is None:
+            continue
+        if level['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{level['sessions']} sessions: p95 {old['p95_ms']} -> {level['p95_ms']} ms")
+        if level['reruns_per_second'] < old['reruns_per_second'] * (1 - tolerance):
+            regressions.append(
+                f"{level['sessions']} sessions: throughput {old['reruns_per_second']} -> {level['reruns_per_second']} reruns/s"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8], help="Concurrent sessions per level")
+    parser.add_argument('--rounds', type=int, default=3, help="Dashboard / entry / profile rounds per session")
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--attendance', type=int, default=100000)
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds added to every request")
+    parser.add_argument('--think', type=float, default=0.0, help="Mean seconds a servant pauses between steps")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--save', help="Write the report to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed regression before failing")
+    args = parser.parse_args()
+
+    report = run(args.sessions, args.rounds, args.students, args.attendance, args.latency, args.think, args.seed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"baseline: {baseline['version']} ({baseline['timestamp']})")
+    print(
+        f"version: {report['version']}, cold start {report['cold_start_seconds']} s, "
+        f"{report['attendance_rows_written']} attendance rows written"
+    )
+    print(f"{'sessions':>8} {'reruns':>7} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'RSS MB':>8} {'errors':>6}")
+    for level in report['levels']:
+        print(
+            f"{level['sessions']:>8} {level['reruns']:>7} {level['reruns_per_second']:>9} {level['p50_ms']:>8} "
+            f"{level['p95_ms']:>8} {level['p99_ms']:>8} {level['max_ms']:>8} {level['peak_rss_mb']:>8} {level['errors']:>6}"
+        )
+        for error in level['first_errors']:
+            print(f"    {error}", file=sys.stderr)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    regressions = compare(report, baseline, args.tolerance) if baseline else []
+    for message in regressions:
+        print(f"REGRESSION: {message}", file=sys.stderr)
+    failed = regressions or report['warm_up_errors'] or any(level['errors'] for level in report['levels'])
+    sys.exit(1 if failed else 0)
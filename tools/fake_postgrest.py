@@ -0,0 +1,307 @@
+"""A local, in-memory stand-in for the Supabase REST API (PostgREST subset).
+
+Enough of PostgREST for this app: ``select``/``order``/``offset``/``limit``
+reads with ``Content-Range`` counts, ``eq``/``in``/``gte``/``lte``/``gt``/``lt``
+filters, and POST/PATCH/DELETE writes.  Inserted rows can also be published to
+a change feed (``data.changefeed.LOCAL_FEED``) in place of Supabase Realtime.
+Point the app (or
+``data.async_io.AsyncSupabase``) at it instead of a real project:
+
+    python -m tools.fake_postgrest --port 8765 --students 2000 --attendance 200000
+
+then set ``SUPABASE_URL = "http://localhost:8765"`` in ``.streamlit/secrets.toml``.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from data.schema import PRIMARY_KEYS
+
+ACTIVITIES = [
+    ('Sunday Meeting', 'Core'), ('Quddas (Liturgy)', 'Core'),
+    ('Bible Study', 'Core'), ('Summer Trip', 'Selective'), ('Choir', 'Selective'),
+]
+ROLES = ['Servant', 'Department Manager', 'Chief Manager', 'Priest']
+
+# Names as they are really entered: each group is one name's Latin spellings, then its Arabic one
+MALE_NAMES = [
+    ('Mina', 'Meena', 'Mena', 'مينا'), ('Abanoub', 'Abanob', 'أبانوب'), ('Kirollos', 'Kyrillos', 'كيرلس'),
+    ('Bishoy', 'Beshoy', 'بيشوي'), ('Mark', 'Marc', 'مرقس'), ('Youssef', 'Yousef', 'يوسف'),
+    ('Michael', 'Mikhail', 'ميخائيل'), ('Fady', 'Fadi', 'فادي'), ('Ehab', 'Ihab', 'إيهاب'),
+]
+FEMALE_NAMES = [
+    ('Mariam', 'Maryam', 'مريم'), ('Marina', 'مارينا'), ('Christina', 'Kristina', 'كريستينا'),
+    ('Demiana', 'Dimiana', 'دميانة'), ('Sarah', 'Sara', 'سارة'), ('Irene', 'Erini', 'ايريني'),
+]
+FAMILY_NAMES = [
+    ('Guirguis', 'Gergis', 'Girgis', 'جرجس'), ('Shenouda', 'Chenouda', 'شنودة'), ('Hanna', 'Hana', 'حنا'),
+    ('Boutros', 'Botros', 'بطرس'), ('Wassef', 'Wasef', 'واصف'), ('Tadros', 'Tawadros', 'تادرس'),
+    ('Ghaly', 'Ghali', 'غالي'), ('Ibrahim', 'Ebrahim', 'إبراهيم'), ('Fahmy', 'Fahmi', 'فهمي'),
+]
+ARABIC_SHARE = 0.25
+
+
+def _demo_name(rng):
+    """Given name, father's name and family name, all in one script."""
+    arabic = rng.random() < ARABIC_SHARE
+    given = rng.choice(MALE_NAMES + FEMALE_NAMES)
+    groups = [given, rng.choice([group for group in MALE_NAMES if group != given]), rng.choice(FAMILY_NAMES)]
+    return " ".join(group[-1] if arabic else rng.choice(group[:-1]) for group in groups)
+
+
+def demo_tables(departments=4, classes_per_dep=5, students=600, attendance=20000, days=365, seed=7, parishes=None):
+    """Deterministic, realistic-looking tables with the app's column names.
+
+    With ``parishes``, the departments are spread over that many parishes and
+    every row carries its ``parish_id`` (see ``data/tenancy.py``).
+    """
+    rng = random.Random(seed)
+    deps = [{'dep_id': d, 'dep_name': f"Department {d}", 'manager_id': d + 1} for d in range(1, departments + 1)]
+    classes = [
+        {'class_id': (d - 1) * classes_per_dep + c, 'class_name': f"Class {d}-{c}", 'dep_id': d}
+        for d in range(1, departments + 1) for c in range(1, classes_per_dep + 1)
+    ]
+    servants = [{'servant_id': 1, 'servant_name': 'Admin', 'password': 'pass123', 'role': 'Priest', 'class_id': None}]
+    servants += [
+        {'servant_id': i + 2, 'servant_name': f"Servant {i + 1}", 'password': 'pass123',
+         'role': 'Department Manager' if i < departments else 'Servant', 'class_id': klass['class_id']}
+        for i, klass in enumerate(classes)
+    ]
+    # Names from their own generator, so the rest of the data is the same for a given seed
+    names = random.Random(seed + 1)
+    student_rows = [
+        {'student_id': s, 'student_name': _demo_name(names), 'class_id': rng.choice(classes)['class_id']}
+        for s in range(1, students + 1)
+    ]
+    dep_of_class = {c['class_id']: c['dep_id'] for c in classes}
+    activities = [{'activity_id': i + 1, 'activity_name': n, 'activity_type': t} for i, (n, t) in enumerate(ACTIVITIES)]
+    start = date.today() - timedelta(days=days)
+    attendance_rows = []
+    for a in range(1, attendance + 1):
+        student = rng.choice(student_rows)
+        attendance_rows.append({
+            'attendance_id': a,
+            'attendance_date': (start + timedelta(days=rng.randrange(days))).isoformat(),
+            'student_id': student['student_id'],
+            'activity_id': rng.choice(activities)['activity_id'],
+            'class_id': student['class_id'],
+            'dep_id': dep_of_class[student['class_id']],
+            'recorded_by_servant_id': 1,
+        })
+    tables = {
+        'Department': deps, 'Servant': servants, 'Class': classes, 'Student': student_rows,
+        'Activity': activities, 'Attendance': attendance_rows,
+    }
+    return _partition_by_parish(tables, parishes) if parishes else tables
+
+
+def _partition_by_parish(tables, parishes):
+    """Assign departments to parishes round-robin; each parish gets its own copy of the activities."""
+    parish_of_dep = {d['dep_id']: (d['dep_id'] - 1) % parishes + 1 for d in tables['Department']}
+    parish_of_class = {c['class_id']: parish_of_dep[c['dep_id']] for c in tables['Class']}
+    for dep in tables['Department']:
+        dep['parish_id'] = parish_of_dep[dep['dep_id']]
+    for row in tables['Class'] + tables['Student']:
+        row['parish_id'] = parish_of_class[row['class_id']]
+    # Managers belong to the parish of the department they manage, the others to their class's
+    parish_of_manager = {d['manager_id']: parish_of_dep[d['dep_id']] for d in tables['Department']}
+    for servant in tables['Servant']:
+        servant['parish_id'] = parish_of_manager.get(
+            servant['servant_id'], parish_of_class.get(servant['class_id'], 1)
+        )
+    next_id = len(tables['Servant']) + 1
+    tables['Servant'] += [
+        {'servant_id': next_id + p - 2, 'servant_name': f"Priest {p}", 'password': 'pass123', 'role': 'Priest',
+         'class_id': None, 'parish_id': p}
+        for p in range(2, parishes + 1)
+    ] + [{'servant_id': next_id + parishes - 1, 'servant_name': 'Diocese', 'password': 'pass123',
+          'role': 'Diocese Leader', 'class_id': None, 'parish_id': None}]
+    base = tables['Activity']
+    tables['Activity'] = [
+        {**activity, 'activity_id': activity['activity_id'] + (p - 1) * len(base), 'parish_id': p}
+        for p in range(1, parishes + 1) for activity in base
+    ]
+    for row in tables['Attendance']:
+        row['parish_id'] = parish_of_dep[row['dep_id']]
+        row['activity_id'] += (row['parish_id'] - 1) * len(base)
+    tables['Parish'] = [{'parish_id': p, 'parish_name': f"Parish {p}"} for p in range(1, parishes + 1)]
+    return tables
+
+
+def _parse_value(raw):
+    try:
+        return int(raw)
+    except ValueError:
+        return raw
+
+
+def _matches(row, column, expression):
+    op, _, raw = expression.partition('.')
+    value = row.get(column)
+    if op == 'in':
+        return value in {_parse_value(v) for v in raw.strip('()').split(',')}
+    target = _parse_value(raw)
+    if op == 'eq':
+        return value == target
+    if value is None:
+        return False
+    return {'gte': value >= target, 'lte': value <= target, 'gt': value > target, 'lt': value < target}[op]
+
+
+class FakePostgrest:
+    """Thread-safe in-memory tables plus the HTTP server that exposes them."""
+
+    def __init__(self, tables=None, latency=0.0, feed=None):
+        self.tables = tables if tables is not None else demo_tables()
+        self.latency = latency
+        self.feed = feed
+        self.lock = threading.Lock()
+        self.requests = 0
+        self._next_ids = {}
+        self._server = None
+
+    # --- Storage operations ---
+    def _filtered(self, table, filters):
+        return [row for row in self.tables.setdefault(table, []) if all(_matches(row, c, e) for c, e in filters)]
+
+    def select(self, table, filters, order=None, offset=0, limit=None):
+        with self.lock:
+            rows = self._filtered(table, filters) if filters else list(self.tables.setdefault(table, []))
+        # Rows are stored in primary key order, so the paged loader's ordering is free
+        if order and order != f"{PRIMARY_KEYS.get(table)}.asc":
+            column, _, direction = order.partition('.')
+            rows = sorted(rows, key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction.startswith('desc'))
+        end = None if limit is None else offset + limit
+        return rows[offset:end], len(rows)
+
+    def insert(self, table, records):
+        pk = PRIMARY_KEYS.get(table)
+        with self.lock:
+            rows = self.tables.setdefault(table, [])
+            if pk and table not in self._next_ids:
+                self._next_ids[table] = max((r.get(pk) or 0 for r in rows), default=0) + 1
+            inserted = []
+            for record in records:
+                record = dict(record)
+                if pk and record.get(pk) is None:
+                    record[pk] = self._next_ids[table]
+                    self._next_ids[table] += 1
+                rows.append(record)
+                inserted.append(record)
+        if self.feed is not None:
+            for record in inserted:
+                self.feed.publish(table, record)
+        return len(records)
+
+    def update(self, table, filters, values):
+        with self.lock:
+            rows = self._filtered(table, filters)
+            for row in rows:
+                row.update(values)
+        return len(rows)
+
+    def delete(self, table, filters):
+        with self.lock:
+            doomed = {id(row) for row in self._filtered(table, filters)}
+            self.tables[table] = [row for row in self.tables.get(table, []) if id(row) not in doomed]
+        return len(doomed)
+
+    # --- HTTP server ---
+    def serve(self, host='127.0.0.1', port=0):
+        """Start serving in a daemon thread; returns the base URL."""
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def shutdown(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _make_handler(db):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _route(self):
+            url = urlsplit(self.path)
+            table = url.path.rpartition('/')[2]
+            params = parse_qsl(url.query)
+            options = {k: v for k, v in params if k in ('select', 'order', 'offset', 'limit')}
+            filters = [(k, v) for k, v in params if k not in options]
+            return table, options, filters
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'null')
+
+        def _reply(self, status, payload=None, headers=None):
+            body = b'' if payload is None else json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _start(self):
+            db.requests += 1
+            if db.latency:
+                time.sleep(db.latency)
+
+        def do_GET(self):
+            self._start()
+            table, options, filters = self._route()
+            offset = int(options.get('offset', 0))
+            limit = int(options['limit']) if 'limit' in options else None
+            rows, total = db.select(table, filters, options.get('order'), offset, limit)
+            if options.get('select', '*') != '*':
+                columns = options['select'].split(',')
+                rows = [{column: row.get(column) for column in columns} for row in rows]
+            last = offset + len(rows) - 1
+            self._reply(200, rows, {'Content-Range': f"{offset}-{last}/{total}" if rows else f"*/{total}"})
+
+        def do_POST(self):
+            self._start()
+            table, _, _ = self._route()
+            records = self._body()
+            db.insert(table, records if isinstance(records, list) else [records])
+            self._reply(201)
+
+        def do_PATCH(self):
+            self._start()
+            table, _, filters = self._route()
+            db.update(table, filters, self._body())
+            self._reply(204)
+
+        def do_DELETE(self):
+            self._start()
+            table, _, filters = self._route()
+            db.delete(table, filters)
+            self._reply(204)
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--students', type=int, default=600)
+    parser.add_argument('--attendance', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--parishes', type=int, help="Spread the data over this many parishes")
+    args = parser.parse_args()
+    tables = demo_tables(students=args.students, attendance=args.attendance, parishes=args.parishes)
+    server = FakePostgrest(tables, latency=args.latency)
+    print(f"Serving fake Supabase at {server.serve(port=args.port)} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
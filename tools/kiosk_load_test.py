@@ -0,0 +1,118 @@
+"""Load test for kiosk check-in against the local PostgREST stand-in.
+
+Several simulated kiosks scan codes at a combined target rate (default 20
+check-ins per second, a few percent of them re-scans) through the same
+``StudentIndex`` and ``CheckinBuffer`` the kiosk page uses.  The report gives
+the scan latency seen at the kiosk, the largest backlog waiting to be saved,
+the number of insert requests, and checks that the table ends up with exactly
+one row per accepted check-in:
+
+    python -m tools.kiosk_load_test --rate 20 --seconds 30 --kiosks 4 --latency 0.05
+"""
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+from data.async_io import AsyncSupabase
+from data.checkin import CheckinBuffer, StudentIndex
+from tools.fake_postgrest import FakePostgrest, demo_tables
+
+
+def _kiosk(index, buffer, codes, activity_id, interval, deadline, rng, duplicate_share, latencies, lock):
+    scanned = []
+    next_at = time.perf_counter()
+    while next_at < deadline:
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+        code = rng.choice(scanned) if scanned and rng.random() < duplicate_share else rng.choice(codes)
+        started = time.perf_counter()
+        buffer.check_in(index.resolve(code), activity_id, servant_id=1)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+        scanned.append(code)
+        next_at += interval
+
+
+def run(rate=20.0, seconds=30.0, kiosks=4, students=5000, latency=0.05, duplicate_share=0.05,
+        flush_interval=1.0, max_batch=500, seed=7):
+    """Run the load test; returns a dict of results (``ok`` is False if a check failed)."""
+    db = FakePostgrest(demo_tables(students=students, attendance=0, seed=seed), latency=latency)
+    io_client = AsyncSupabase(db.serve(), "local")
+    try:
+        frames, _ = io_client.fetch_tables(["Student", "Class"]).result(timeout=60)
+        index = StudentIndex(frames["Student"], frames["Class"])
+        flushes = []
+        buffer = CheckinBuffer(io_client, on_flush=flushes.append, flush_interval=flush_interval, max_batch=max_batch)
+        buffer.start()
+
+        rng = random.Random(seed)
+        codes = [str(code) for code in frames["Student"]['student_id']]
+        latencies, lock = [], threading.Lock()
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(target=_kiosk, args=(
+                index, buffer, codes, 1, kiosks / rate, deadline,
+                random.Random(rng.random()), duplicate_share, latencies, lock,
+            ))
+            for _ in range(kiosks)
+        ]
+        for thread in threads:
+            thread.start()
+        max_backlog = 0
+        while any(thread.is_alive() for thread in threads):
+            max_backlog = max(max_backlog, buffer.pending)
+            time.sleep(0.05)
+
+        drain_started = time.perf_counter()
+        buffer.stop()
+        drain_seconds = time.perf_counter() - drain_started
+    finally:
+        io_client.close()
+        db.shutdown()
+
+    rows = db.tables.get("Attendance", [])
+    per_key = Counter((r['attendance_date'], r['activity_id'], r['student_id']) for r in rows)
+    latencies_ms = sorted(x * 1000 for x in latencies)
+    result = {
+        'scans': len(latencies),
+        'achieved_rate': round(len(latencies) / seconds, 1),
+        'accepted': buffer.stats['accepted'],
+        'duplicates_blocked': buffer.stats['duplicates'],
+        'rows_written': len(rows),
+        'duplicate_rows': sum(n - 1 for n in per_key.values()),
+        'insert_requests': len(flushes),
+        'mean_batch': round(statistics.mean(flushes), 1) if flushes else 0,
+        'max_backlog': max_backlog,
+        'drain_seconds': round(drain_seconds, 3),
+        'scan_p50_ms': round(latencies_ms[len(latencies_ms) // 2], 3) if latencies_ms else None,
+        'scan_p95_ms': round(latencies_ms[int(len(latencies_ms) * 0.95)], 3) if latencies_ms else None,
+        'failed_flushes': buffer.stats['failed_flushes'],
+    }
+    result['ok'] = (
+        result['rows_written'] == result['accepted']
+        and result['duplicate_rows'] == 0
+        and result['achieved_rate'] >= rate * 0.9
+    )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=20.0, help="Combined check-ins per second")
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--kiosks', type=int, default=4)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument('--duplicates', type=float, default=0.05, help="Share of scans that repeat a code")
+    parser.add_argument('--flush-interval', type=float, default=1.0)
+    parser.add_argument('--max-batch', type=int, default=500)
+    args = parser.parse_args()
+    result = run(args.rate, args.seconds, args.kiosks, args.students, args.latency, args.duplicates,
+                 args.flush_interval, args.max_batch)
+    for name, value in result.items():
+        print(f"{name:>20}: {value}")
+    sys.exit(0 if result['ok'] else 1)
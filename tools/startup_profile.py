@@ -0,0 +1,197 @@
+"""Startup profile of the app: time to the first login render, and what it imports.
+
+Each run starts a fresh Python process (``python -X importtime``) that renders
+``app.py`` through Streamlit's testing framework against the local PostgREST
+stand-in, as the first visitor of a newly started container would: first the
+login screen, then, after the time it takes to type a password, a login and
+the first page after it.  The imports each
+phase triggers are summed per top-level package, so a module that starts
+loading on the login screen shows up at once:
+
+    python -m tools.startup_profile --runs 5 --save before.json
+    python -m tools.startup_profile --runs 5 --compare before.json
+
+Times are medians over the runs, in milliseconds.  ``process`` is the
+interpreter start plus importing Streamlit, which a server pays once before
+any session.  With ``--compare`` the exit code is 1 if the time to the first
+login render (or the whole startup) is slower than the baseline's by more
+than the tolerance.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from tools.app_load_test import APP_PATH, PASSWORD, _version_label
+from tools.fake_postgrest import FakePostgrest, demo_tables
+
+MARKER = "startup_profile:"
+PHASES = ('process', 'login_render', 'first_page')
+
+# Runs in the profiled process; the phases are written to stderr between importtime's own lines
+CHILD = f"""
+import sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+
+def mark(phase, since):
+    sys.stderr.write("{MARKER} %s %.6f\\n" % (phase, time.perf_counter() - since))
+    sys.stderr.flush()
+    return time.perf_counter()
+
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.secrets["SUPABASE_URL"], at.secrets["SUPABASE_KEY"], at.secrets["CHANGE_FEED"] = sys.argv[2], "local", "local"
+started = mark("process", started)
+at.run()
+mark("login_render", started)
+time.sleep(float(sys.argv[5]))
+started = time.perf_counter()
+at.text_input[0].input(sys.argv[3])
+at.text_input[1].input(sys.argv[4])
+at.button[0].click()
+at.run()
+mark("first_page", started)
+problems = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+sys.stderr.write("{MARKER} errors %s\\n" % len(problems))
+for problem in problems:
+    sys.stderr.write("{MARKER} error %s\\n" % problem.replace("\\n", " "))
+"""
+
+
+def parse(stderr):
+    """``(seconds, imports_ms, errors)`` of one run from its stderr.
+
+    ``imports_ms`` is ``{phase: {package: ms}}``: the self time of every
+    module imported during the phase, summed per top-level package.
+    """
+    seconds, errors = {}, []
+    imports = {phase: {} for phase in PHASES}
+    current = imports[PHASES[0]]
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            kind, _, value = line[len(MARKER):].strip().partition(" ")
+            if kind in imports:
+                seconds[kind] = float(value)
+                following = PHASES.index(kind) + 1
+                current = imports[PHASES[following]] if following < len(PHASES) else {}
+            elif kind == "error":
+                errors.append(value)
+        elif line.startswith("import time:") and "|" in line:
+            self_us, _, name = [field.strip() for field in line[len("import time:"):].split("|")]
+            if self_us.isdigit():
+                package = name.split(".")[0]
+                current[package] = current.get(package, 0) + int(self_us) / 1000
+    return seconds, imports, errors
+
+
+def profile_once(url, servant_name, password, typing):
+    with tempfile.TemporaryDirectory() as state_dir:
+        # A fresh temp dir: no table versions or archive left by an earlier run or a real instance
+        env = {**os.environ, "TMPDIR": state_dir, "PYTHONDONTWRITEBYTECODE": "1"}
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD, APP_PATH, url, servant_name, password, str(typing)],
+            capture_output=True, text=True, env=env, cwd=os.path.dirname(APP_PATH),
+        )
+        wall = time.perf_counter() - started
+    seconds, imports, errors = parse(result.stderr)
+    if result.returncode != 0 or set(seconds) != set(PHASES):
+        errors.append(f"exit code {result.returncode}: {result.stderr.strip().splitlines()[-1:]}")
+    return wall, seconds, imports, errors
+
+
+def run(runs=5, students=2000, attendance=20000, latency=0.02, typing=3.0, seed=7, top=12):
+    """Profile ``runs`` cold starts; returns the report of their medians."""
+    tables = demo_tables(students=students, attendance=attendance, seed=seed)
+    servant_name = next(s['servant_name'] for s in tables['Servant'] if s['role'] == 'Servant')
+    db = FakePostgrest(tables, latency=latency)
+    url = db.serve()
+    try:
+        samples = [profile_once(url, servant_name, PASSWORD, typing) for _ in range(runs)]
+    finally:
+        db.shutdown()
+
+    def median_ms(values):
+        return round(statistics.median(values) * 1000, 1)
+
+    imports = {}
+    for phase in PHASES:
+        packages = {package for _, _, phase_imports, _ in samples for package in phase_imports[phase]}
+        per_package = {
+            package: round(statistics.median(s[2][phase].get(package, 0) for s in samples), 1) for package in packages
+        }
+        ranked = sorted(per_package.items(), key=lambda item: -item[1])
+        imports[phase] = {
+            'total_ms': round(sum(per_package.values()), 1),
+            'packages_ms': dict(ranked[:top]),
+        }
+    return {
+        'version': _version_label(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'params': {
+            'runs': runs, 'students': students, 'attendance': attendance,
+            'latency': latency, 'typing': typing, 'seed': seed,
+        },
+        'wall_ms': median_ms([wall for wall, _, _, _ in samples]),
+        'phases_ms': {phase: median_ms([s[1].get(phase, 0) for s in samples]) for phase in PHASES},
+        'imports': imports,
+        'errors': [error for _, _, _, errors in samples for error in errors][:5],
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Messages for the startup times that regressed by more than ``tolerance``."""
+    checks = {
+        'login render': (report['phases_ms']['login_render'], baseline['phases_ms']['login_render']),
+        'process start to login render': (
+            report['phases_ms']['process'] + report['phases_ms']['login_render'],
+            baseline['phases_ms']['process'] + baseline['phases_ms']['login_render'],
+        ),
+    }
+    return [
+        f"{name}: {old:.1f} -> {new:.1f} ms" for name, (new, old) in checks.items() if new > old * (1 + tolerance)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="Cold starts to take the median of")
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--attendance', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds added to every request")
+    parser.add_argument('--typing', type=float, default=3.0, help="Seconds between the login screen and logging in")
+    parser.add_argument('--top', type=int, default=12, help="Packages listed per phase")
+    parser.add_argument('--save', help="Write the report to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed regression before failing")
+    args = parser.parse_args()
+
+    report = run(args.runs, args.students, args.attendance, args.latency, args.typing, top=args.top)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"baseline: {baseline['version']} ({baseline['timestamp']})")
+    print(f"version: {report['version']}, median of {args.runs} cold starts, {report['wall_ms']} ms per process")
+    for phase in PHASES:
+        line = f"{phase:>13}: {report['phases_ms'][phase]:>8.1f} ms, imports {report['imports'][phase]['total_ms']:>7.1f} ms"
+        if baseline:
+            line += f"  (baseline {baseline['phases_ms'][phase]:.1f} ms, imports {baseline['imports'][phase]['total_ms']:.1f} ms)"
+        print(line)
+        for package, ms in report['imports'][phase]['packages_ms'].items():
+            print(f"{'':>15}{package:<24}{ms:>8.1f} ms")
+    for error in report['errors']:
+        print(f"    {error}", file=sys.stderr)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    regressions = compare(report, baseline, args.tolerance) if baseline else []
+    for message in regressions:
+        print(f"REGRESSION: {message}", file=sys.stderr)
+    sys.exit(1 if regressions or report['errors'] else 0)
@@ -0,0 +1,173 @@
+"""Train and evaluate the disengagement-risk model of ``jobs/risk.py``.
+
+Training examples are (student, scoring date) pairs taken every
+``--step-weeks`` weeks through the history, for students who attended at least
+once in the ``HISTORY_WEEKS`` before the date.  The label is 1 when the student
+then has no core attendance for ``LABEL_WEEKS`` weeks.  The examples of the
+last quarter of the dates are held out: the report compares the model with
+recency alone (what the threshold rules use) on them, and the saved model is
+then refit on every example.
+
+The history is either the church's own (``--source supabase``, credentials as
+for ``data/headless.py``) or a seeded synthetic one in which some students fade
+out gradually and some stop abruptly (``--source synthetic``, the default, from
+which the shipped ``jobs/risk_model.json`` is built):
+
+    python -m tools.train_risk_model --source synthetic --seed 7
+    python -m tools.train_risk_model --source supabase --no-save
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from jobs.risk import FEATURES, HISTORY_WEEKS, LABEL_WEEKS, MODEL_PATH, RiskModel, _core_ids, student_features
+from tools.fake_postgrest import ACTIVITIES
+
+SYNTHETIC_END = date(2025, 6, 29)  # fixed so synthetic runs are reproducible
+ACTIVITY_WEEKDAY = [0, 5, 3, 6, 2]  # days after Sunday each demo activity is held
+
+
+def synthetic_history(students=1500, weeks=104, seed=7):
+    """``(attendance, activities)`` with weekly activities and fading, dropping or steady students."""
+    rng = np.random.default_rng(seed)
+    activities = pd.DataFrame(
+        [(i + 1, name, kind) for i, (name, kind) in enumerate(ACTIVITIES)],
+        columns=['activity_id', 'activity_name', 'activity_type'],
+    )
+    core = (activities['activity_type'] == 'Core').to_numpy()
+    # Weekly attendance probability per student and activity
+    base = np.where(core, rng.beta(4, 2, (students, len(activities))), rng.beta(1, 8, (students, len(activities))))
+
+    week = np.arange(weeks)
+    start = rng.integers(0, weeks, students)
+    kind = rng.choice(['steady', 'fading', 'dropping'], students, p=[0.6, 0.3, 0.1])
+    elapsed = np.maximum(week[None, :] - start[:, None], 0)
+    decay = rng.uniform(0.8, 0.95, students)[:, None] ** elapsed
+    engagement = np.select(
+        [kind[:, None] == 'fading', kind[:, None] == 'dropping'],
+        [decay, np.where(week[None, :] >= start[:, None], 0.02, 1.0)],
+        default=1.0,
+    )
+
+    present = rng.random((students, weeks, len(activities))) < base[:, None, :] * engagement[:, :, None]
+    student_pos, week_pos, activity_pos = np.nonzero(present)
+    first_sunday = SYNTHETIC_END - timedelta(weeks=weeks - 1)
+    days = week_pos * 7 + np.array(ACTIVITY_WEEKDAY)[activity_pos]
+    attendance = pd.DataFrame({
+        'attendance_id': np.arange(1, len(student_pos) + 1),
+        'attendance_date': pd.Timestamp(first_sunday) + pd.to_timedelta(days, unit='D'),
+        'student_id': student_pos + 1,
+        'activity_id': activities['activity_id'].to_numpy()[activity_pos],
+    })
+    return attendance[attendance['attendance_date'] <= pd.Timestamp(SYNTHETIC_END)], activities
+
+
+def build_examples(attendance, activities, step_weeks=2):
+    """Features and labels for every scoring date; returns ``(features, labels, dates)``."""
+    dates = pd.to_datetime(attendance['attendance_date'])
+    first, last = dates.min().normalize(), dates.max().normalize()
+    cutoffs = pd.date_range(first + timedelta(weeks=HISTORY_WEEKS), last - timedelta(weeks=LABEL_WEEKS), freq=f'{7 * step_weeks}D')
+    student_ids = np.sort(attendance['student_id'].unique())
+    core_rows = attendance['activity_id'].isin(_core_ids(activities)).to_numpy()
+
+    frames, labels, example_dates = [], [], []
+    for cutoff in cutoffs:
+        features = student_features(attendance, activities, student_ids, cutoff)
+        active = features['weeks_attended'].to_numpy() > 0
+        ahead = core_rows & (dates > cutoff).to_numpy() & (dates <= cutoff + timedelta(weeks=LABEL_WEEKS)).to_numpy()
+        returned = np.isin(student_ids, attendance.loc[ahead, 'student_id'].to_numpy())
+        frames.append(features[active])
+        labels.append((~returned[active]).astype(float))
+        example_dates.append(np.full(active.sum(), cutoff.value))
+    return pd.concat(frames), np.concatenate(labels), np.concatenate(example_dates)
+
+
+def fit(features, labels, l2=1e-3, iterations=2000, learning_rate=0.5):
+    """Logistic regression by full-batch gradient descent."""
+    x = features[FEATURES].to_numpy(dtype=float)
+    mean, scale = x.mean(axis=0), x.std(axis=0)
+    scale[scale == 0] = 1.0
+    x = (x - mean) / scale
+    weights, bias = np.zeros(x.shape[1]), 0.0
+    for _ in range(iterations):
+        error = 1.0 / (1.0 + np.exp(-(x @ weights + bias))) - labels
+        weights -= learning_rate * (x.T @ error / len(x) + l2 * weights)
+        bias -= learning_rate * error.mean()
+    return RiskModel(mean, scale, weights, float(bias), {})
+
+
+def auc(scores, labels):
+    """Area under the ROC curve (the rank-sum form, ties averaged)."""
+    ranks = pd.Series(scores).rank().to_numpy()
+    positives = labels == 1
+    n_pos, n_neg = positives.sum(), (~positives).sum()
+    if not n_pos or not n_neg:
+        return float('nan')
+    return float((ranks[positives].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def precision_at(scores, labels, share=0.1):
+    top = np.argsort(-scores)[:max(1, int(len(scores) * share))]
+    return float(labels[top].mean())
+
+
+def evaluate(model, features, labels):
+    scores = model.score(features)
+    return {
+        'examples': int(len(labels)),
+        'positive_share': round(float(labels.mean()), 3),
+        'auc': round(auc(scores, labels), 3),
+        'precision_top_10pct': round(precision_at(scores, labels), 3),
+        'recency_only_auc': round(auc(features['days_since_last'].to_numpy(), labels), 3),
+        'recency_only_precision_top_10pct': round(precision_at(features['days_since_last'].to_numpy(), labels), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=["synthetic", "supabase"], default="synthetic")
+    parser.add_argument("--students", type=int, default=1500, help="synthetic students")
+    parser.add_argument("--weeks", type=int, default=104, help="synthetic weeks of history")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--step-weeks", type=int, default=2, help="weeks between scoring dates")
+    parser.add_argument("--output", default=MODEL_PATH)
+    parser.add_argument("--no-save", action="store_true", help="only print the evaluation")
+    args = parser.parse_args(argv)
+
+    if args.source == "synthetic":
+        attendance, activities = synthetic_history(args.students, args.weeks, args.seed)
+    else:
+        from data.headless import load_tables
+        tables = load_tables()
+        attendance, activities = tables['attendance'], tables['activities']
+    if attendance.empty:
+        print("No attendance to train on.")
+        return 1
+
+    features, labels, example_dates = build_examples(attendance, activities, args.step_weeks)
+    split = np.quantile(np.unique(example_dates), 0.75)
+    train = example_dates <= split
+    report = evaluate(fit(features[train], labels[train]), features[~train], labels[~train])
+    print(f"Held-out evaluation ({args.source}, last quarter of the scoring dates):")
+    for name, value in report.items():
+        print(f"  {name:34} {value}")
+
+    model = fit(features, labels)
+    model.metadata = {
+        'source': args.source, 'seed': args.seed if args.source == "synthetic" else None,
+        'examples': int(len(labels)), 'holdout': report,
+    }
+    print("Weights (standardized features):")
+    for name, weight in zip(FEATURES, model.weights):
+        print(f"  {name:34} {weight:+.3f}")
+    if not args.no_save:
+        model.save(args.output)
+        print(f"Saved {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 import streamlit as st
 import pandas as pd
+from data import bulk, importer, partitions
+from data.versions import publish_local_change
 
 # --- LOAD DATA & AUTHENTICATION ---
 if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
@@ -7,12 +9,16 @@ if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
     st.stop()
 
 # Get data from session state
-supabase = st.session_state.supabase
+supabase_io = st.session_state.supabase_io
+table_versions = st.session_state.table_version_store
 user_role = st.session_state.user_role
+current_user_id = st.session_state.current_user_id
 students = st.session_state.students
 classes = st.session_state.classes
 activities = st.session_state.activities
 servants = st.session_state.servants
+attendance = st.session_state.attendance
+departments = st.session_state.departments
 
 # --- PAGE TITLE & PERMISSIONS ---
 st.title("⚙️ Data Management Panel")
@@ -22,21 +28,147 @@ if user_role not in ['Chief Manager', 'Department Manager', 'Priest']:
     st.stop()
 
 st.info("This panel allows you to perform administrative actions. Please be careful.")
+
+# --- DATA FOOTPRINT (memory used by each loaded table, before/after typing) ---
+memory_report = st.session_state.get("memory_report")
+if memory_report is not None and not memory_report.empty:
+    with st.expander("Loaded data memory footprint (before = estimated untyped size)"):
+        st.dataframe(
+            memory_report.assign(
+                kb_before=(memory_report['bytes_before'] / 1024).round(1),
+                kb_after=(memory_report['bytes_after'] / 1024).round(1),
+            )[['table', 'rows', 'kb_before', 'kb_after', 'reduction']],
+            use_container_width=True, hide_index=True,
+            column_config={
+                "table": "Table", "rows": "Rows", "kb_before": "Before (KB)",
+                "kb_after": "After (KB)", "reduction": "Reduction (x)"
+            }
+        )
+
+attendance_archive = st.session_state.get("attendance_archive")
+if attendance_archive is not None and attendance_archive.years():
+    with st.expander("Archived attendance (past academic years, loaded on demand)"):
+        st.dataframe(
+            attendance_archive.summary(), use_container_width=True, hide_index=True,
+            column_config={"academic_year": "Academic Year", "rows": "Rows", "file_kb": "On Disk (KB)"}
+        )
+
+scheduler = st.session_state.get("scheduler")
+if scheduler is not None:
+    with st.expander("Background precomputation jobs"):
+        st.dataframe(scheduler.metrics(), use_container_width=True, hide_index=True)
+
+request_latency = supabase_io.metrics.summary()
+if not request_latency.empty:
+    with st.expander("Database request latency (this server process)"):
+        st.dataframe(request_latency, use_container_width=True, hide_index=True)
 st.markdown("---")
 
 # --- HELPER FUNCTION FOR DATA REFRESH ---
 def refresh_data():
-    # Now this will fetch the updated activities table including the new column
-    st.session_state.activities = pd.DataFrame(supabase.from_("Activity").select("*").execute().data)
+    # Bump the Activity version: every session (this one on the rerun) refetches
+    # only the Activity table and rebuilds what depends on it.
+    table_versions.bump("Activity")
     st.rerun()
 
 # --- UI with Tabs for each management task ---
-tab1, tab2, tab3 = st.tabs(["🎓 Student Management", "⛪ Class Management", "📝 Activity Management"])
+tab1, tab2, tab3, tab4 = st.tabs(["🎓 Student Management", "⛪ Class Management", "📝 Activity Management", "📥 Import Attendance"])
 
-# --- Tab 1 & 2 (Unchanged) ---
+# --- Tab 1: Student Management ---
 with tab1:
     st.header("Update Student's Class")
-    # ... (existing student management code)
+    st.markdown("---")
+    class_names = classes.set_index('class_id')['class_name']
+
+    def apply_class_changes(plan):
+        # One PATCH per target class (chunked), then a single in-memory update of the batches that succeeded
+        with st.spinner(f"Moving {len(plan)} students..."):
+            try:
+                outcome = bulk.submit_plan(supabase_io, plan).result(timeout=120)
+            except Exception:
+                # Some batches may be written already: every session refetches the Student table
+                table_versions.bump("Student")
+                raise
+        applied = outcome['applied']
+        if not applied.empty:
+            publish_local_change(st.session_state, "Student", bulk.apply_plan_in_memory(students, applied))
+            st.success(f"✅ Moved {len(applied)} students using {outcome['requests']} database request(s).")
+        for failure in outcome['failed']:
+            names = plan.loc[plan['student_id'].isin(failure['student_ids']), 'student_name'].astype(str).tolist()
+            st.error(
+                f"Could not move {len(names)} student(s) to {class_names.get(failure['to_class_id'])}: "
+                f"{failure['error']} ({', '.join(names[:10])}{', ...' if len(names) > 10 else ''})"
+            )
+
+    # --- Section 1: Move selected students ---
+    with st.container(border=True):
+        st.subheader("Move Students to Another Class")
+        with st.form("move_students_form"):
+            student_labels = (students['student_name'].astype(str) + " (" + students['class_id'].map(class_names).astype(str) + ")")
+            selected_students = st.multiselect(
+                "Students", options=students['student_id'].tolist(),
+                format_func=dict(zip(students['student_id'], student_labels)).get
+            )
+            target_class_name = st.selectbox("Move to Class", options=sorted(classes['class_name'].astype(str).tolist()))
+            move_submitted = st.form_submit_button("Move Students")
+
+            if move_submitted:
+                target_class_id = int(classes[classes['class_name'] == target_class_name]['class_id'].iloc[0])
+                plan = bulk.build_student_plan(students, selected_students, target_class_id)
+                if plan.empty:
+                    st.warning("No selected student needs to move.")
+                else:
+                    try:
+                        apply_class_changes(plan)
+                    except Exception as e:
+                        st.error(f"An error occurred: {e}")
+
+    # --- Section 2: Whole-department promotion ---
+    with st.container(border=True):
+        st.subheader("Yearly Promotion (Whole Department)")
+        st.markdown("Map every class to the class its students move into, preview the changes, then apply them in one go.")
+        promo_dep_name = st.selectbox(
+            "Department", ["-- Select a Department --"] + sorted(departments['dep_name'].astype(str).tolist()), key="promo_dep"
+        )
+        if promo_dep_name != "-- Select a Department --":
+            promo_dep_id = departments[departments['dep_name'] == promo_dep_name]['dep_id'].iloc[0]
+            default_map = bulk.default_promotion_map(classes, promo_dep_id)
+            no_change = "(no change)"
+            mapping_df = pd.DataFrame({
+                'From Class': [class_names[c] for c in default_map],
+                'To Class': [class_names[t] if t is not None else no_change for t in default_map.values()],
+            })
+            edited_map = st.data_editor(
+                mapping_df, hide_index=True, use_container_width=True, disabled=['From Class'],
+                key=f"promo_map_{promo_dep_id}",
+                column_config={
+                    "To Class": st.column_config.SelectboxColumn(
+                        "To Class", options=[no_change] + sorted(classes['class_name'].astype(str).tolist()), required=True
+                    )
+                }
+            )
+            class_ids = dict(zip(classes['class_name'].astype(str), classes['class_id']))
+            class_map = {
+                class_ids[row['From Class']]: None if row['To Class'] == no_change else class_ids[row['To Class']]
+                for _, row in edited_map.iterrows()
+            }
+            plan = bulk.build_plan(students, class_map)
+            if plan.empty:
+                st.info("This mapping does not move any students.")
+            else:
+                preview, summary = bulk.describe_plan(plan, classes)
+                st.markdown(f"**Preview:** {len(plan)} students will change class.")
+                st.dataframe(summary, hide_index=True, use_container_width=True,
+                             column_config={"from_class": "From", "to_class": "To", "students": "Students"})
+                with st.expander(f"Show all {len(preview)} changes"):
+                    st.dataframe(preview, hide_index=True, use_container_width=True,
+                                 column_config={"student_name": "Student", "from_class": "From", "to_class": "To"})
+                confirm_promotion = st.checkbox(f"I have reviewed the {len(plan)} changes above.", key="promo_confirm")
+                if st.button("Apply Promotion", disabled=not confirm_promotion):
+                    try:
+                        apply_class_changes(plan)
+                    except Exception as e:
+                        st.error(f"An error occurred: {e}")
 with tab2:
     st.header("Manage Classes")
     st.write("Future implementation for creating, updating, or deleting classes.")
@@ -88,10 +220,13 @@ with tab3:
                     else:
                         try:
                             # UPDATED: The insert now includes the activity_type
-                            supabase.from_("Activity").insert({
+                            new_activity = {
                                 'activity_name': new_activity_name,
                                 'activity_type': new_activity_type
-                            }).execute()
+                            }
+                            if st.session_state.get('parish_id') is not None:
+                                new_activity['parish_id'] = st.session_state.parish_id
+                            st.session_state.connect_supabase().from_("Activity").insert(new_activity).execute()
                             st.success(f"Activity '{new_activity_name}' added!")
                             refresh_data() # Refresh data to show the new activity
                         except Exception as e:
@@ -118,7 +253,7 @@ with tab3:
                         else:
                             try:
                                 activity_id = activities[activities['activity_name'] == activity_to_delete]['activity_id'].iloc[0]
-                                supabase.from_("Activity").delete().eq('activity_id', int(activity_id)).execute()
+                                st.session_state.connect_supabase().from_("Activity").delete().eq('activity_id', int(activity_id)).execute()
                                 st.success(f"Activity '{activity_to_delete}' has been deleted.")
                                 refresh_data()
                             except Exception as e:
@@ -126,3 +261,52 @@ with tab3:
             else:
                 st.info("There are no activities to delete.")
 
+# --- Tab 4: Bulk Import of Historical Attendance ---
+with tab4:
+    st.header("Import Historical Attendance")
+    st.markdown(
+        "Upload a CSV or Excel file with the columns **attendance_date**, **activity_name** and either "
+        "**student_name** or **student_id** (add **class_name** when two students share a name). "
+        "Rows are processed in chunks; duplicates of existing records are skipped."
+    )
+    uploaded_file = st.file_uploader("Attendance file", type=['csv', 'xlsx'])
+    if uploaded_file is not None:
+        checkpoint_state = importer.Checkpoint(
+            importer.file_fingerprint(uploaded_file), st.session_state.get('parish_id')
+        ).load()
+        if checkpoint_state['rows_done']:
+            st.info(f"A previous import of this file stopped after {checkpoint_state['rows_done']:,} rows. It will resume from there.")
+
+        if st.button("Start Import", type="primary"):
+            progress_bar = st.progress(0.0, text="Starting import...")
+
+            def show_progress(fraction, state):
+                progress_bar.progress(
+                    fraction,
+                    text=f"{state['rows_done']:,} rows read · {state['inserted']:,} inserted · "
+                         f"{state['duplicates']:,} duplicates · {state['rejected']:,} rejected"
+                )
+
+            lookups = importer.ImportLookups(students, classes, activities)
+            # Historical files may repeat rows of past academic years, so deduplicate against the archive too
+            existing_attendance = partitions.full_history(st.session_state.attendance_archive, attendance)
+            try:
+                summary, rejected_rows = importer.run_import(
+                    supabase_io, uploaded_file, uploaded_file.name, lookups, existing_attendance, current_user_id,
+                    on_progress=show_progress, parish_id=st.session_state.get('parish_id')
+                )
+                progress_bar.progress(1.0, text="Import complete.")
+                st.success(
+                    f"✅ Imported {summary['inserted']:,} records "
+                    f"({summary['duplicates']:,} duplicates skipped, {summary['rejected']:,} rows rejected)."
+                )
+                if not rejected_rows.empty:
+                    st.download_button(
+                        "Download rejected rows", rejected_rows.to_csv(index=False).encode('utf-8'),
+                        file_name="rejected_attendance_rows.csv", mime="text/csv"
+                    )
+            except Exception as e:
+                st.error(f"The import stopped: {e}. Upload the same file again to resume.")
+            finally:
+                # Every session picks up the new rows (appended incrementally)
+                table_versions.bump("Attendance")
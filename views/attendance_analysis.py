@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+from datetime import date
+from jobs.cohorts import cohort_retention, with_archived_presence
+from analytics import Dataset, class_trends, range_options
+from jobs.precompute import get_or_compute, month_labels
 
 # --- LOAD DATA FROM SESSION STATE ---
 if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
@@ -12,22 +15,24 @@ activities = st.session_state.activities
 departments = st.session_state.departments
 classes = st.session_state.classes
 students = st.session_state.students
+attendance_archive = st.session_state.attendance_archive
+dataset = Dataset.from_session(st.session_state)
 
 # --- PAGE TITLE ---
 st.title("📈 Attendance Analysis")
 st.markdown("---")
 
 # --- DATA PREPARATION ---
-if not attendance.empty:
-    attendance['attendance_date'] = pd.to_datetime(attendance['attendance_date'])
-    attendance['month_year'] = attendance['attendance_date'].dt.strftime('%Y-%B')
-    attendance_merged = attendance.merge(activities, on='activity_id') \
-                                  .merge(classes.drop(columns=['dep_id']), on='class_id') \
-                                  .merge(departments, on='dep_id') \
-                                  .merge(students, on='student_id') # Added students for name
-else:
+# The hot partition can be empty early in a year while the archive still holds past years
+if attendance.empty and not attendance_archive.years():
     st.error("No attendance data found in the database.")
     st.stop()
+# The session's table is shared with other sessions: add the month on a new frame
+attendance = attendance.assign(month_year=month_labels(attendance['attendance_date']))
+attendance_merged = attendance.merge(activities, on='activity_id') \
+                              .merge(classes.drop(columns=['dep_id']), on='class_id') \
+                              .merge(departments, on='dep_id') \
+                              .merge(students, on='student_id') # Added students for name
 
 # --- SECTION 1: COMPARATIVE ANALYSIS (Unchanged) ---
 st.header("📊 Comparative Analysis (Snapshot in Time)")
@@ -54,20 +59,30 @@ with filter_container:
     with col4:
         month_list = ["-- Select a Month --"] + sorted(attendance['month_year'].unique(), key=lambda m: pd.to_datetime(m, format='%Y-%B'), reverse=True)
         selected_month = st.selectbox("Month", month_list, key="bar_month")
+    bar_metric = st.radio("Compare by", ["Participation rate", "Total attendance"], horizontal=True, key="bar_metric")
 if selected_department != "-- Select a Department --" and selected_activity != "-- Select an Activity --" and selected_month != "-- Select a Month --":
     if not selected_classes: st.warning("Please select at least one class to compare.")
     else:
-        filtered_df = attendance_merged[(attendance_merged['dep_name'] == selected_department) & (attendance_merged['activity_name'] == selected_activity) & (attendance_merged['month_year'] == selected_month) & (attendance_merged['class_name'].isin(selected_classes))]
-        if filtered_df.empty: st.warning("No attendance records found for the selected criteria.")
+        import plotly.express as px  # loaded by the first chart drawn, not when the page opens
+        # Attended / (enrolled x sessions held) per class, precomputed with the other aggregates (see jobs/sessions.py)
+        rates = get_or_compute('participation_rates', st.session_state)
+        bar_activity_id = activities[activities['activity_name'] == selected_activity]['activity_id'].iloc[0]
+        final_counts = rates[(rates['month_year'] == selected_month) & (rates['activity_id'] == bar_activity_id)] \
+            .merge(classes[classes['class_name'].isin(selected_classes)][['class_id', 'class_name']], on='class_id')
+        if final_counts.empty: st.warning("No attendance records found for the selected criteria.")
         else:
-            class_attendance_counts = filtered_df['class_name'].value_counts().reset_index(); class_attendance_counts.columns = ['Class', 'Total Attendance']
-            students_per_class = students.merge(classes, on='class_id')['class_name'].value_counts().reset_index(); students_per_class.columns = ['Class', 'Total Students']
-            final_counts = class_attendance_counts.merge(students_per_class, on='Class')
-            final_counts['Participation (%)'] = round((final_counts['Total Attendance'] / final_counts['Total Students']) * 100, 1)
-            final_counts['Chart Text'] = final_counts.apply(lambda row: f"{row['Total Attendance']} / {row['Total Students']} ({row['Participation (%)']:.0f}%)", axis=1)
-            fig = px.bar(final_counts, x='Class', y='Total Attendance', title=f"Attendance for '{selected_activity}' in {selected_month}", text='Chart Text', template='plotly_white', color='Class')
-            fig.update_traces(textposition='outside'); max_val = final_counts['Total Attendance'].max()
-            fig.update_layout(showlegend=False, yaxis_range=[0, max_val * 1.25], xaxis_title=None, yaxis_title="Total Attendance Count"); st.plotly_chart(fig, use_container_width=True)
+            final_counts = final_counts.rename(columns={'class_name': 'Class', 'attendance_count': 'Total Attendance', 'participation_rate': 'Participation (%)'})
+            final_counts['Class'] = final_counts['Class'].astype(str)
+            if bar_metric == "Participation rate":
+                y_column, y_title = 'Participation (%)', "Participation Rate (%)"
+                final_counts['Chart Text'] = [f"{a} / ({e} × {n}) = {r:.0f}%" for a, e, n, r in zip(final_counts['Total Attendance'], final_counts['enrolled'], final_counts['sessions'], final_counts['Participation (%)'].fillna(0))]
+            else:
+                y_column, y_title = 'Total Attendance', "Total Attendance Count"
+                final_counts['Chart Text'] = [f"{a} in {n} session(s)" for a, n in zip(final_counts['Total Attendance'], final_counts['sessions'])]
+            fig = px.bar(final_counts, x='Class', y=y_column, title=f"{bar_metric} for '{selected_activity}' in {selected_month}", text='Chart Text', template='plotly_white', color='Class')
+            fig.update_traces(textposition='outside'); max_val = final_counts[y_column].max()
+            fig.update_layout(showlegend=False, yaxis_range=[0, max_val * 1.25], xaxis_title=None, yaxis_title=y_title); st.plotly_chart(fig, use_container_width=True)
+            st.caption("Participation rate = attendances / (students in the class × sessions the class held that month).")
 else: st.info("Please select a department, activity, and month to see the comparison.")
 
 # --- SECTION 2: TREND ANALYSIS (Unchanged) ---
@@ -77,19 +92,22 @@ st.header("📉 Trend Analysis Over Time")
 st.markdown("See how class attendance has trended and ranked over several months for a specific activity.")
 trend_container = st.container(border=True)
 with trend_container:
-    col_t1, col_t2 = st.columns(2)
+    col_t1, col_t2, col_t3 = st.columns(3)
     with col_t1:
         trend_dept_list = ["-- Select a Department --"] + sorted(departments['dep_name'].unique().tolist())
         trend_selected_dept = st.selectbox("Select a Department", trend_dept_list, key="trend_dept")
     with col_t2:
         trend_activity_list = ["-- Select an Activity --"] + sorted(activities['activity_name'].unique().tolist())
         trend_selected_activity = st.selectbox("Select an Activity", trend_activity_list, key="trend_activity")
+    with col_t3:
+        # Past academic years are read from the archive only when picked
+        trend_range = st.selectbox("Time Range", range_options(dataset), key="trend_range")
     if trend_selected_dept != "-- Select a Department --" and trend_selected_activity != "-- Select an Activity --":
-        trend_filtered_df = attendance_merged[(attendance_merged['dep_name'] == trend_selected_dept) & (attendance_merged['activity_name'] == trend_selected_activity)]
-        if trend_filtered_df.empty: st.warning("No attendance data for the selected filters.")
+        # Same computation as the command line (see analytics/trends.py); the counts are precomputed in the background
+        trend_counts = class_trends(dataset, trend_selected_dept, trend_selected_activity, trend_range)
+        if trend_counts.empty: st.warning("No attendance data for the selected filters.")
         else:
-            trend_counts = trend_filtered_df.groupby(['month_year', 'class_name']).size().reset_index(name='attendance_count')
-            trend_counts['month_datetime'] = pd.to_datetime(trend_counts['month_year'], format='%Y-%B'); trend_counts = trend_counts.sort_values('month_datetime')
+            import plotly.express as px
             tab1, tab2 = st.tabs(["📈 Line Chart (Trend)", "🏆 Bar Chart Race (Ranking)"])
             with tab1:
                 fig_trend = px.line(trend_counts, x='month_year', y='attendance_count', color='class_name', markers=True, title=f'Monthly Trend for "{trend_selected_activity}"')
@@ -98,7 +116,8 @@ with trend_container:
                 st.info("Click the Play button to see how class rankings change over time.")
                 fig_race = px.bar(trend_counts, x="attendance_count", y="class_name", color="class_name", orientation='h', animation_frame="month_year", animation_group="class_name", text="attendance_count", title=f'Monthly Ranking for "{trend_selected_activity}"')
                 max_range = trend_counts['attendance_count'].max() * 1.1; fig_race.update_layout(xaxis_range=[0, max_range], showlegend=False, yaxis_title=None); fig_race.update_yaxes(categoryorder="total ascending")
-                fig_race.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = 1200; fig_race.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = 500
+                if fig_race.layout.updatemenus:  # no play controls when the range holds a single month
+                    fig_race.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = 1200; fig_race.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = 500
                 st.plotly_chart(fig_race, use_container_width=True)
 
 
@@ -141,6 +160,7 @@ with student_container:
     )
 
     if is_ready_to_run:
+        import plotly.express as px
         
         # 1. Get the full list of students for the selected class
         class_id_filter = classes[classes['class_name'] == s_selected_class]['class_id'].iloc[0]
@@ -196,3 +216,76 @@ with student_container:
 
     else:
         st.info("Please select a department, class, month, and activity to see the student-level breakdown.")
+
+
+# --- SECTION 4: COHORT RETENTION ---
+st.markdown("---")
+st.header("🧭 Cohort Retention")
+st.markdown("Of the students who first attended in a given month, what share still attended 1, 3, 6 or 12 months later?")
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_cohort_retention(_presence, _aggregates, _student_ids, scope, data_version, current_month_index, max_offset):
+    # Keyed by scope and data version only; the frames themselves are not hashed
+    presence = with_archived_presence(_presence, _aggregates)
+    return cohort_retention(presence, _student_ids, current_month_index, max_offset)
+
+cohort_container = st.container(border=True)
+with cohort_container:
+    col_c1, col_c2, col_c3 = st.columns(3)
+    with col_c1:
+        cohort_dept_list = ["-- Select a Department --"] + sorted(departments['dep_name'].unique().tolist())
+        cohort_selected_dept = st.selectbox("Select a Department", cohort_dept_list, key="cohort_dept")
+    with col_c2:
+        cohort_class_list = ["All Classes"]
+        if cohort_selected_dept != "-- Select a Department --":
+            cohort_dept_id = departments[departments['dep_name'] == cohort_selected_dept]['dep_id'].iloc[0]
+            cohort_class_list += sorted(classes[classes['dep_id'] == cohort_dept_id]['class_name'].unique().tolist())
+        cohort_selected_class = st.selectbox("Select a Class", cohort_class_list, key="cohort_class")
+    with col_c3:
+        cohort_max_offset = st.select_slider("Months to follow", options=[3, 6, 12, 18, 24], value=12, key="cohort_months")
+
+    if cohort_selected_dept != "-- Select a Department --":
+        import plotly.express as px
+        students_full_details = st.session_state.students_full_details
+        scope_students = students_full_details[students_full_details['dep_id'] == cohort_dept_id]
+        if cohort_selected_class != "All Classes":
+            scope_students = scope_students[scope_students['class_name'] == cohort_selected_class]
+
+        archive_manifest = attendance_archive.manifest()
+        table_versions = st.session_state.table_versions
+        today = date.today()
+        sizes, retention = cached_cohort_retention(
+            get_or_compute('monthly_presence', st.session_state), attendance_archive.aggregates(),
+            scope_students['student_id'].astype(int).tolist(),
+            (cohort_selected_dept, cohort_selected_class),
+            (table_versions.get('Attendance', 0), table_versions.get('Student', 0), archive_manifest['cutoff'], archive_manifest['boundary_id']),
+            today.year * 12 + today.month - 1, cohort_max_offset,
+        )
+
+        if retention.empty:
+            st.warning("No attendance found for the students in this scope.")
+        else:
+            # Size-weighted average over the cohorts old enough to have reached each milestone
+            milestones = [m for m in (1, 3, 6, 12) if m <= cohort_max_offset]
+            milestone_cols = st.columns(len(milestones))
+            for col, months in zip(milestone_cols, milestones):
+                reached = retention[months].notna()
+                with col:
+                    if reached.any():
+                        weighted = (retention.loc[reached, months] * sizes[reached]).sum() / sizes[reached].sum()
+                        st.metric(f"Retained after {months} month(s)", f"{weighted:.0f}%")
+                    else:
+                        st.metric(f"Retained after {months} month(s)", "-")
+
+            recent = retention.tail(24)
+            recent.index = [f"{cohort} (n={sizes[cohort]})" for cohort in recent.index]
+            fig_cohort = px.imshow(
+                recent, text_auto=True, aspect='auto', color_continuous_scale='Blues', zmin=0, zmax=100,
+                labels={'x': "Months Since First Attendance", 'y': "Cohort (First Month)", 'color': "Retention %"},
+                title=f"Retention by Cohort: {cohort_selected_class if cohort_selected_class != 'All Classes' else cohort_selected_dept}"
+            )
+            fig_cohort.update_xaxes(side='top', dtick=1)
+            st.plotly_chart(fig_cohort, use_container_width=True)
+            st.caption("Cohorts are placed by each student's first recorded attendance; blank cells are months a cohort has not reached yet.")
+    else:
+        st.info("Please select a department to see its cohort retention.")
@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from datetime import timedelta
+from data import background, matrix_entry
+from data.partitions import attendance_between
+from jobs.precompute import get_or_compute
 
 # --- LOAD DATA & AUTHENTICATION ---
 if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
@@ -8,13 +12,14 @@ if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
     st.stop()
 
 # Get data from session state
-supabase = st.session_state.supabase
+supabase_io = st.session_state.supabase_io
 user_role = st.session_state.user_role
 current_user_id = st.session_state.current_user_id
 servants = st.session_state.servants
 students = st.session_state.students
 activities = st.session_state.activities
 classes = st.session_state.classes
+attendance = st.session_state.attendance
 
 # --- PAGE TITLE ---
 st.title("📝 Attendance Entry")
@@ -38,31 +43,100 @@ if class_students.empty:
     st.warning("There are no students assigned to your class.")
     st.stop()
 
-# --- ATTENDANCE FORM (REFINED WITH CHECKBOXES) ---
+# Sessions the rest of the church held but this class has not recorded (see jobs/gaps.py)
+gaps = get_or_compute('missing_sessions', st.session_state)
+class_gaps = gaps[
+    (gaps['class_id'] == user_class_id) & (gaps['session_date'] >= pd.Timestamp(datetime.now().date() - timedelta(days=90)))
+].merge(activities[['activity_id', 'activity_name']], on='activity_id')
+if not class_gaps.empty:
+    missing_list = ", ".join(f"{name} on {day:%a %d %b}" for name, day in zip(class_gaps['activity_name'], class_gaps['session_date']))
+    st.warning(f"Your class has {len(class_gaps)} session(s) without attendance in the last 90 days: {missing_list}. "
+               "Use the catch-up mode to record them.")
+
+entry_mode = st.radio("Entry mode", ["Single session", "Catch-up (several dates)"], horizontal=True)
+
+# --- CATCH-UP MATRIX (STUDENTS x DATES x ACTIVITIES, ONE SUBMISSION) ---
+if entry_mode == "Catch-up (several dates)":
+    st.info(f"Catching up attendance for **Class: {class_students['class_name'].iloc[0]}**. Tick every session each student attended, then submit once.")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        today = datetime.now().date()
+        date_range = st.date_input("Dates", value=(today - timedelta(days=27), today), max_value=today)
+    with col2:
+        weekday_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        selected_weekdays = st.multiselect("Meeting days", options=weekday_names, default=[weekday_names[today.weekday()]])
+    with col3:
+        selected_activities = st.multiselect("Activities", options=activities['activity_name'].tolist())
+
+    if len(date_range) != 2 or not selected_activities:
+        st.info("Choose a date range and at least one activity.")
+        st.stop()
+
+    dates = matrix_entry.session_dates(*date_range, [weekday_names.index(day) for day in selected_weekdays])
+    columns = matrix_entry.session_columns(dates, activities[activities['activity_name'].isin(selected_activities)])
+    if not columns:
+        st.warning("No dates in this range fall on the selected meeting days.")
+        st.stop()
+    if len(columns) > matrix_entry.MAX_SESSIONS:
+        st.warning(f"That is {len(columns)} sessions; please narrow it to {matrix_entry.MAX_SESSIONS} or fewer.")
+        st.stop()
+
+    # Only this class's records in the range matter for prefilling and deduplication
+    range_attendance = attendance_between(st.session_state.attendance_archive, attendance, *date_range)
+    class_attendance = range_attendance[
+        range_attendance['student_id'].isin(class_students['student_id'])
+    ] if not range_attendance.empty else range_attendance
+
+    with st.form("catch_up_form"):
+        st.caption("Sessions already recorded are ticked; unticking them does not delete anything.")
+        edited_matrix = st.data_editor(
+            matrix_entry.build_grid(class_students, columns, class_attendance),
+            column_config={
+                'student_id': None,
+                'student_name': st.column_config.TextColumn("Student"),
+                **{label: st.column_config.CheckboxColumn(label) for label in columns},
+            },
+            disabled=['student_name'],
+            hide_index=True,
+            use_container_width=True,
+            key=f"catch_up_grid_{hash(tuple(columns))}",
+        )
+        submitted = st.form_submit_button("Submit All Sessions")
+
+    if submitted:
+        records_to_insert, already_recorded = matrix_entry.build_records(
+            edited_matrix, columns, class_students, class_attendance, current_user_id
+        )
+        if records_to_insert:
+            # Bumps Attendance when any chunk is stored, even if others fail
+            write = matrix_entry.submit_records(supabase_io, records_to_insert, st.session_state.table_version_store)
+            background.track(st.session_state, f"Catch-up attendance ({len(records_to_insert)} records)", write)
+            st.info(f"Submitting {len(records_to_insert)} records across {len(columns)} sessions "
+                    f"({already_recorded} ticked cells were already recorded)...")
+        else:
+            st.warning("Nothing new to record: no sessions were ticked beyond those already saved.")
+    st.stop()
+
+# --- ATTENDANCE FORM (ONE EDITABLE GRID FOR THE WHOLE CLASS) ---
 st.info(f"You are taking attendance for **Class: {class_students['class_name'].iloc[0]}**. You have {len(class_students)} students.")
 st.markdown("---")
 
-# --- FIXED: ROBUST "Select All" LOGIC ---
-# The toggle and its callback are now OUTSIDE the form.
+# The whole class is a single data editor, so a rerun costs the same for 15 or 150 students.
+# "Select All" sets the starting value of every row; changing the editor key drops pending edits.
+if 'attendance_grid_version' not in st.session_state:
+    st.session_state.attendance_grid_version = 0
 
-# 1. Define the callback function. This runs whenever the toggle is clicked.
-def update_all_checkboxes():
-    # Get the new value of the toggle from session_state
-    is_select_all_active = st.session_state.select_all_toggle
-    # Update the session_state for each individual student checkbox
-    for index, student in class_students.iterrows():
-        st.session_state[f"student_{student['student_id']}"] = is_select_all_active
+def reset_attendance_grid():
+    st.session_state.attendance_grid_version += 1
 
-# 2. The master toggle is now placed before the form.
 st.toggle(
     "Select All / Deselect All",
     value=True,
     key='select_all_toggle',
-    on_change=update_all_checkboxes,
+    on_change=reset_attendance_grid,
     help="Use this to quickly mark all students as present or absent."
 )
-# st.markdown("---")
-
 
 with st.form("attendance_form"):
     col1, col2 = st.columns(2)
@@ -74,64 +148,54 @@ with st.form("attendance_form"):
 
     st.markdown("---")
     st.subheader("Mark Student Presence")
-    
-    # Dictionary to hold the final state of each checkbox for submission
-    attendance_status = {}
-    
-    # Display students in columns for a cleaner layout
-    num_columns = 3
-    cols = st.columns(num_columns)
-    
+    st.caption("Search with the table's toolbar, toggle a cell with Space, and drag the fill handle to mark a range of students.")
+
     # Sort students alphabetically for consistency
-    sorted_students = class_students.sort_values(by='student_name')
-
-    for i, (index, student) in enumerate(sorted_students.iterrows()):
-        student_key = f"student_{student['student_id']}"
-        
-        # 3. Initialize the state for each checkbox the first time the page loads
-        if student_key not in st.session_state:
-            st.session_state[student_key] = True # Default to selected
-            
-        with cols[i % num_columns]:
-            # 4. The checkbox is now fully controlled by its key in session_state
-            is_present = st.checkbox(
-                student['student_name'],
-                key=student_key
-            )
-            attendance_status[student['student_id']] = is_present
+    grid = class_students.sort_values(by='student_name')[['student_id', 'student_name']].assign(
+        present=st.session_state.select_all_toggle
+    )
+    edited_grid = st.data_editor(
+        grid,
+        column_config={
+            'student_id': None,
+            'student_name': st.column_config.TextColumn("Student"),
+            'present': st.column_config.CheckboxColumn("Present"),
+        },
+        disabled=['student_name'],
+        hide_index=True,
+        use_container_width=True,
+        key=f"attendance_grid_{st.session_state.attendance_grid_version}",
+    )
 
     submitted = st.form_submit_button("Submit Attendance")
 
-# --- DATABASE INSERTION LOGIC (ADAPTED FOR CHECKBOXES) ---
+# --- DATABASE INSERTION LOGIC ---
 if submitted:
     activity_id = activities[activities['activity_name'] == selected_activity_name]['activity_id'].iloc[0]
-    
-    # Get the list of student IDs for those who were marked as present
-    present_student_ids = [student_id for student_id, present in attendance_status.items() if present]
-    
-    # Get the full details for the present students
+
+    # Full details of the students marked present
+    present_student_ids = edited_grid.loc[edited_grid['present'].fillna(False).astype(bool), 'student_id']
     present_students_df = class_students[class_students['student_id'].isin(present_student_ids)]
-    
-    records_to_insert = []
-    for index, student in present_students_df.iterrows():
-        records_to_insert.append({
+
+    records_to_insert = [
+        {
             'attendance_date': selected_date.strftime("%Y-%m-%d"),
-            'student_id': int(student['student_id']),
+            'student_id': int(student_id),
             'activity_id': int(activity_id),
-            'class_id': int(student['class_id']),
-            'dep_id': int(student['dep_id']),
+            'class_id': int(class_id),
+            'dep_id': int(dep_id),
             'recorded_by_servant_id': int(current_user_id)
-        })
+        }
+        for student_id, class_id, dep_id in zip(
+            present_students_df['student_id'], present_students_df['class_id'], present_students_df['dep_id']
+        )
+    ]
 
     if records_to_insert:
-        try:
-            response = supabase.from_("Attendance").insert(records_to_insert).execute()
-            if hasattr(response, 'error') and response.error:
-                st.error(f"An error occurred: {response.error.message}")
-            else:
-                st.success(f"✅ Successfully recorded attendance for {len(records_to_insert)} students!")
-                st.balloons()
-        except Exception as e:
-            st.error(f"A critical error occurred: {e}")
+        # Sent in the background; the outcome is reported as a toast once it lands
+        write = supabase_io.submit_insert("Attendance", records_to_insert)
+        st.session_state.table_version_store.bump_on_success(write, "Attendance")
+        background.track(st.session_state, f"Attendance for {len(records_to_insert)} students", write)
+        st.info(f"Submitting attendance for {len(records_to_insert)} students...")
     else:
         st.warning("No students were selected as present. No attendance was recorded.")
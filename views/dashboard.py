@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import plotly.express as px  # imported in the background while the login screen is shown (see app.py)
+
+from jobs.anomalies import MIN_DROP, RECENT_WEEKS
+from jobs.precompute import get_or_compute
 
 st.title('🏠 Leadership Dashboard')
 st.markdown("----")
@@ -43,6 +46,70 @@ with col5:
     cont.metric("Total Activities", total_activities)
 
 
+st.markdown("----")
+
+# --- ATTENDANCE DROP ALERTS ---
+st.subheader("⚠️ Attendance Drop Alerts")
+st.caption(
+    f"Classes whose weekly attendance for an activity over the last {RECENT_WEEKS} complete weeks fell by "
+    f"{MIN_DROP:.0%} or more against the weeks before, where the drop is statistically significant."
+)
+gaps = get_or_compute('missing_sessions', st.session_state)
+with st.container(border=True):
+    anomalies = get_or_compute('attendance_anomalies', st.session_state)
+    alerts = anomalies[anomalies['flagged']] if not anomalies.empty else anomalies
+    if alerts.empty:
+        st.success("No sudden attendance drops detected.")
+    else:
+        alerts = (
+            alerts.merge(classes[['class_id', 'class_name', 'dep_id']], on='class_id')
+            .merge(departments[['dep_id', 'dep_name']], on='dep_id')
+            .merge(activities[['activity_id', 'activity_name']], on='activity_id')
+        )
+        st.warning(f"{len(alerts)} class/activity pair(s) dropped sharply since {alerts['recent_from'].iloc[0]:%d %B %Y}.")
+        # A drop may only be a class that did not record its sessions
+        recent_gaps = gaps[gaps['session_date'] >= alerts['recent_from'].iloc[0]].groupby(['class_id', 'activity_id']).size()
+        alerts['unrecorded'] = [int(recent_gaps.get(key, 0)) for key in zip(alerts['class_id'], alerts['activity_id'])]
+        display_alerts = alerts[['class_name', 'dep_name', 'activity_name', 'baseline', 'recent', 'change_pct', 'z_score', 'unrecorded']].rename(columns={
+            'class_name': 'Class', 'dep_name': 'Department', 'activity_name': 'Activity',
+            'baseline': 'Usual per Week', 'recent': f'Last {RECENT_WEEKS} Weeks (avg)',
+            'change_pct': 'Change (%)', 'z_score': 'Z-Score', 'unrecorded': 'Unrecorded Sessions',
+        })
+        st.dataframe(display_alerts, use_container_width=True, hide_index=True)
+
+
+st.markdown("----")
+
+# --- MISSING ATTENDANCE ENTRIES ---
+st.subheader("📝 Missing Attendance Entries")
+st.caption(
+    "Core sessions held by most classes that a class has no attendance recorded for. "
+    "Until they are entered (e.g. with the catch-up mode of Attendance Entry), those students look absent."
+)
+with st.container(border=True):
+    gap_days = st.selectbox("Look back", [30, 90, 365], format_func=lambda d: f"Last {d} days", key="gap_days")
+    recent_gaps = gaps[gaps['session_date'] >= pd.Timestamp.today().normalize() - pd.Timedelta(days=gap_days)]
+    if recent_gaps.empty:
+        st.success("Every class has recorded all of its sessions in this period.")
+    else:
+        gap_summary = (
+            recent_gaps.groupby(['class_id', 'activity_id'])['session_date'].agg(['size', 'max']).reset_index()
+            .merge(classes[['class_id', 'class_name', 'dep_id']], on='class_id')
+            .merge(departments[['dep_id', 'dep_name']], on='dep_id')
+            .merge(activities[['activity_id', 'activity_name']], on='activity_id')
+            .sort_values(['size', 'max'], ascending=False)
+        )
+        st.warning(f"{len(recent_gaps)} session(s) not recorded across {gap_summary['class_id'].nunique()} class(es).")
+        st.dataframe(
+            gap_summary[['class_name', 'dep_name', 'activity_name', 'size', 'max']],
+            use_container_width=True, hide_index=True,
+            column_config={
+                'class_name': "Class", 'dep_name': "Department", 'activity_name': "Activity",
+                'size': "Missing Sessions", 'max': st.column_config.DateColumn("Latest Missing", format="DD MMM YYYY"),
+            }
+        )
+
+
 st.markdown("----")
 
 # --- OVERALL DISTRIBUTION CHARTS (Unchanged) ---
@@ -54,7 +121,7 @@ with col_a:
         st.markdown("###### Student Distribution")
         if not students.empty and not classes.empty and not departments.empty:
             students_merged = students.merge(classes, on='class_id').merge(departments, on='dep_id')
-            student_counts = students_merged['dep_name'].value_counts().reset_index()
+            student_counts = students_merged['dep_name'].value_counts().loc[lambda c: c > 0].reset_index()
             student_counts.columns = ['Department', 'Number of Students']
             fig_students = px.bar(
                 student_counts, x='Number of Students', y='Department', orientation='h',
@@ -71,7 +138,7 @@ with col_b:
         st.markdown("###### Servant Distribution")
         if not servants.empty and not classes.empty and not departments.empty:
             servants_merged = servants.dropna(subset=['class_id']).merge(classes, on='class_id').merge(departments, on='dep_id')
-            servant_counts = servants_merged['dep_name'].value_counts().reset_index()
+            servant_counts = servants_merged['dep_name'].value_counts().loc[lambda c: c > 0].reset_index()
             servant_counts.columns = ['Department', 'Number of Servants']
             fig_servants = px.bar(
                 servant_counts, x='Number of Servants', y='Department', orientation='h',
@@ -111,7 +178,8 @@ with cont:
         filtered_df = source_df[source_df['dep_name'] == selected_dep_chart]
         
         if not filtered_df.empty:
-            counts = filtered_df[grouping_col].value_counts().reset_index()
+            # Categorical columns count every category; keep only the ones present
+            counts = filtered_df[grouping_col].value_counts().loc[lambda c: c > 0].reset_index()
             counts.columns = [grouping_col, count_col_name]
             
             fig = px.bar(
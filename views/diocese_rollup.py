@@ -0,0 +1,89 @@
+import streamlit as st
+
+from data import background
+from jobs.rollup import ALL_ACTIVITIES, combine_summaries
+
+# --- LOAD DATA FROM SESSION STATE ---
+if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
+    st.warning("Please run the main app file (Home.py) first to load data.")
+    st.stop()
+
+supabase_io = st.session_state.supabase_io
+rollup_store = st.session_state.rollup_store
+
+# --- PAGE TITLE ---
+st.title("⛪ Diocese Rollup")
+st.markdown(
+    "Each parish's summary is recomputed by that parish's own app whenever its data changes; "
+    "this page only combines the summaries and never loads a parish's attendance rows."
+)
+st.markdown("----")
+
+# The parish list is a few rows; the summaries are read from the rollup store
+parishes = supabase_io.submit(supabase_io.select("Parish", "parish_id,parish_name")).result(timeout=30)
+parish_names = {row['parish_id']: row['parish_name'] for row in parishes}
+summaries = {}
+missing = []
+for parish_id in sorted(parish_names):
+    summary = rollup_store.load(parish_id)
+    if summary is None:
+        missing.append(parish_id)
+    else:
+        summaries[parish_id] = summary
+
+if missing:
+    with st.container(border=True):
+        st.info(
+            "No summary yet for: " + ", ".join(parish_names[parish_id] for parish_id in missing)
+            + ". A summary is published the first time someone from the parish logs in."
+        )
+        if st.button("Summarize now"):
+            for parish_id in missing:
+                background.track(
+                    st.session_state, f"Summary of {parish_names[parish_id]}", rollup_store.refresh(supabase_io, parish_id)
+                )
+            st.rerun()
+
+if not summaries:
+    st.warning("No parish summaries are available yet.")
+    st.stop()
+
+per_parish, diocese_monthly, month = combine_summaries(summaries, parish_names)
+
+# --- KPI CARDS ---
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Parishes", len(per_parish))
+col2.metric("Students", f"{per_parish['students'].sum():,}")
+col3.metric("Attendance This Year", f"{per_parish['attendance_this_year'].sum():,}")
+total_students = per_parish['students'].sum()
+col4.metric(
+    f"Participation ({month})",
+    f"{100 * per_parish['active_students'].sum() / total_students:.1f}%" if total_students else "—",
+)
+
+# --- PER-PARISH TABLE ---
+st.subheader("Parishes")
+st.dataframe(
+    per_parish.drop(columns=['parish_id']).rename(columns={
+        'parish_name': 'Parish', 'students': 'Students', 'classes': 'Classes',
+        'attendance_this_year': 'Attendance This Year', 'active_students': f'Active in {month}',
+        'participation_rate': 'Participation (%)', 'computed_at': 'Summary Updated',
+    }),
+    hide_index=True,
+    use_container_width=True,
+)
+
+# --- DIOCESE TREND ---
+st.subheader("Monthly Attendance Across the Diocese")
+activity_list = [ALL_ACTIVITIES] + sorted(set(diocese_monthly['activity_name']) - {ALL_ACTIVITIES})
+selected_activity = st.selectbox("Activity", activity_list, key="rollup_activity")
+trend = diocese_monthly[diocese_monthly['activity_name'] == selected_activity].sort_values('month')
+if trend.empty:
+    st.info("No attendance recorded this academic year.")
+else:
+    import plotly.express as px
+    fig = px.bar(
+        trend, x='month', y='attendance_count',
+        labels={'month': 'Month', 'attendance_count': 'Attendance'},
+    )
+    st.plotly_chart(fig, use_container_width=True)
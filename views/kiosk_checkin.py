@@ -0,0 +1,86 @@
+import streamlit as st
+import pandas as pd
+from datetime import date
+
+# --- LOAD DATA & AUTHENTICATION ---
+if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
+    st.warning("Please run the main app file (Home.py) first to log in.")
+    st.stop()
+
+# Get data from session state
+user_role = st.session_state.user_role
+current_user_id = st.session_state.current_user_id
+activities = st.session_state.activities
+attendance = st.session_state.attendance
+student_index = st.session_state.student_index
+checkin_buffer = st.session_state.checkin_buffer
+
+# --- PAGE TITLE ---
+st.title("🎟️ Kiosk Check-in")
+
+# --- PERMISSION CHECK ---
+if user_role not in ['Servant', 'Department Manager', 'Chief Manager', 'Priest']:
+    st.error("You do not have permission to access this page.")
+    st.stop()
+
+if activities.empty or not len(student_index):
+    st.warning("Activities and students must be loaded before check-in can start.")
+    st.stop()
+
+today = date.today()
+# Students already recorded today (e.g. from Attendance Entry) count as checked in
+checkin_buffer.seed(attendance, today)
+
+# --- KIOSK SETUP ---
+activity_map = dict(zip(activities['activity_name'], activities['activity_id']))
+selected_activity_name = st.selectbox("Activity", options=list(activity_map), key='kiosk_activity')
+st.caption(f"Checking in for **{selected_activity_name}** on **{today:%A, %d %B %Y}**. Scan a card or type a student code and press Enter.")
+
+if 'kiosk_recent' not in st.session_state:
+    st.session_state.kiosk_recent = []
+
+def handle_scan():
+    code = st.session_state.kiosk_code.strip()
+    st.session_state.kiosk_code = ""  # Ready for the next scan
+    if not code:
+        return
+    student = student_index.resolve(code)
+    if student is None:
+        result = ('error', f"Unknown code: {code}")
+    elif checkin_buffer.check_in(student, activity_map[selected_activity_name], current_user_id, today) == 'duplicate':
+        result = ('warning', f"{student['student_name']} is already checked in.")
+    else:
+        result = ('success', f"Welcome, {student['student_name']}!")
+    st.session_state.kiosk_recent = [result] + st.session_state.kiosk_recent[:9]
+
+st.text_input("Student code", key='kiosk_code', on_change=handle_scan, placeholder="Scan or type a code...")
+
+# --- LAST SCANS ---
+if st.session_state.kiosk_recent:
+    level, message = st.session_state.kiosk_recent[0]
+    getattr(st, level)(message)
+    with st.expander("Recent scans"):
+        for level, message in st.session_state.kiosk_recent[1:]:
+            st.write(("✅ " if level == 'success' else "⚠️ ") + message)
+
+# --- LIVE COUNTERS (all kiosks in this process) ---
+@st.fragment(run_every=2)
+def show_counters():
+    stats = checkin_buffer.stats
+    with st.container(border=True):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Checked in", stats['accepted'])
+        col2.metric("Duplicates blocked", stats['duplicates'])
+        col3.metric("Waiting to save", checkin_buffer.pending)
+        col4.metric("Last save (ms)", stats['last_flush_ms'] if stats['last_flush_ms'] is not None else "-")
+        if stats['failed_flushes']:
+            st.warning(f"{stats['failed_flushes']} save attempt(s) failed; check-ins are kept and retried automatically.")
+        if checkin_buffer.dead_letters and user_role in ['Chief Manager', 'Department Manager', 'Priest']:
+            with st.expander(f"⚠️ {len(checkin_buffer.dead_letters)} check-in(s) rejected by the database"):
+                rejected = pd.DataFrame(list(checkin_buffer.dead_letters))
+                names = dict(zip(st.session_state.students['student_id'], st.session_state.students['student_name']))
+                rejected.insert(0, 'student_name', rejected['student_id'].map(names))
+                st.caption("These were not saved; record them from Attendance Entry once the cause is fixed.")
+                st.dataframe(rejected, hide_index=True, use_container_width=True)
+
+show_counters()
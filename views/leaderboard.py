@@ -1,7 +1,6 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from datetime import datetime, timedelta
+from analytics import Dataset, leaderboard, period_options
+from jobs.precompute import get_or_compute
 
 # --- LOAD DATA FROM SESSION STATE ---
 if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
@@ -9,9 +8,9 @@ if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
     st.stop()
 
 students = st.session_state.students
-attendance = st.session_state.attendance
 classes = st.session_state.classes
 departments = st.session_state.departments
+activities = st.session_state.activities
 
 # --- PAGE TITLE ---
 st.title("🏆 Student Leaderboard")
@@ -19,9 +18,8 @@ st.markdown("Discover the most active students based on their attendance within
 st.markdown("---")
 
 # --- DATA PREPARATION ---
-# Ensure attendance dates are in datetime format
-attendance['attendance_date'] = pd.to_datetime(attendance['attendance_date'])
-students_full_details = students.merge(classes, on='class_id').merge(departments, on='dep_id')
+students_full_details = st.session_state.students_full_details
+dataset = Dataset.from_session(st.session_state)
 
 # --- DYNAMIC FILTERS ---
 st.header("Leaderboard Filters")
@@ -29,12 +27,8 @@ st.header("Leaderboard Filters")
 col1, col2 = st.columns(2)
 
 with col1:
-    # 1. Time Period Filter
-    time_period = st.selectbox(
-        "Select a Time Period:",
-        options=["This Month", "Last 30 Days", "Last 90 Days", "All Time"],
-        index=0
-    )
+    # 1. Time Period Filter (past academic years come from the archive, loaded only when picked)
+    time_period = st.selectbox("Select a Time Period:", options=period_options(dataset), index=0)
 
 with col2:
     # 2. Department Filter
@@ -44,65 +38,84 @@ with col2:
         department_list
     )
 
+rank_by = st.radio(
+    "Rank by:", ["Total Attendance", "Participation Rate"], horizontal=True, key="leaderboard_rank_by",
+    help="Participation rate: the share of the sessions their class held in the period that a student attended."
+)
+
 # --- ANALYSIS & DISPLAY ---
 st.markdown("---")
 st.header(f"Results for: {time_period} | {selected_department}")
 
-# --- Logic to filter data based on the selected time period ---
-now = datetime.now()
-if time_period == "This Month":
-    cutoff_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    filtered_attendance = attendance[attendance['attendance_date'] >= cutoff_date]
-elif time_period == "Last 30 Days":
-    cutoff_date = now - timedelta(days=30)
-    filtered_attendance = attendance[attendance['attendance_date'] >= cutoff_date]
-elif time_period == "Last 90 Days":
-    cutoff_date = now - timedelta(days=90)
-    filtered_attendance = attendance[attendance['attendance_date'] >= cutoff_date]
-else: # All Time
-    filtered_attendance = attendance
-
-# Filter by department if one is selected
-if selected_department != "All Departments":
-    dept_id = departments[departments['dep_name'] == selected_department]['dep_id'].iloc[0]
-    student_ids_in_dept = students_full_details[students_full_details['dep_id'] == dept_id]['student_id'].tolist()
-    filtered_attendance = filtered_attendance[filtered_attendance['student_id'].isin(student_ids_in_dept)]
-
-
-if filtered_attendance.empty:
+# --- Same computation as the command line (see analytics/leaderboard.py) ---
+# Counts are precomputed in the background; past academic years come from the archive, loaded only when picked
+top_10_students = leaderboard(
+    dataset, time_period, selected_department if selected_department != "All Departments" else None,
+    rank_by='rate' if rank_by == "Participation Rate" else 'count', top=10
+)
+
+if top_10_students.empty:
     st.warning("No attendance data found for the selected filters.")
 else:
-    # Calculate attendance counts on the filtered data
-    attendance_counts = filtered_attendance.groupby('student_id').size().reset_index(name='total_attendance')
+    import plotly.express as px  # loaded by the first chart drawn, not when the page opens
+    metric_column = 'participation_rate' if rank_by == "Participation Rate" else 'total_attendance'
+
+    # --- Display as a formatted table ---
+    st.subheader("Rankings")
+    display_df = top_10_students[['student_name', 'class_name', 'total_attendance', 'sessions', 'participation_rate']].copy()
+    display_df.rename(columns={
+        'student_name': 'Student Name', 'class_name': 'Class', 'total_attendance': 'Total Attendance',
+        'sessions': 'Class Sessions Held', 'participation_rate': 'Participation Rate (%)'
+    }, inplace=True)
+    display_df.insert(0, 'Rank', range(1, len(display_df) + 1))
+    # Sessions a class did not record lower its students' counts (tracked for the current year only)
+    if 'unrecorded' in top_10_students:
+        display_df['Unrecorded Class Sessions'] = top_10_students['unrecorded'].to_numpy()
     
-    # Merge with student details to get names and other info
-    leaderboard_data = students_full_details.merge(attendance_counts, on='student_id')
+    st.dataframe(display_df.set_index('Rank'), use_container_width=True)
+
+    # --- Display as a bar chart ---
+    st.subheader("Visual Comparison")
+    fig = px.bar(
+        top_10_students.sort_values(by=metric_column, ascending=True),
+        x=metric_column, y='student_name', orientation='h',
+        title=f"Top 10 Most Active Students",
+        labels={'total_attendance': 'Total Attendance Count', 'participation_rate': 'Participation Rate (%)', 'student_name': 'Student'},
+        template='plotly_white', text=metric_column
+    )
+    fig.update_traces(textposition='outside')
+    fig.update_layout(yaxis_title="", showlegend=False)
+    st.plotly_chart(fig, use_container_width=True)
 
-    if leaderboard_data.empty:
-        st.warning("No students with attendance found in the selected scope.")
+# --- WEEKLY STREAKS & CONSISTENCY ---
+st.markdown("---")
+st.header("🔥 Weekly Streaks & Consistency")
+st.markdown("Consecutive weeks of attendance at each core activity this year. Click a column header to sort.")
+
+core_activity_names = sorted(activities.loc[activities['activity_type'] == 'Core', 'activity_name'].tolist())
+if not core_activity_names:
+    st.info("No core activities are defined.")
+else:
+    streak_activity = st.selectbox("Core Activity:", core_activity_names, key="streak_activity")
+    streak_activity_id = activities[activities['activity_name'] == streak_activity]['activity_id'].iloc[0]
+    # Precomputed in the background from a weekly presence bitmap (see jobs/streaks.py)
+    streaks = get_or_compute('attendance_streaks', st.session_state)
+    streak_table = students_full_details.merge(streaks[streaks['activity_id'] == streak_activity_id], on='student_id')
+    if selected_department != "All Departments":
+        streak_table = streak_table[streak_table['dep_name'] == selected_department]
+
+    if streak_table.empty:
+        st.warning("No core activity attendance found in the selected scope.")
     else:
-        # Get the top 10 students
-        top_10_students = leaderboard_data.sort_values(by='total_attendance', ascending=False).head(10)
-
-        # --- Display as a formatted table ---
-        st.subheader("Rankings")
-        display_df = top_10_students[['student_name', 'class_name', 'total_attendance']].copy()
-        display_df.rename(columns={
-            'student_name': 'Student Name', 'class_name': 'Class', 'total_attendance': 'Total Attendance'
-        }, inplace=True)
-        display_df.insert(0, 'Rank', range(1, len(display_df) + 1))
-        
-        st.dataframe(display_df.set_index('Rank'), use_container_width=True)
-
-        # --- Display as a bar chart ---
-        st.subheader("Visual Comparison")
-        fig = px.bar(
-            top_10_students.sort_values(by='total_attendance', ascending=True),
-            x='total_attendance', y='student_name', orientation='h',
-            title=f"Top 10 Most Active Students",
-            labels={'total_attendance': 'Total Attendance Count', 'student_name': 'Student'},
-            template='plotly_white', text='total_attendance'
+        st.dataframe(
+            streak_table.sort_values(['current_streak', 'longest_streak'], ascending=False)[
+                ['student_name', 'class_name', 'current_streak', 'longest_streak', 'weeks_attended', 'consistency']
+            ],
+            use_container_width=True, hide_index=True,
+            column_config={
+                'student_name': "Student Name", 'class_name': "Class",
+                'current_streak': "Current Streak (weeks)", 'longest_streak': "Longest Streak (weeks)",
+                'weeks_attended': "Weeks Attended",
+                'consistency': st.column_config.ProgressColumn("Consistency", format="%.1f%%", min_value=0, max_value=100),
+            }
         )
-        fig.update_traces(textposition='outside')
-        fig.update_layout(yaxis_title="", showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
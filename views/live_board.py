@@ -0,0 +1,79 @@
+import streamlit as st
+from datetime import date
+
+# --- LOAD DATA FROM SESSION STATE ---
+if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
+    st.warning("Please run the main app file (Home.py) first to load data.")
+    st.stop()
+
+activities = st.session_state.activities
+classes = st.session_state.classes
+departments = st.session_state.departments
+attendance = st.session_state.attendance
+live_counts = st.session_state.live_counts
+
+# --- PAGE TITLE ---
+st.title("📡 Live Attendance Board")
+st.markdown(f"Check-ins for **{date.today():%A, %d %B %Y}**, updated as they are recorded. No need to refresh the page.")
+st.markdown("----")
+
+if activities.empty or classes.empty:
+    st.warning("Activities and classes must be loaded to show the live board.")
+    st.stop()
+
+# Today's rows already loaded are counted once; after that only new inserts are applied
+live_counts.seed(attendance)
+
+# --- FILTERS ---
+col1, col2 = st.columns(2)
+with col1:
+    activity_map = dict(zip(activities['activity_name'], activities['activity_id']))
+    selected_activity = st.selectbox("Activity", list(activity_map), key="live_activity")
+with col2:
+    department_list = ["All Departments"] + sorted(departments['dep_name'].unique().tolist())
+    selected_department = st.selectbox("Department", department_list, key="live_department")
+
+board_classes = classes.merge(departments[['dep_id', 'dep_name']], on='dep_id')
+if selected_department != "All Departments":
+    board_classes = board_classes[board_classes['dep_name'] == selected_department]
+board_classes = board_classes.sort_values('class_name')
+activity_id = activity_map[selected_activity]
+
+# --- LIVE COUNTS ---
+# Only this fragment reruns each second, and it only reads the in-memory counts
+@st.fragment(run_every=1)
+def show_live_board():
+    if live_counts.error is not None:
+        st.warning(f"The live feed is not connected ({live_counts.error}); counts only include rows loaded with the page.")
+
+    counts, version = live_counts.snapshot(activity_id)
+    board_key = (activity_id, selected_department)
+    state = st.session_state.get('live_board_state')
+    if state is None or state['key'] != board_key:
+        state = {'key': board_key, 'version': None, 'counts': counts, 'deltas': {}}
+    if state['version'] != version:
+        # Remember the last change per class so its delta stays visible until the next one
+        for class_id, count in counts.items():
+            if count != state['counts'].get(class_id, 0):
+                state['deltas'][class_id] = count - state['counts'].get(class_id, 0)
+        state['counts'], state['version'] = counts, version
+    st.session_state.live_board_state = state
+
+    total = sum(counts.get(class_id, 0) for class_id in board_classes['class_id'])
+    with st.container(border=True):
+        st.metric(f"Total checked in: {selected_activity}", total)
+
+    num_columns = 4
+    cols = st.columns(num_columns)
+    for i, (class_id, class_name, dep_name) in enumerate(
+        zip(board_classes['class_id'], board_classes['class_name'], board_classes['dep_name'])
+    ):
+        with cols[i % num_columns]:
+            with st.container(border=True):
+                delta = state['deltas'].get(class_id)
+                st.metric(str(class_name), counts.get(class_id, 0), delta=f"+{delta}" if delta else None, help=str(dep_name))
+
+    if live_counts.last_event_at:
+        st.caption(f"{live_counts.events} live update(s) received since the server started.")
+
+show_live_board()
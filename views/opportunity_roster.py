@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from analytics import Dataset, roster_priorities
 
 # --- LOAD DATA & AUTHENTICATION ---
 if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
@@ -9,7 +9,6 @@ if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
 
 # Get data from session state
 students = st.session_state.students
-attendance = st.session_state.attendance
 classes = st.session_state.classes
 departments = st.session_state.departments
 activities = st.session_state.activities
@@ -28,8 +27,7 @@ if 'activity_type' not in activities.columns:
     st.info("Please add this column in your Supabase dashboard and assign activities as 'Core' or 'Selective'.")
     st.stop()
 
-attendance['attendance_date'] = pd.to_datetime(attendance['attendance_date'])
-students_full_details = students.merge(classes, on='class_id').merge(departments, on='dep_id')
+students_full_details = st.session_state.students_full_details
 
 # --- ROLE-BASED FILTERING LOGIC ---
 st.header("Select an Opportunity")
@@ -94,34 +92,18 @@ with filter_container:
 
 # --- ANALYSIS & DISPLAY ---
 st.markdown("---")
+PRIORITY_LABELS = {'High': "🟢 High", 'Medium': "🟡 Medium", 'Low': "🔴 Low"}
 # The logic now depends on having a valid class selected, regardless of role
 if selected_class and selected_class not in ["-- Select a Class --"] and selected_activity and selected_activity != "-- Select an Opportunity --":
     st.header(f"Priority Roster for '{selected_activity}'")
 
-    # The rest of the analysis code is unchanged because it correctly
-    # uses the 'selected_class' variable, which is now set by our role-based logic.
-    class_id = classes[classes['class_name'] == selected_class]['class_id'].iloc[0]
-    students_in_class = students_full_details[students_full_details['class_id'] == class_id]
-    selective_activity_ids = selective_activities['activity_id'].tolist()
-    selective_attendance = attendance[attendance['activity_id'].isin(selective_activity_ids)]
-    
-    if selective_attendance.empty:
+    # Same computation as the command line (see analytics/roster.py)
+    roster_df = roster_priorities(Dataset.from_session(st.session_state), selected_class)
+    if roster_df['last_participation_date'].isna().all():
         st.info("There is no participation history for any selective activities yet. Therefore, all students are considered equally high priority.")
-    
-    last_participation = selective_attendance.groupby('student_id')['attendance_date'].max().reset_index()
-    last_participation.rename(columns={'attendance_date': 'last_participation_date'}, inplace=True)
-
-    roster_df = pd.merge(students_in_class, last_participation, on='student_id', how='left')
-    roster_df = roster_df.sort_values(by='last_participation_date', ascending=True, na_position='first')
 
     roster_df['Last Participation Date'] = roster_df['last_participation_date'].dt.strftime('%Y-%m-%d').fillna('(Never Participated)')
-    
-    def get_priority(date_val):
-        if pd.isna(date_val): return "🟢 High"
-        days_since = (datetime.now() - date_val).days
-        if days_since > 90: return "🟡 Medium"
-        return "🔴 Low"
-    roster_df['Priority'] = roster_df['last_participation_date'].apply(get_priority)
+    roster_df['Priority'] = roster_df['priority'].map(PRIORITY_LABELS)
 
     display_df = roster_df[['student_name', 'Last Participation Date', 'Priority']]
     display_df.rename(columns={'student_name': 'Student Name'}, inplace=True)
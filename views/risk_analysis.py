@@ -1,6 +1,5 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
+from analytics import DEFAULT_RISK_THRESHOLDS, Dataset, risk_flags, risk_ranking
 
 # --- LOAD DATA & AUTHENTICATION ---
 if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
@@ -9,7 +8,6 @@ if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
 
 # Get data from session state
 students = st.session_state.students
-attendance = st.session_state.attendance
 classes = st.session_state.classes
 departments = st.session_state.departments
 user_role = st.session_state.user_role
@@ -21,21 +19,17 @@ st.markdown("Identify students who have been absent from core activities for a d
 st.markdown("---")
 
 # --- DATA PREPARATION ---
-attendance['attendance_date'] = pd.to_datetime(attendance['attendance_date'])
-students_full_details = students.merge(classes, on='class_id').merge(departments, on='dep_id')
+students_full_details = st.session_state.students_full_details
 
 # --- DYNAMIC RISK THRESHOLD BUILDER ---
 st.header("Define Risk Thresholds")
 
 # For this analysis, we will focus on a few user-defined core activities.
-CORE_ACTIVITIES = ['Sunday Meeting', 'Quddas (Liturgy)']
+CORE_ACTIVITIES = list(DEFAULT_RISK_THRESHOLDS)
 
 # Initialize thresholds in session state if they don't exist
 if 'risk_thresholds' not in st.session_state:
-    st.session_state.risk_thresholds = {
-        'Sunday Meeting': 30,
-        'Quddas (Liturgy)': 45
-    }
+    st.session_state.risk_thresholds = dict(DEFAULT_RISK_THRESHOLDS)
 
 # Display the interactive editor only to Priests
 if user_role == 'Priest':
@@ -65,86 +59,27 @@ else:
 department_list = ["All Departments"] + sorted(departments['dep_name'].unique().tolist())
 selected_department = st.selectbox("Select a Department to analyze:", department_list)
 
+# A class that did not record its sessions makes its students look absent (see jobs/gaps.py)
+gap_mode = st.radio(
+    "Students whose class has unrecorded sessions in the period:",
+    ["Mark them", "Exclude them"], horizontal=True, key="risk_gap_mode"
+)
+gap_mode = 'exclude' if gap_mode == "Exclude them" else 'mark'
+
 # --- ANALYSIS & DISPLAY ---
 st.markdown("---")
 st.header("Analysis Results")
 
-# Filter data based on selected department
-if selected_department != "All Departments":
-    dept_id = departments[departments['dep_name'] == selected_department]['dep_id'].iloc[0]
-    department_students = students_full_details[students_full_details['dep_id'] == dept_id]
-    department_attendance = attendance[attendance['student_id'].isin(department_students['student_id'].tolist())]
-else:
-    department_students = students_full_details
-    department_attendance = attendance
-
-at_risk_students = []
-
-# --- REFINED AND MORE ROBUST LOGIC ---
-
-# 1. Find the last attendance date for every student FOR EACH activity they have attended
-last_seen_by_activity = department_attendance.groupby(['student_id', 'activity_id'])['attendance_date'].max().reset_index()
-last_seen_by_activity = last_seen_by_activity.merge(activities, on='activity_id')
-
-
-# 2. Loop through the dynamically set risk rules
-for activity_name, threshold_days in st.session_state.risk_thresholds.items():
-    
-    # Isolate the data for the current activity rule
-    activity_specific_last_seen = last_seen_by_activity[
-        last_seen_by_activity['activity_name'] == activity_name
-    ]
-
-    # --- FIXED: LOGIC TO FIND STUDENTS WHO HAVE NEVER ATTENDED ---
-    # a. Get all student IDs in the current department filter
-    all_student_ids_in_scope = set(department_students['student_id'])
-    
-    # b. Get student IDs who have attended this activity at least once
-    attended_student_ids = set(activity_specific_last_seen['student_id'])
-    
-    # c. Find the difference to get those who never attended
-    never_attended_ids = all_student_ids_in_scope - attended_student_ids
-
-    # d. Add these students to the at-risk list
-    for student_id in never_attended_ids:
-        at_risk_students.append({
-            'student_id': student_id,
-            'reason': f"Never attended '{activity_name}'"
-        })
-    # --- END OF FIX ---
-
-    # --- Original logic for students who HAVE attended ---
-    # Calculate how many days have passed since each student's last attendance
-    activity_specific_last_seen['days_since_seen'] = (datetime.now() - activity_specific_last_seen['attendance_date']).dt.days
-
-    # Find students who have breached the threshold for THIS activity
-    breached_students = activity_specific_last_seen[
-        activity_specific_last_seen['days_since_seen'] > threshold_days
-    ]
-
-    # Add them to our master list of at-risk students
-    for index, row in breached_students.iterrows():
-        at_risk_students.append({
-            'student_id': row['student_id'],
-            'reason': f"Absent from '{activity_name}' for {row['days_since_seen']} days (>{threshold_days} day threshold)"
-        })
-
-# --- DISPLAY RESULTS (Works with the new, more complete data) ---
-if not at_risk_students:
+# Same computations as the command line (see analytics/); derived datasets come from the scheduler
+dataset = Dataset.from_session(st.session_state)
+department = selected_department if selected_department != "All Departments" else None
+display_df = risk_flags(dataset, st.session_state.risk_thresholds, department, gap_mode)
+
+# --- DISPLAY RESULTS ---
+if display_df.empty:
     st.success("✅ No students were flagged as at-risk based on the current parameters.")
 else:
-    risk_df = pd.DataFrame(at_risk_students)
-    risk_df = risk_df.merge(students_full_details, on='student_id')
-    
-    st.warning(f"Found {risk_df['student_id'].nunique()} students who may need follow-up.")
-
-    display_df = risk_df.groupby('student_id').agg({
-        'student_name': 'first',
-        'class_name': 'first',
-        'dep_name': 'first',
-        'reason': lambda x: '; '.join(list(set(x))) # Use set to avoid duplicates
-    }).reset_index()
-
+    st.warning(f"Found {len(display_df)} students who may need follow-up.")
     st.dataframe(
         display_df[['student_name', 'class_name', 'dep_name', 'reason']],
         use_container_width=True, hide_index=True,
@@ -156,3 +91,30 @@ else:
         }
     )
 
+
+# --- RISK SCORE RANKING ---
+st.markdown("---")
+st.header("Risk Score Ranking")
+st.markdown(
+    "Students ranked by a disengagement-risk score built from their last 12 weeks: how recently they came, "
+    "how often, whether that is falling, how irregular it is, and their mix of core and selective activities. "
+    "It catches students who are slowly fading before the thresholds above are breached."
+)
+
+# Scored for the whole church in the background, once per data version and day (see jobs/risk.py)
+top_n = st.slider("Number of students to show", min_value=10, max_value=200, value=25, step=5, key="risk_top_n")
+ranked = risk_ranking(dataset, department, gap_mode, top=top_n)
+st.dataframe(
+    ranked[['student_name', 'class_name', 'dep_name', 'risk_score', 'days_since_last', 'recent_rate', 'prior_rate', 'unrecorded']],
+    use_container_width=True, hide_index=True,
+    column_config={
+        "student_name": "Student Name",
+        "class_name": "Class",
+        "dep_name": "Department",
+        "risk_score": st.column_config.ProgressColumn("Risk Score", format="%.1f%%", min_value=0, max_value=100),
+        "days_since_last": "Days Since Last Attendance",
+        "recent_rate": st.column_config.NumberColumn("Per Week (last 4 weeks)", format="%.2f"),
+        "prior_rate": st.column_config.NumberColumn("Per Week (8 weeks before)", format="%.2f"),
+        "unrecorded": "Class Sessions Unrecorded (12 weeks)",
+    }
+)
@@ -1,7 +1,10 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from data.partitions import academic_year, attendance_between, year_label, year_start
+from jobs.precompute import get_or_compute
+
+SEARCH_RESULTS = 20
 
 # --- LOAD DATA FROM SESSION STATE ---
 if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
@@ -16,6 +19,7 @@ departments = st.session_state.departments
 user_role = st.session_state.user_role
 current_user_id = st.session_state.current_user_id
 servants = st.session_state.servants
+attendance_archive = st.session_state.attendance_archive
 
 # --- PAGE TITLE ---
 st.title("👤 Student Profile Viewer")
@@ -25,7 +29,7 @@ st.markdown("---")
 # --- DATA PREPARATION & PERMISSIONS ---
 # (This section is unchanged)
 if not (students.empty or classes.empty or departments.empty):
-    students_full_details = students.merge(classes, on='class_id').merge(departments, on='dep_id')
+    students_full_details = st.session_state.students_full_details
 else:
     st.error("Missing core data (students, classes, or departments).")
     st.stop()
@@ -49,36 +53,61 @@ if visible_students.empty:
     st.stop()
 
 # --- UNIFIED STUDENT SEARCH & SELECTION ---
+# Matched on the server against the shared name index (data/search.py): any spelling, English or Arabic
 st.header("Search for a Student")
-student_list = ["-- Select a Student --"] + sorted(visible_students['student_name'].unique().tolist())
-selected_student_name = st.selectbox(
-    "Search and select a student:", student_list,
-    help="Click the box and start typing to filter the list of students."
+query = st.text_input(
+    "Student name:", key="student_search", placeholder="e.g. Meena Gergis or مينا جرجس",
+    help="Spellings and transliterations are matched: Mina, Meena and مينا find the same students.",
+)
+visible_ids = None if user_role in ['Chief Manager', 'Priest'] else set(visible_students['student_id'])
+matches = get_or_compute('name_index', st.session_state).search(query, SEARCH_RESULTS, kind='Student', ids=visible_ids)
+if query.strip() and matches.empty:
+    st.info(f"No student matches '{query}'.")
+# Label -> student id; namesakes in the same class are told apart by their id
+match_ids = {}
+for row in matches.itertuples(index=False):
+    label = f"{row.name} · {row.class_name} · {row.dep_name}"
+    match_ids[label if label not in match_ids else f"{label} · #{row.id}"] = row.id
+selected_label = st.selectbox(
+    "Select a student:", list(match_ids), index=None,
+    placeholder="-- Select a Student --" if match_ids else "Type a name above",
 )
 
 # --- PROFILE DISPLAY ---
-if selected_student_name and selected_student_name != "-- Select a Student --":
-    student_details = visible_students[visible_students['student_name'] == selected_student_name].iloc[0]
+if selected_label is not None:
+    import plotly.express as px  # loaded by the first chart drawn, not when the page opens
+    student_details = visible_students[visible_students['student_id'] == match_ids[selected_label]].iloc[0]
     student_id = student_details['student_id']
+    selected_student_name = student_details['student_name']
 
     st.markdown("---")
     st.header(f"Profile: {student_details['student_name']}")
     
-    # Get all attendance data for the selected student
-    student_attendance = attendance[attendance['student_id'] == student_id].copy()
-    student_attendance['attendance_date'] = pd.to_datetime(student_attendance['attendance_date'])
+    # Time range: past academic years are read from the archive only when picked
+    today = date.today()
+    range_bounds = {"This Academic Year": (year_start(academic_year(today)), today)}
+    for year in attendance_archive.years():
+        range_bounds[f"Academic Year {year_label(year)}"] = (year_start(year), year_start(year + 1) - timedelta(days=1))
+    range_bounds["All Years"] = (min(start for start, _ in range_bounds.values()), today)
+    selected_range = st.selectbox("Time Range", list(range_bounds), key="profile_range")
+
+    # Get the attendance data for the selected student in that range
+    range_attendance = attendance_between(attendance_archive, attendance, *range_bounds[selected_range])
+    # The rows may be the shared session frame: convert on a new frame
+    student_attendance = range_attendance[range_attendance['student_id'] == student_id]
+    student_attendance = student_attendance.assign(attendance_date=pd.to_datetime(student_attendance['attendance_date']))
     student_attendance_merged = student_attendance.merge(activities, on='activity_id')
     
     # --- AT-A-GLANCE SUMMARY SECTION ---
     st.subheader("At-a-Glance Summary")
     
     if student_attendance.empty:
-        st.warning(f"{selected_student_name} has no recorded attendance.")
+        st.warning(f"{selected_student_name} has no recorded attendance in this time range.")
     else:
         summary_cols = st.columns(3)
         with summary_cols[0]:
             with st.container(border=True):
-                st.metric("Total Attendance (All Time)", str(len(student_attendance)))
+                st.metric(f"Total Attendance ({selected_range})", str(len(student_attendance)))
         with summary_cols[1]:
             with st.container(border=True):
                 last_seen_date = student_attendance['attendance_date'].max().strftime('%Y-%m-%d')
@@ -93,6 +122,9 @@ if selected_student_name and selected_student_name != "-- Select a Student --":
         
         core_activities = ['Sunday Meeting', 'Quddas (Liturgy)']
         core_activity_cols = st.columns(len(core_activities))
+        # Weekly streaks over the current year (precomputed in the background when fresh)
+        streaks = get_or_compute('attendance_streaks', st.session_state)
+        student_streaks = streaks[streaks['student_id'] == student_id].merge(activities, on='activity_id')
         
         for i, activity_name in enumerate(core_activities):
             with core_activity_cols[i]:
@@ -104,6 +136,13 @@ if selected_student_name and selected_student_name != "-- Select a Student --":
                         st.metric(label=f"Last Seen: {activity_name}", value=last_seen.strftime('%Y-%m-%d'), delta=f"{days_since_seen} days ago", delta_color="off")
                     else:
                         st.metric(label=f"Last Seen: {activity_name}", value="Never Attended", delta=" ", delta_color="off")
+                    activity_streak = student_streaks[student_streaks['activity_name'] == activity_name]
+                    if not activity_streak.empty:
+                        streak = activity_streak.iloc[0]
+                        st.caption(
+                            f"🔥 Current streak: **{streak['current_streak']}** week(s) · "
+                            f"Longest: **{streak['longest_streak']}** · Consistency: **{streak['consistency']}%**"
+                        )
         
         # --- ENGAGEMENT TREND OVER TIME (FIXED FOR ZERO ATTENDANCE) ---
         st.subheader("Engagement Trend Over Time")
@@ -113,7 +152,7 @@ if selected_student_name and selected_student_name != "-- Select a Student --":
             # --- NEW LOGIC TO HANDLE ZEROS ---
             # 1. Create a complete timeline of all months for this student
             min_date = student_attendance_merged['attendance_date'].min()
-            max_date = datetime.now()
+            max_date = pd.Timestamp(range_bounds[selected_range][1])
             all_months_range = pd.date_range(start=min_date, end=max_date, freq='MS').strftime('%Y-%B').tolist()
             
             # 2. Get all activities the student has ever attended
@@ -123,7 +162,7 @@ if selected_student_name and selected_student_name != "-- Select a Student --":
             scaffold = pd.MultiIndex.from_product([all_months_range, all_student_activities], names=['month_year', 'activity_name']).to_frame(index=False)
             
             # 4. Aggregate the actual attendance data
-            trend_data_actual = student_attendance_merged.groupby(['month_year', 'activity_name']).size().reset_index(name='monthly_count')
+            trend_data_actual = student_attendance_merged.groupby(['month_year', 'activity_name'], observed=True).size().reset_index(name='monthly_count')
             
             # 5. Merge the scaffold with the actual data (LEFT JOIN)
             trend_data_complete = pd.merge(scaffold, trend_data_actual, on=['month_year', 'activity_name'], how='left')
@@ -171,10 +210,10 @@ if selected_student_name and selected_student_name != "-- Select a Student --":
             col_filter1, col_filter2 = st.columns(2)
             with col_filter1:
                 available_months = sorted(student_attendance_merged['month_year'].unique(), key=lambda m: pd.to_datetime(m, format='%Y-%B'), reverse=True)
-                selected_months = st.multiselect("Filter by Month(s):", options=available_months, default=available_months, key=f"month_filter_{student_id}")
+                selected_months = st.multiselect("Filter by Month(s):", options=available_months, default=available_months, key=f"month_filter_{student_id}_{selected_range}")
             with col_filter2:
                 attended_activities = student_attendance_merged['activity_name'].unique().tolist()
-                selected_activities = st.multiselect("Filter by Activity:", options=attended_activities, default=attended_activities, key=f"activity_filter_{student_id}")
+                selected_activities = st.multiselect("Filter by Activity:", options=attended_activities, default=attended_activities, key=f"activity_filter_{student_id}_{selected_range}")
         
         filtered_attendance = student_attendance_merged
         if selected_months: filtered_attendance = filtered_attendance[filtered_attendance['month_year'].isin(selected_months)]
@@ -189,7 +228,7 @@ if selected_student_name and selected_student_name != "-- Select a Student --":
             col_a, col_b = st.columns(2)
             with col_a:
                 st.subheader("Activity Participation")
-                activity_counts = filtered_attendance['activity_name'].value_counts().reset_index()
+                activity_counts = filtered_attendance['activity_name'].value_counts().loc[lambda c: c > 0].reset_index()
                 activity_counts.columns = ['Activity', 'Count']
                 fig = px.bar(activity_counts, x='Activity', y='Count', title=f"Activities Attended by {selected_student_name}", template='plotly_white', color='Activity')
                 st.plotly_chart(fig, use_container_width=True)
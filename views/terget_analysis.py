@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
+from analytics import Dataset, target_attainment
+from jobs.precompute import month_labels
 
 # --- LOAD DATA & AUTHENTICATION ---
 if 'data_loaded' not in st.session_state or not st.session_state.data_loaded:
@@ -21,9 +22,9 @@ st.markdown("Track student participation against dynamically set, activity-speci
 st.markdown("---")
 
 # --- DATA PREPARATION ---
-attendance['attendance_date'] = pd.to_datetime(attendance['attendance_date'])
-attendance['month_year'] = attendance['attendance_date'].dt.strftime('%Y-%B')
-students_full_details = students.merge(classes, on='class_id').merge(departments, on='dep_id')
+# The session's table is shared with other sessions: add the month on a new frame
+attendance = attendance.assign(month_year=month_labels(attendance['attendance_date']))
+students_full_details = st.session_state.students_full_details
 
 # --- FILTERS (UNCHANGED) ---
 st.header("Select a Group to Analyze")
@@ -54,8 +55,23 @@ with target_container:
     # Initialize the dictionary of targets in session_state if it doesn't exist
     if 'activity_targets' not in st.session_state:
         st.session_state.activity_targets = {activity: 1 for activity in activities['activity_name']}
+    if 'rate_target' not in st.session_state:
+        st.session_state.rate_target = 75
 
-    if user_role == 'Priest':
+    target_measure = st.radio(
+        "Measure progress by", ["Attendance count", "Participation rate"], horizontal=True, key="target_measure",
+        help="Participation rate: the share of the sessions their class held this month that a student attended."
+    )
+
+    if target_measure == "Participation rate":
+        if user_role == 'Priest':
+            st.session_state.rate_target = st.number_input(
+                "Target participation rate (%)", min_value=0, max_value=100, step=5,
+                value=st.session_state.rate_target, key="rate_target_input"
+            )
+        else:
+            st.info(f"The target, set by a Priest, is a participation rate of **{st.session_state.rate_target}%**.")
+    elif user_role == 'Priest':
         st.info("As a Priest, you can set the minimum required attendance for each activity this month.")
         # Use more columns for better layout if there are many activities
         num_target_cols = min(len(activities), 4)
@@ -83,33 +99,41 @@ with target_container:
 # --- ANALYSIS & VISUALIZATION ---
 st.markdown("---")
 if selected_class != "-- Select a Class --" and selected_month != "-- Select a Month --":
+    import plotly.graph_objects as go  # loaded by the first chart drawn, not when the page opens
     st.header(f"Results for {selected_class} in {selected_month}")
 
-    # 1. Calculate the TOTAL target by summing the individual activity targets
-    total_monthly_target = sum(st.session_state.activity_targets.values())
+    # 1. Calculate the TOTAL target by summing the individual activity targets (or use the rate target)
+    by_rate = target_measure == "Participation rate"
+    total_monthly_target = st.session_state.rate_target if by_rate else sum(st.session_state.activity_targets.values())
 
     if total_monthly_target == 0:
         st.warning("No targets have been set. Please ask a Priest to set at least one activity target above.")
     else:
-        st.info(f"The combined target for this month is **{total_monthly_target}** total attendances.")
-        
-        # 2. Isolate the data
-        class_id = classes[classes['class_name'] == selected_class]['class_id'].iloc[0]
-        students_in_class = students_full_details[students_full_details['class_id'] == class_id]
-        month_attendance = attendance[attendance['month_year'] == selected_month]
-        
-        if students_in_class.empty:
+        # Same computation as the command line (see analytics/targets.py)
+        results = target_attainment(
+            Dataset.from_session(st.session_state), selected_class, selected_month,
+            targets=st.session_state.activity_targets, rate_target=total_monthly_target if by_rate else None
+        )
+        class_sessions = int(results['sessions'].iloc[0]) if not results.empty else 0
+        if by_rate:
+            st.info(f"The target is a participation rate of **{total_monthly_target}%** of the **{class_sessions}** sessions this class held this month.")
+        else:
+            st.info(f"The combined target for this month is **{total_monthly_target}** total attendances.")
+
+        # Sessions of this class that nobody recorded make every student fall short
+        unrecorded = int(results['unrecorded'].iloc[0]) if not results.empty else 0
+        if unrecorded:
+            st.warning(f"{unrecorded} core session(s) of this class were not recorded this month, so "
+                       + ("they are left out of the rates." if by_rate else "these totals are understated."))
+
+        if results.empty:
             st.warning("This class has no students.")
         else:
             num_columns = 4; cols = st.columns(num_columns)
-            # 3. Loop through each student
-            for i, (idx, student) in enumerate(students_in_class.iterrows()):
-                student_id, student_name = student['student_id'], student['student_name']
-                
-                # 4. Calculate their TOTAL attendance count for the month
-                student_month_attendance = month_attendance[month_attendance['student_id'] == student_id]
-                total_attendance_count = len(student_month_attendance)
-                
+            # Loop through each student
+            for i, student in enumerate(results.itertuples()):
+                student_name, total_attendance_count = student.student_name, student.value
+
                 # Dynamic Color Logic
                 if total_attendance_count >= total_monthly_target: bar_color = "green"
                 elif total_attendance_count >= total_monthly_target * 0.5: bar_color = "orange"
@@ -120,7 +144,7 @@ if selected_class != "-- Select a Class --" and selected_month != "-- Select a M
                     mode="gauge+number+delta",
                     value=total_attendance_count,
                     title={'text': student_name, 'font': {'size': 16}},
-                    number={'suffix': " Attendances"},
+                    number={'suffix': "%" if by_rate else " Attendances"},
                     delta={'reference': total_monthly_target, 'increasing': {'color': "green"}, 'decreasing': {'color': "red"}},
                     gauge={
                         'axis': {'range': [None, max(total_monthly_target, total_attendance_count) * 1.2]}, # Dynamic axis